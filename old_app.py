@@ -158,10 +158,10 @@ with st.expander("Filter by Municipality or Regions", expanded=False):
 
     with col1:
         selected_provincia = st.multiselect("DescripcionProvincia", options=stop_provincia)
-        ids_provincia = stops_bus[stops_bus["DescripcionProvincia"].isin(selected_provincia)]["line_id"].unique().tolist()
+        ids_provincia = stops_bus[stops_bus["DescripcionProvincia"].isin(selected_provincia)]["line_ids"].str.split(",").explode().unique().tolist()
     with col2:
         selected_municipio= st.multiselect("DescripcionMunicipio", options=stop_municipio)
-        ids_municipio = stops_bus[stops_bus["DescripcionMunicipio"].isin(selected_municipio)]["line_id"].unique().tolist()
+        ids_municipio = stops_bus[stops_bus["DescripcionMunicipio"].isin(selected_municipio)]["line_ids"].str.split(",").explode().unique().tolist()
     all_selected_ids = list(dict.fromkeys(ids_provincia + ids_municipio))
 
     # Filter DataFrames
@@ -1,22 +1,19 @@
 import streamlit as st
-import geopandas as gpd
 
-from src.vehicles import load_positions_bus
+from src.live_cache import get_live_cache
 from src.maps import create_filtered_map
-from src.filtering_menus import get_unique_options, sync_selection, filter_datasets_by_lines
-from src.config import PROCESSED_DATA_DIR
+from src.filtering_menus import sync_selection, filter_datasets_by_lines, get_line_index
+from src.static_layers import load_layer
 
 # ======================================================
 # 1) FETCH BUS DATA (SIRI XML)
 # ======================================================
 
-BUS_URL = "https://ctb-siri.s3.eu-south-2.amazonaws.com/bizkaibus-vehicle-positions.xml"
-ns = {"siri": "http://www.siri.org.uk/siri"}
-
-# Load data
-df_bus = load_positions_bus(BUS_URL,ns)
-lines_bus = gpd.read_file(PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_lines.gpkg", layer="lines")
-stops_bus = gpd.read_file(PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_stops.gpkg", layer="stops")
+# Load data (live positions come from the shared in-process cache)
+df_bus = get_live_cache().get("bus")
+lines_bus = load_layer("bus_lines")
+stops_bus = load_layer("bus_stops")
+line_index = get_line_index()
 
 # ======================================================
 # 1) Filters and Map
@@ -28,18 +25,18 @@ st.write("Visualiza la posición de los autobuses de Bizkaibus filtrados por lí
 # filter UI + map here
 col1, col2 = st.columns(2)
 
-line_ids, line_names = get_unique_options(lines_bus, "line_id", "DenominacionLinea")
+line_ids, line_names = line_index["line_ids"], line_index["line_names"]
 
 with col1:
     selected_names = st.multiselect("Line Name", options=line_names, default=line_names[0])
 with col2:
     selected_ids = st.multiselect("Line ID", options=line_ids)
 
-all_selected_ids, _ = sync_selection(lines_bus, selected_ids, selected_names, "line_id", "DenominacionLinea")
+all_selected_ids, _ = sync_selection(lines_bus, selected_ids, selected_names, "line_id", "DenominacionLinea", index=line_index)
 
 # Filter DataFrames
 selected_lines,selected_stops,vehicles_bus_filtered = filter_datasets_by_lines(
-    lines_bus,stops_bus,df_bus,all_selected_ids
+    lines_bus,stops_bus,df_bus,all_selected_ids,index=line_index
 )
 
 # Create map
@@ -1,22 +1,19 @@
 import streamlit as st
-import geopandas as gpd
 
-from src.vehicles import load_positions_bus
+from src.live_cache import get_live_cache
 from src.maps import create_filtered_map
-from src.filtering_menus import get_unique_options, sync_selection, filter_datasets_by_lines
-from src.config import PROCESSED_DATA_DIR
+from src.filtering_menus import get_unique_options, filter_datasets_by_lines, get_line_index, lines_for_stop_groups
+from src.static_layers import load_layer, get_derived
 
 # ======================================================
 # 1) FETCH BUS DATA (SIRI XML)
 # ======================================================
 
-BUS_URL = "https://ctb-siri.s3.eu-south-2.amazonaws.com/bizkaibus-vehicle-positions.xml"
-ns = {"siri": "http://www.siri.org.uk/siri"}
-
-# Load data
-df_bus = load_positions_bus(BUS_URL,ns)
-lines_bus = gpd.read_file(PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_lines.gpkg", layer="lines")
-stops_bus = gpd.read_file(PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_stops.gpkg", layer="stops")
+# Load data (live positions come from the shared in-process cache)
+df_bus = get_live_cache().get("bus")
+lines_bus = load_layer("bus_lines")
+stops_bus = load_layer("bus_stops")
+line_index = get_line_index()
 
 # ======================================================
 # 1) Filters and Map
@@ -27,19 +24,22 @@ st.write("Visualiza la posición de los autobuses de Bizkaibus filtrados por mun
 
 col1, col2 = st.columns(2)
 
-stop_provincia, stop_municipio = get_unique_options(stops_bus, "DescripcionProvincia", "DescripcionMunicipio")
+stop_provincia, stop_municipio = get_derived(
+    "bus_stops", "region_options",
+    lambda stops: get_unique_options(stops, "DescripcionProvincia", "DescripcionMunicipio"),
+)
 
 with col1:
     selected_municipio= st.multiselect("Municipio", options=stop_municipio,default=stop_municipio[0])
-    ids_municipio = stops_bus[stops_bus["DescripcionMunicipio"].isin(selected_municipio)]["line_id"].unique().tolist()
+    ids_municipio = lines_for_stop_groups(line_index, "DescripcionMunicipio", selected_municipio)
 with col2:
     selected_provincia = st.multiselect("Provincia", options=stop_provincia)
-    ids_provincia = stops_bus[stops_bus["DescripcionProvincia"].isin(selected_provincia)]["line_id"].unique().tolist()
+    ids_provincia = lines_for_stop_groups(line_index, "DescripcionProvincia", selected_provincia)
 all_selected_ids = list(dict.fromkeys(ids_provincia + ids_municipio))
 
 # Filter DataFrames
 selected_lines,selected_stops,vehicles_bus_filtered = filter_datasets_by_lines(
-    lines_bus,stops_bus,df_bus,all_selected_ids
+    lines_bus,stops_bus,df_bus,all_selected_ids,index=line_index
 )
 
 # Create map
@@ -6,8 +6,8 @@ import folium
 import time
 
 
-from src.vehicles import load_positions_bus,load_positions_metro, load_positions_renfe
-from src.maps import create_stops_lines_folium_map, plot_vehicles_by_mode, create_filtered_map
+from src.live_cache import get_live_cache
+from src.live_map import live_map
 from src.filtering_menus import get_unique_options, sync_selection, filter_datasets_by_lines
 from src.config import PROCESSED_DATA_DIR
 st.set_page_config(page_title="Bizkaia Public Transport", layout="wide")
@@ -18,38 +18,20 @@ REFRESH_INTERVAL = 60  # seconds
 
 
 # ======================================================
-# 1) FETCH BUS DATA (SIRI XML)
+# 1) FEEDS: BUS (SIRI XML), METRO & RENFE (GTFS-RT)
 # ======================================================
 
-BUS_URL = "https://ctb-siri.s3.eu-south-2.amazonaws.com/bizkaibus-vehicle-positions.xml"
-ns = {"siri": "http://www.siri.org.uk/siri"}
+# Load data: all feeds are polled in the background by one process-wide
+# cache; a feed that is down keeps its last frame (see staleness below)
+live_cache = get_live_cache()
+df_bus = live_cache.get("bus")
+df_metro = live_cache.get("metro")
+df_renfe = live_cache.get("renfe")
+cache_stats = live_cache.stats()
+feed_timings = cache_stats["timings"]
 
-# Load data
-df_bus = load_positions_bus(BUS_URL,ns)
-lines_bus = gpd.read_file(PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_lines.gpkg", layer="lines")
-stops_bus = gpd.read_file(PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_stops.gpkg", layer="stops")
-
-
-
-
-
-# ======================================================
-# 2) FETCH METRO DATA (GTFS-RT)
 # ======================================================
-METRO_URL = "https://ctb-gtfs-rt.s3.eu-south-2.amazonaws.com/metro-bilbao-vehicle-positions.pb"
-
-df_metro = load_positions_metro(METRO_URL)
-
-
-# ======================================================
-# 3) FETCH RENFE DATA (GTFS-RT)
-# ======================================================
-RENFE_URL = "https://gtfsrt.renfe.com/vehicle_positions.pb"
-
-df_renfe = load_positions_renfe(RENFE_URL)
-
-# ======================================================
-# 4) AUTOREFRESH SETUP
+# 2) AUTOREFRESH SETUP
 # ======================================================
 
 
@@ -64,7 +46,7 @@ if remaining <= 0:
     st.rerun()
 
 # ======================================================
-# 5) INFO PANELS
+# 3) INFO PANELS
 # ======================================================
 st.title("Transporte público de Bizkaia en tiempo real (🚍🚇🚆)")
 st.write(
@@ -91,23 +73,34 @@ with col3:
     if len(df_renfe) > 0 and df_renfe['timestamp'].notna().any():
         st.write("**Last update:**", df_renfe['timestamp'].max().strftime("%d %b %Y, %H:%M:%S"))
 
+if not feed_timings.empty:
+    for _, t in feed_timings[feed_timings["error"].notna()].iterrows():
+        st.warning(f"No se ha podido cargar el feed '{t['feed']}': {t['error']}")
+    if "publisher_error" in feed_timings:
+        for _, t in feed_timings[feed_timings["publisher_error"].notna()].iterrows():
+            st.warning(f"El feed '{t['feed']}' no se actualiza, se muestra el último dato: {t['publisher_error']}")
+
+with st.expander("Tiempos de carga por feed", expanded=False):
+    if not feed_timings.empty:
+        st.write(f"**Total:** {feed_timings.attrs['total_s']:.2f} s")
+        st.dataframe(feed_timings, hide_index=True)
+    st.write(
+        f"**Cache:** {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+        f"{cache_stats['refreshes']} refreshes, {cache_stats['errors']} errors"
+    )
+    st.write("**Antigüedad (s):**", {k: None if v is None else round(v, 1) for k, v in cache_stats["staleness_s"].items()})
+
 
 
 # ======================================================
-# 6) COMBINE & MAP
+# 4) COMBINE & MAP
 # ======================================================
 # -----------------------------
-# 6.1. General map with all vehicles by mode
+# 4.1. General map with all vehicles by mode
 # -----------------------------
 
 df_all = pd.concat([df_bus, df_metro, df_renfe], ignore_index=True, sort=False)
 
-map_html = plot_vehicles_by_mode(
-    df_vehicles=df_all,
-    mode_colors={'bus':'green','metro':'orange','renfe':'purple'},
-    radius=6
-)
-
 st.markdown("""
 <style>
 iframe {
@@ -117,4 +110,10 @@ iframe {
 </style>
 """, unsafe_allow_html=True)
 
-st.components.v1.html(map_html, height=0, scrolling=False)
\ No newline at end of file
+# The map stays mounted between reruns: only moved/added/removed vehicles are sent
+payload_bytes = live_map(
+    df_all,
+    mode_colors={'bus':'green','metro':'orange','renfe':'purple'},
+    radius=6
+)
+st.caption(f"Actualización del mapa: {payload_bytes / 1000:.1f} kB")
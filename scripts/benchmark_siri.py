@@ -0,0 +1,106 @@
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from src.siri import SIRI_NS, parse_siri_vm, to_geodataframe
+
+# ---------------------------------------------
+# SIRI-VM parser benchmark
+# ---------------------------------------------
+# Compares the streaming parser of src.siri with the ElementTree + findtext +
+# Point-per-row parser it replaced, on synthetic feeds of growing size.
+# Run from the project root: python -m scripts.benchmark_siri
+# make_synthetic_feed also backs the stand-in feed of src.live_stream.
+
+
+def make_synthetic_feed(n_vehicles, seed=0, step=0):
+    """
+    Build a SIRI-VM document with `n_vehicles` activities (bytes). Each
+    `step` moves a quarter of the vehicles ~50 m north, to stand in for
+    successive polls of the real feed.
+    """
+    rng = np.random.default_rng(seed)
+    lats = 43.0 + rng.random(n_vehicles) * 0.45
+    lons = -3.45 + rng.random(n_vehicles) * 1.0
+    lats += 0.00045 * ((step + np.arange(n_vehicles) % 4) // 4)
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        f'<Siri xmlns="{SIRI_NS}" version="2.0"><ServiceDelivery>'
+        "<ResponseTimestamp>2025-11-28T17:20:36+01:00</ResponseTimestamp>"
+        "<VehicleMonitoringDelivery>"
+    ]
+    for i in range(n_vehicles):
+        parts.append(
+            "<VehicleActivity>"
+            f"<RecordedAtTime>2025-11-28T17:{i % 60:02d}:{(i * 7) % 60:02d}+01:00</RecordedAtTime>"
+            "<MonitoredVehicleJourney>"
+            f"<LineRef>A{3000 + i % 300}</LineRef>"
+            f"<VehicleJourneyRef>1_A{3000 + i % 300}_{i}</VehicleJourneyRef>"
+            f"<VehicleLocation><Longitude>{lons[i]:.6f}</Longitude><Latitude>{lats[i]:.6f}</Latitude></VehicleLocation>"
+            f"<VehicleRef>{1000 + i}</VehicleRef>"
+            f"<MonitoredCall><StopPointRef>{4000 + i % 5000}</StopPointRef></MonitoredCall>"
+            "<OnwardCalls><OnwardCall><StopPointRef>0</StopPointRef></OnwardCall></OnwardCalls>"
+            "</MonitoredVehicleJourney>"
+            "</VehicleActivity>"
+        )
+    parts.append("</VehicleMonitoringDelivery></ServiceDelivery></Siri>")
+    return "".join(parts).encode("utf-8")
+
+
+def _legacy_parse(content):
+    """The previous ElementTree + findtext + Point-per-row archive parser."""
+    from shapely.geometry import Point
+
+    ns = {"s": SIRI_NS}
+    root = ET.fromstring(content)
+    rows = []
+    for act in root.findall(".//s:VehicleActivity", ns):
+        mvj = act.find("s:MonitoredVehicleJourney", ns)
+        if mvj is None:
+            continue
+        lat = mvj.findtext("s:VehicleLocation/s:Latitude", namespaces=ns)
+        lon = mvj.findtext("s:VehicleLocation/s:Longitude", namespaces=ns)
+        if lat and lon:
+            rows.append({
+                "vehicle_ref": mvj.findtext("s:VehicleRef", namespaces=ns),
+                "journey_ref": mvj.findtext("s:VehicleJourneyRef", namespaces=ns),
+                "stop_ref": mvj.findtext("s:MonitoredCall/s:StopPointRef", namespaces=ns),
+                "lat": float(lat),
+                "lon": float(lon),
+                "recorded_at": act.findtext("s:RecordedAtTime", namespaces=ns),
+            })
+    return gpd.GeoDataFrame(rows, geometry=[Point(r["lon"], r["lat"]) for r in rows], crs="EPSG:4326")
+
+
+def _measure(fn, content):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    fn(content)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def benchmark(sizes=(1_000, 10_000, 100_000)):
+    """Compare the streaming parser against the legacy one (time and peak MB)."""
+    results = []
+    for n in sizes:
+        content = make_synthetic_feed(n)
+        legacy_s, legacy_mb = _measure(_legacy_parse, content)
+        stream_s, stream_mb = _measure(lambda c: to_geodataframe(parse_siri_vm(c)[0]), content)
+        results.append({
+            "vehicles": n,
+            "feed_mb": len(content) / 1e6,
+            "legacy_s": legacy_s,
+            "stream_s": stream_s,
+            "legacy_peak_mb": legacy_mb,
+            "stream_peak_mb": stream_mb,
+        })
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    print(benchmark().to_string(index=False, float_format="%.3f"))
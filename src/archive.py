@@ -0,0 +1,325 @@
+import argparse
+import os
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from src.config import LOCAL_TZ, RAW_DATA_DIR
+from src.kinematics import update_kinematics
+from src.trajectories import haversine_m
+
+# ---------------------------------------------
+# Columnar snapshot archive
+# ---------------------------------------------
+# Every new SIRI version is appended as a small Parquet file under a daily
+# partition (day=YYYY-MM-DD, local time). `compact` later merges the small
+# appends of a day into one file sorted by time, with row groups of
+# ROW_GROUP_SIZE rows whose min/max statistics (snapshot_ts, recorded_at,
+# vehicle_ref) let readers skip row groups. A day, or any time window, is
+# then read with one dataset scan.
+#
+# Snapshots are delta-encoded (see `append_delta`): only vehicles that are new,
+# moved more than MIN_MOVE_M or changed journey/stop are stored, plus a
+# "gone" row for each vehicle that disappeared. A full keyframe is written
+# every KEYFRAME_EVERY snapshots and at the first snapshot of each day, so
+# `fleet_state_at` rebuilds the fleet at any time from the last keyframe
+# before it and the deltas that follow.
+#
+# Layout: ARCHIVE_DIR/day=2025-11-28/part-<snapshot>-<uuid>.parquet (appends)
+#                                   /compacted-<uuid>.parquet       (compacted)
+
+ARCHIVE_DIR = RAW_DATA_DIR / "archive" / "bizkaibus"
+ROW_GROUP_SIZE = 64_000
+COMPACT_MIN_FILES = 8  # a day is compacted once it has this many small files
+MIN_MOVE_M = 10.0      # smaller displacements are GPS jitter, not movement
+KEYFRAME_EVERY = 40    # snapshots between full keyframes (~10 min at 15 s)
+MAX_KEYFRAME_AGE = pd.Timedelta(days=1)  # how far back fleet_state_at looks
+EVENTS = ("key", "new", "moved", "gone")  # keyframe row / delta rows
+
+SCHEMA = pa.schema([
+    ("snapshot_ts", pa.timestamp("ms", tz="UTC")),
+    ("vehicle_ref", pa.string()),
+    ("journey_ref", pa.string()),
+    ("stop_ref", pa.string()),
+    ("lat", pa.float64()),
+    ("lon", pa.float64()),
+    ("recorded_at", pa.timestamp("ms", tz="UTC")),
+    ("speed_kmh", pa.float64()),    # src.kinematics, against the previous snapshot
+    ("heading_deg", pa.float64()),
+    ("stationary", pa.bool_()),
+    ("dwell_s", pa.float64()),
+    ("event", pa.string()),  # one of EVENTS; null (files before delta encoding) = "key"
+])
+PARTITIONING = ds.partitioning(pa.schema([("day", pa.string())]), flavor="hive")
+DATASET_SCHEMA = SCHEMA.append(pa.field("day", pa.string()))
+
+
+def _to_utc(values):
+    return pd.to_datetime(values, utc=True, format="ISO8601")
+
+
+def _utc_timestamp(value):
+    return _to_utc(pd.Series([value])).iloc[0]
+
+
+def _write_parquet(table, path):
+    """Write `table` to `path` atomically (temp file + rename)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    pq.write_table(table, tmp, row_group_size=ROW_GROUP_SIZE, compression="zstd", write_statistics=True)
+    os.replace(tmp, path)
+
+
+def day_of(snapshot_ts):
+    """Partition (local calendar day) of a snapshot timestamp."""
+    return _utc_timestamp(snapshot_ts).tz_convert(LOCAL_TZ).strftime("%Y-%m-%d")
+
+
+def fleet_frame(df):
+    """Positions frame (parse_siri_vm columns; geometry ignored) → fleet indexed by vehicle_ref."""
+    fleet = pd.DataFrame({
+        "vehicle_ref": df["vehicle_ref"].astype("string").to_numpy(),
+        "journey_ref": df["journey_ref"].astype("string").to_numpy(),
+        "stop_ref": df["stop_ref"].astype("string").to_numpy(),
+        "lat": df["lat"].to_numpy(dtype=float),
+        "lon": df["lon"].to_numpy(dtype=float),
+        "recorded_at": _to_utc(df["recorded_at"]).to_numpy(),
+    })
+    return fleet.drop_duplicates("vehicle_ref", keep="last").set_index("vehicle_ref")
+
+
+def snapshot_table(fleet, snapshot_ts, event="key"):
+    """Fleet rows (fleet_frame) → archive Table; `event` is a scalar or one value per row."""
+    frame = fleet.reset_index()
+    frame.insert(0, "snapshot_ts", _utc_timestamp(snapshot_ts))
+    frame["event"] = event
+    return pa.Table.from_pandas(frame[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+
+# ======================================================
+# 1) WRITE
+# ======================================================
+def _write_part(table, snapshot_ts, directory):
+    ts = _utc_timestamp(snapshot_ts)
+    path = directory / f"day={day_of(ts)}" / f"part-{ts:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+    _write_parquet(table, path)
+    return path
+
+
+def append_snapshot(df, snapshot_ts, directory=ARCHIVE_DIR):
+    """Append one full snapshot (keyframe) to its day partition. Returns the written path."""
+    fleet = update_kinematics(fleet_frame(df), None, "recorded_at")
+    return _write_part(snapshot_table(fleet, snapshot_ts), snapshot_ts, directory)
+
+
+def snapshot_changes(stored, current, min_move_m=MIN_MOVE_M):
+    """
+    Rows of `current` (fleet_frame) that differ from the `stored` fleet, with
+    their event ("new" / "moved"), plus a "gone" row per vehicle missing from
+    `current`. A vehicle counts as moved when it is more than `min_move_m`
+    from its last stored position, its journey/stop changed or it stopped or
+    started moving.
+    """
+    common = current.index.intersection(stored.index)
+    before, after = stored.loc[common], current.loc[common]
+    moved = haversine_m(before["lat"], before["lon"], after["lat"], after["lon"]) > min_move_m
+    for col in ("journey_ref", "stop_ref"):
+        moved |= (before[col].fillna("") != after[col].fillna("")).to_numpy()
+    moved |= before["stationary"].to_numpy(dtype=bool) != after["stationary"].to_numpy(dtype=bool)
+
+    new = current.loc[current.index.difference(stored.index)]
+    gone = stored.loc[stored.index.difference(current.index)].copy()
+    gone.loc[:, ["journey_ref", "stop_ref"]] = pd.NA
+    gone.loc[:, ["lat", "lon"]] = np.nan
+    gone.loc[:, "recorded_at"] = pd.NaT
+    gone.loc[:, ["speed_kmh", "heading_deg", "dwell_s"]] = np.nan
+    gone["stationary"] = None
+    changes = pd.concat([new, after[moved], gone])
+    events = ["new"] * len(new) + ["moved"] * int(moved.sum()) + ["gone"] * len(gone)
+    return changes, events
+
+
+def append_delta(df, snapshot_ts, state=None, directory=ARCHIVE_DIR,
+                 min_move_m=MIN_MOVE_M, keyframe_every=KEYFRAME_EVERY):
+    """
+    Delta-encoded append. `state` is what the previous call returned (None
+    at start-up). Writes a keyframe when there is no state, on a new day or
+    after `keyframe_every` deltas; otherwise only the changes against the
+    stored fleet (nothing when there are none).
+
+    Returns:
+        (path written or None, new state)
+    """
+    current = update_kinematics(fleet_frame(df), None if state is None else state["last"], "recorded_at")
+    day = day_of(snapshot_ts)
+    if state is None or state["day"] != day or state["since_key"] >= keyframe_every:
+        path = _write_part(snapshot_table(current, snapshot_ts), snapshot_ts, directory)
+        return path, {"fleet": current, "last": current, "day": day, "since_key": 0}
+
+    changes, events = snapshot_changes(state["fleet"], current, min_move_m)
+    # The stored fleet keeps the last *stored* position, so slow creep
+    # below min_move_m still adds up to a move
+    fleet = pd.concat([state["fleet"].drop(changes.index, errors="ignore"),
+                       changes[[e != "gone" for e in events]]])
+    path = None
+    if len(changes):
+        path = _write_part(snapshot_table(changes, snapshot_ts, events), snapshot_ts, directory)
+    return path, {"fleet": fleet, "last": current, "day": day, "since_key": state["since_key"] + 1}
+
+
+def compact_day(day, directory=ARCHIVE_DIR):
+    """
+    Merge the small files of partition `day` into one time-sorted file.
+    Returns (files merged, rows).
+    """
+    part_dir = directory / f"day={day}"
+    files = sorted(part_dir.glob("*.parquet"))
+    if len(files) < 2:
+        return 0, 0
+    table = ds.dataset(files, schema=SCHEMA, format="parquet").to_table()
+    table = table.sort_by([("snapshot_ts", "ascending"), ("vehicle_ref", "ascending")])
+    _write_parquet(table, part_dir / f"compacted-{uuid.uuid4().hex[:8]}.parquet")
+    # Readers may briefly see both the new file and the old parts; the old
+    # parts go right after the merged file is in place
+    for f in files:
+        f.unlink()
+    return len(files), table.num_rows
+
+
+def compact(directory=ARCHIVE_DIR, min_files=COMPACT_MIN_FILES, include_today=False):
+    """Compact every day partition with at least `min_files` files."""
+    today = day_of(pd.Timestamp.now(tz="UTC"))
+    results = {}
+    for part_dir in sorted(directory.glob("day=*")):
+        day = part_dir.name.split("=", 1)[1]
+        if day == today and not include_today:
+            continue
+        if len(list(part_dir.glob("*.parquet"))) >= min_files:
+            results[day] = compact_day(day, directory)
+    return results
+
+
+# ======================================================
+# 2) READ
+# ======================================================
+def open_archive(directory=ARCHIVE_DIR):
+    """The archive as a pyarrow Dataset (day partition column included)."""
+    return ds.dataset(directory, schema=DATASET_SCHEMA, format="parquet", partitioning=PARTITIONING)
+
+
+def read_archive(start=None, end=None, vehicle_refs=None, columns=None, directory=ARCHIVE_DIR):
+    """
+    Snapshots with start <= snapshot_ts < end (optionally only `vehicle_refs`)
+    as a DataFrame, in one scan. Day partitions and row groups outside the
+    filter are skipped.
+    """
+    if not directory.exists():
+        return SCHEMA.empty_table().to_pandas()
+    dataset = open_archive(directory)
+    expr = None
+    if start is not None:
+        start = _to_utc(pd.Series([start])).iloc[0]
+        expr = _and(expr, (ds.field("snapshot_ts") >= start) & (ds.field("day") >= day_of(start)))
+    if end is not None:
+        end = _to_utc(pd.Series([end])).iloc[0]
+        expr = _and(expr, (ds.field("snapshot_ts") < end) & (ds.field("day") <= day_of(end)))
+    if vehicle_refs is not None:
+        expr = _and(expr, ds.field("vehicle_ref").isin(list(vehicle_refs)))
+    table = dataset.to_table(columns=columns or SCHEMA.names, filter=expr)
+    df = table.to_pandas()
+    if "event" in df.columns:
+        df["event"] = df["event"].fillna("key")
+    sort_cols = [c for c in ("snapshot_ts", "vehicle_ref") if c in df.columns]
+    return df.sort_values(sort_cols, kind="stable", ignore_index=True)
+
+
+def read_day(day, directory=ARCHIVE_DIR):
+    """All snapshots of local day `day` ("YYYY-MM-DD")."""
+    start = pd.Timestamp(day, tz=LOCAL_TZ)
+    return read_archive(start, start + pd.Timedelta(days=1), directory=directory)
+
+
+def _and(expr, other):
+    return other if expr is None else expr & other
+
+
+def fleet_state_at(timestamp, directory=ARCHIVE_DIR, max_keyframe_age=MAX_KEYFRAME_AGE):
+    """
+    Fleet as last archived at or before `timestamp`: one row per vehicle
+    (vehicle_ref, journey_ref, stop_ref, lat, lon, recorded_at, snapshot_ts
+    of its last stored row). Rebuilt from the newest keyframe within
+    `max_keyframe_age` before `timestamp` plus the deltas after it; empty
+    if there is none.
+    """
+    timestamp = _utc_timestamp(timestamp)
+    rows = read_archive(timestamp - max_keyframe_age, timestamp + pd.Timedelta(milliseconds=1),
+                        directory=directory)
+    keyframes = rows.loc[rows["event"] == "key", "snapshot_ts"]
+    if keyframes.empty:
+        return rows.iloc[:0].drop(columns="event")
+    rows = rows[rows["snapshot_ts"] >= keyframes.max()]
+    # rows are time-sorted: the last row of each vehicle is its state
+    last = rows.drop_duplicates("vehicle_ref", keep="last")
+    last = last[last["event"] != "gone"].drop(columns="event")
+    return last.reset_index(drop=True)
+
+
+def archive_info(directory=ARCHIVE_DIR):
+    """Files, rows, row groups and bytes per day partition."""
+    rows = []
+    for part_dir in sorted(directory.glob("day=*")):
+        files = sorted(part_dir.glob("*.parquet"))
+        metas = [pq.ParquetFile(f).metadata for f in files]
+        rows.append({
+            "day": part_dir.name.split("=", 1)[1],
+            "files": len(files),
+            "rows": sum(m.num_rows for m in metas),
+            "row_groups": sum(m.num_row_groups for m in metas),
+            "bytes": sum(f.stat().st_size for f in files),
+        })
+    return pd.DataFrame(rows, columns=["day", "files", "rows", "row_groups", "bytes"])
+
+
+# ======================================================
+# 3) MIGRATION OF THE OLD GPKG SNAPSHOTS
+# ======================================================
+def import_gpkg(paths, directory=ARCHIVE_DIR, workers=None):
+    """
+    Append old bizkaibus_<YYYYmmdd_HHMMSS>.gpkg snapshots to the archive,
+    read in parallel by src.snapshot_files (bad files are quarantined). The
+    snapshot time is the newest recorded_at of each file (as in loop_fetch).
+    """
+    from src.snapshot_files import read_snapshot_files
+
+    df, _ = read_snapshot_files(sorted(paths), workers=workers)
+    df["recorded_at"] = _to_utc(df["recorded_at"])
+    imported, state = 0, None
+    for _, snapshot in df.groupby("file", sort=True):
+        _, state = append_delta(snapshot, snapshot["recorded_at"].max(), state, directory)
+        imported += 1
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bizkaibus snapshot archive (Parquet, partitioned by day).")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="append old GPKG snapshots")
+    imp.add_argument("paths", nargs="+")
+    imp.add_argument("--workers", type=int, default=None)
+    comp = sub.add_parser("compact", help="merge the small files of each day")
+    comp.add_argument("--min-files", type=int, default=COMPACT_MIN_FILES)
+    comp.add_argument("--include-today", action="store_true")
+    sub.add_parser("info", help="files / rows / bytes per day")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        start_time = time.perf_counter()
+        n = import_gpkg(args.paths, workers=args.workers)
+        print(f"✔️  Imported {n} snapshots in {time.perf_counter() - start_time:.1f}s → {ARCHIVE_DIR}")
+    elif args.command == "compact":
+        for day, (files, rows) in compact(min_files=args.min_files, include_today=args.include_today).items():
+            print(f"✔️  {day}: {files} files → 1 ({rows} rows)")
+    print(archive_info().to_string(index=False))
@@ -0,0 +1,50 @@
+import functools
+import numpy as np
+import geopandas as gpd
+import shapely
+from src.config import PROCESSED_DATA_DIR
+
+# ---------------------------------------------
+# Bizkaia boundary filter
+# ---------------------------------------------
+# The boundary polygon is read, unioned and prepared once per process. Points
+# are tested on raw coordinate arrays: a bounding-box check first, then
+# shapely.contains_xy only for the points that survive it.
+
+BOUNDARY_PATH = PROCESSED_DATA_DIR / "bizkaia_boundary.gpkg"
+
+
+def bbox_mask(lon, lat, bbox):
+    """Boolean mask of points inside bbox = (west, south, east, north)."""
+    west, south, east, north = bbox
+    return (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+
+
+@functools.lru_cache(maxsize=None)
+def get_boundary(path=BOUNDARY_PATH):
+    """Return the prepared boundary geometry (EPSG:4326) for `path`."""
+    gdf = gpd.read_file(path)
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    elif gdf.crs != "EPSG:4326":
+        gdf = gdf.to_crs("EPSG:4326")
+    geom = gdf.union_all()
+    shapely.prepare(geom)
+    return geom
+
+
+def inside_mask(lon, lat, path=BOUNDARY_PATH):
+    """Boolean mask of lon/lat points (WGS84) inside the boundary."""
+    geom = get_boundary(path)
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    mask = bbox_mask(lon, lat, geom.bounds)
+    if mask.any():
+        mask[mask] = shapely.contains_xy(geom, lon[mask], lat[mask])
+    return mask
+
+
+def clip_to_boundary(df, lon_col="lon", lat_col="lat", path=BOUNDARY_PATH):
+    """Keep only the rows of `df` whose lon/lat lie inside the boundary."""
+    mask = inside_mask(df[lon_col].to_numpy(), df[lat_col].to_numpy(), path)
+    return df[mask].reset_index(drop=True)
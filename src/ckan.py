@@ -1,10 +1,13 @@
-import requests
+import json
 import pandas as pd
+from src import transport
 
 def fetch_catalog(API_URL):
-    response = requests.get(API_URL)
-    response.raise_for_status()
-    data = response.json()
+    return transport.fetch_parsed(API_URL, parse_catalog)[0]
+
+
+def parse_catalog(content):
+    data = json.loads(content)
 
     # Lista completa de paquetes
     packages = data["result"]
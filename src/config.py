@@ -25,6 +25,32 @@ SRC_DIR = PROJ_ROOT / "src"
 # Pages directory
 PAGES_DIR = PROJ_ROOT / "pages"
 
+# Timezone used to display feed timestamps
+LOCAL_TZ = "Europe/Madrid"
+
+# Realtime feeds
+BUS_URL = "https://ctb-siri.s3.eu-south-2.amazonaws.com/bizkaibus-vehicle-positions.xml"
+METRO_URL = "https://ctb-gtfs-rt.s3.eu-south-2.amazonaws.com/metro-bilbao-vehicle-positions.pb"
+RENFE_URL = "https://gtfsrt.renfe.com/vehicle_positions.pb"
+
+# Live snapshot sharing between server processes. With LIVE_SOURCE="shared"
+# pages read the snapshots published by `python -m src.shared_snapshot`
+# instead of polling the feeds themselves. Point LIVE_SNAPSHOT_DIR at a tmpfs
+# (e.g. /dev/shm/bizkaia_od) to keep the mapped files in RAM.
+LIVE_SOURCE = os.getenv("LIVE_SOURCE", "direct")
+LIVE_SNAPSHOT_DIR = Path(os.getenv("LIVE_SNAPSHOT_DIR", DATA_DIR / "live"))
+
+# Vector tile server (python -m src.tile_server)
+TILE_SERVER_HOST = os.getenv("TILE_SERVER_HOST", "127.0.0.1")
+TILE_SERVER_PORT = int(os.getenv("TILE_SERVER_PORT", "8701"))
+
+# Live position stream for the public Leaflet client (src.live_stream)
+LIVE_STREAM_HOST = os.getenv("LIVE_STREAM_HOST", "127.0.0.1")
+LIVE_STREAM_PORT = int(os.getenv("LIVE_STREAM_PORT", "8702"))
+
+# Bizkaia bounding box (west, south, east, north), from bizkaia_boundary.gpkg
+BIZKAIA_BBOX = (-3.450912, 42.9687184, -2.4127205, 43.4568595)
+
 # Example usage:
 # from src.config import RAW_DATA_DIR
 # df = pd.read_csv(RAW_DATA_DIR / "mydata.csv")
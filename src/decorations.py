@@ -0,0 +1,66 @@
+from src.line_geometry import LINE_LEVELS, level_for_zoom, simplify_geometries
+from src.static_layers import get_derived
+
+# ---------------------------------------------
+# Map decorations as pre-serialized GeoJSON
+# ---------------------------------------------
+# Static context drawn under the live data (the Bizkaia boundary, the bus
+# network, ...) does not change between requests. Each decoration is built
+# once per version of its source layer(s), at every level of
+# src.line_geometry.LINE_LEVELS, and kept as a GeoJSON string, so map
+# builders embed it without reading, simplifying or serializing anything.
+
+
+def _boundary(boundary):
+    return boundary[["geometry"]], True
+
+
+def _bus_network(lines):
+    # Unique corridors instead of overlapping routes (see src.segment_graph)
+    from src.segment_graph import get_segment_graph
+    return get_segment_graph()["segments"][["n_lines", "geometry"]], False
+
+
+# name -> (static layer(s) it is derived from, function -> (GeoDataFrame, is_polygon))
+DECORATIONS = {
+    "boundary": ("boundary", _boundary),
+    "bus_network": ("bus_lines", _bus_network),
+}
+
+
+def _serialize_levels(gdf, polygons):
+    """GeoJSON string of `gdf` at every level of LINE_LEVELS."""
+    levels = []
+    for level in range(len(LINE_LEVELS)):
+        geometry = simplify_geometries(gdf.geometry.values, level, preserve_topology=polygons)
+        simplified = gdf.set_geometry(geometry, crs=gdf.crs)
+        levels.append(simplified[~simplified.geometry.is_empty].to_json(drop_id=True))
+    return levels
+
+
+def get_decoration(name, zoom=None, level=None):
+    """
+    GeoJSON string (EPSG:4326) of decoration `name`, for a map opened at
+    `zoom` (or at an explicit LINE_LEVELS `level`; default: full detail).
+    Decorations are background context, so they use the level of one zoom
+    step out (the opposite of the headroom given to route lines).
+    """
+    layers, prepare = DECORATIONS[name]
+    levels = get_derived(layers, f"decoration:{name}", lambda *gdfs: _serialize_levels(*prepare(*gdfs)))
+    if level is None:
+        level = len(LINE_LEVELS) - 1 if zoom is None else level_for_zoom(zoom - 1)
+    return levels[level]
+
+
+if __name__ == "__main__":
+    import time
+
+    for decoration in DECORATIONS:
+        start = time.perf_counter()
+        try:
+            sizes = [len(get_decoration(decoration, level=i)) for i in range(len(LINE_LEVELS))]
+        except FileNotFoundError as e:
+            print(f"⚠️  {decoration}: {e}")
+            continue
+        kb = ", ".join(f"{size / 1000:.0f}" for size in sizes)
+        print(f"✔️  {decoration}: {kb} kB per level ({time.perf_counter() - start:.2f}s)")
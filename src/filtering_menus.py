@@ -1,3 +1,8 @@
+import time
+import numpy as np
+import pandas as pd
+from src.stop_network import build_adjacency, collapse_stops, lines_of_stops, stops_of_lines
+
 
 def get_unique_options(df, id_col, name_col):
     """Return unique IDs and names from DataFrame."""
@@ -5,7 +10,7 @@ def get_unique_options(df, id_col, name_col):
     names = df[name_col].explode().unique().tolist()
     return ids, names
 
-def sync_selection(df, selected_ids, selected_names, id_col, name_col):
+def sync_selection(df, selected_ids, selected_names, id_col, name_col, index=None):
     """
     Sync selections between an ID column and a Name column.
 
@@ -21,6 +26,9 @@ def sync_selection(df, selected_ids, selected_names, id_col, name_col):
         Name of the column representing the IDs.
     name_col : str
         Name of the column representing the Names.
+    index : dict, optional
+        Line index from `build_line_index`; its precomputed id/name maps are
+        used instead of rebuilding them from `df`.
 
     Returns
     -------
@@ -29,8 +37,11 @@ def sync_selection(df, selected_ids, selected_names, id_col, name_col):
     all_names : set
         Set of all selected names, including those inferred from IDs.
     """
-    id_to_name = dict(zip(df[id_col], df[name_col]))
-    name_to_id = dict(zip(df[name_col], df[id_col]))
+    if index is not None:
+        id_to_name, name_to_id = index["id_to_name"], index["name_to_id"]
+    else:
+        id_to_name = dict(zip(df[id_col], df[name_col]))
+        name_to_id = dict(zip(df[name_col], df[id_col]))
 
     # Keep only valid selections that exist in the mappings
     all_ids = set(selected_ids)
@@ -43,8 +54,122 @@ def sync_selection(df, selected_ids, selected_names, id_col, name_col):
 
 
 
-def filter_datasets_by_lines(lines_gdf, stops_gdf, vehicles_df, selected_line_ids):
-    selected_lines = lines_gdf[lines_gdf["line_id"].isin(selected_line_ids)]
-    selected_stops = stops_gdf[stops_gdf["line_id"].isin(selected_line_ids)]
+def filter_datasets_by_lines(lines_gdf, stops_gdf, vehicles_df, selected_line_ids, index=None):
+    """
+    Rows of lines, stops and vehicles that belong to `selected_line_ids`.
+    With a line `index` (see `build_line_index`) lines and stops are gathered
+    from precomputed positions instead of scanning the tables.
+    """
+    if index is not None:
+        selected_lines = lines_gdf.iloc[_gather(index["lines"], selected_line_ids)]
+        # Stop positions refer to the collapsed frame the index was built from
+        selected_stops = collapse_stops(stops_gdf).iloc[stops_of_lines(index["stops"], selected_line_ids)]
+    else:
+        selected_lines = lines_gdf[lines_gdf["line_id"].isin(selected_line_ids)]
+        if "line_ids" in stops_gdf.columns:
+            served = stops_gdf["line_ids"].str.split(",").explode().isin(selected_line_ids)
+            selected_stops = stops_gdf[served.groupby(level=0).any()]
+        else:
+            selected_stops = stops_gdf[stops_gdf["line_id"].isin(selected_line_ids)]
+    # Live vehicles change every refresh: a plain scan of a few hundred rows
     vehicles_bus_filtered = vehicles_df[vehicles_df["line_id"].isin(selected_line_ids)]
-    return selected_lines, selected_stops, vehicles_bus_filtered
\ No newline at end of file
+    return selected_lines, selected_stops, vehicles_bus_filtered
+
+
+# ---------------------------------------------
+# Line index
+# ---------------------------------------------
+def _as_keys(values):
+    """Ids as the index keys them: strings, missing as ""."""
+    return pd.Series(values).fillna("").astype(str)
+
+
+def _group_positions(keys):
+    """
+    Row positions grouped by key: `order` holds the row positions sorted by
+    key and `ranges` maps each key to its (start, end) slice of `order`.
+    """
+    keys = _as_keys(keys).to_numpy(dtype=object)
+    order = np.argsort(keys, kind="stable")
+    uniq, starts = np.unique(keys[order], return_index=True)
+    ends = np.append(starts[1:], len(keys))
+    return {"order": order, "ranges": dict(zip(uniq.tolist(), zip(starts.tolist(), ends.tolist())))}
+
+
+def _gather(groups, keys):
+    """Sorted row positions of all rows whose key is in `keys`."""
+    order, ranges = groups["order"], groups["ranges"]
+    parts = [order[slice(*ranges[k])] for k in set(keys) if k in ranges]
+    if not parts:
+        return np.empty(0, dtype=np.intp)
+    positions = np.concatenate(parts)
+    positions.sort()
+    return positions
+
+
+def build_line_index(lines_gdf, stops_gdf, id_col="line_id", name_col="DenominacionLinea",
+                     stop_group_cols=("DescripcionMunicipio", "DescripcionProvincia")):
+    """
+    Precompute everything the line filters need, once per static-data version
+    (see `get_line_index`). `stops_gdf` is collapsed to one row per stop
+    (src.stop_network.collapse_stops) and stop positions refer to that
+    frame. Line ids are keyed as strings everywhere.
+
+    Returns
+    -------
+    dict with
+        lines : line_id -> row positions (see `_group_positions`)
+        stops : line <-> stop CSR adjacency (see src.stop_network)
+        stop_groups : column -> value -> stop row positions, for stop_group_cols
+        id_to_name, name_to_id : line id <-> line name (as in `sync_selection`)
+        line_ids, line_names : option lists for the selectors (as in `get_unique_options`)
+    """
+    lines = lines_gdf.assign(**{id_col: _as_keys(lines_gdf[id_col]).to_numpy()})
+    stops = collapse_stops(stops_gdf)
+    line_ids, line_names = get_unique_options(lines, id_col, name_col)
+    return {
+        "lines": _group_positions(lines[id_col]),
+        "stops": build_adjacency(stops),
+        "stop_groups": {c: _group_positions(stops[c]) for c in stop_group_cols if c in stops},
+        "id_to_name": dict(zip(lines[id_col], lines[name_col])),
+        "name_to_id": dict(zip(lines[name_col], lines[id_col])),
+        "line_ids": line_ids,
+        "line_names": line_names,
+    }
+
+
+def lines_for_stop_groups(index, col, values):
+    """Line ids serving any stop whose `col` is in `values` (e.g. municipalities)."""
+    return lines_of_stops(index["stops"], _gather(index["stop_groups"][col], values))
+
+
+def get_line_index():
+    """Line index of the Bizkaibus static layers, rebuilt only when they change."""
+    from src.static_layers import get_derived
+
+    return get_derived(("bus_lines", "bus_stops"), "line_index", build_line_index)
+
+
+def benchmark(lines_gdf, stops_gdf, vehicles_df, steps=(1, 10, 50, None), repeat=20):
+    """Time the scan-based filter against the index gather for growing selections."""
+    index = build_line_index(lines_gdf, stops_gdf)
+    all_ids = index["line_ids"]
+    results = []
+    for n in steps:
+        ids = all_ids[:n] if n else all_ids
+        timings = {}
+        for label, idx in (("scan_ms", None), ("index_ms", index)):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                filter_datasets_by_lines(lines_gdf, stops_gdf, vehicles_df, ids, index=idx)
+            timings[label] = (time.perf_counter() - t0) / repeat * 1e3
+        results.append({"lines_selected": len(ids), **timings})
+    return pd.DataFrame(results)
+
+
+if __name__ == "__main__":
+    from src.static_layers import load_layer
+
+    lines, stops = load_layer("bus_lines"), load_layer("bus_stops")
+    vehicles = pd.DataFrame({"line_id": lines["line_id"].astype(str).sample(300, replace=True, random_state=0)})
+    print(benchmark(lines, stops, vehicles).to_string(index=False, float_format="%.3f"))
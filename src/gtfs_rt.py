@@ -0,0 +1,136 @@
+from array import array
+import numpy as np
+import pandas as pd
+from google.transit import gtfs_realtime_pb2
+from src.config import LOCAL_TZ
+from src.boundary import bbox_mask
+
+# ---------------------------------------------
+# Columnar GTFS-RT decoding
+# ---------------------------------------------
+# The protobuf message is walked once and every field of interest is written
+# into a preallocated NumPy array. Filtering (bounding box) and timestamp
+# conversion then run on whole arrays, before any DataFrame is built.
+
+
+def parse_feed(content):
+    """Raw protobuf bytes → FeedMessage."""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(content)
+    return feed
+
+
+def to_local_datetimes(seconds):
+    """POSIX seconds (0 = missing) → tz-aware datetimes in LOCAL_TZ, vectorized."""
+    seconds = np.asarray(seconds, dtype=np.int64)
+    ts = pd.to_datetime(seconds, unit="s", utc=True).tz_convert(LOCAL_TZ)
+    return ts.where(seconds > 0)
+
+
+def decode_vehicle_positions(content, bbox=None):
+    """
+    Decode a VehiclePositions feed into column arrays.
+
+    Args:
+        content: Raw protobuf bytes (or an already parsed FeedMessage).
+        bbox: Optional (west, south, east, north); vehicles outside are
+            dropped before anything else is built.
+    Returns:
+        (columns, header_timestamp): dict with vehicle_id, trip_id, route_id
+        (object arrays), lat, lon (float64) and timestamp (int64 POSIX
+        seconds, 0 when absent); plus the feed header timestamp.
+    """
+    feed = content if isinstance(content, gtfs_realtime_pb2.FeedMessage) else parse_feed(content)
+    entities = feed.entity
+    n = len(entities)
+
+    vehicle_id = np.empty(n, dtype=object)
+    trip_id = np.empty(n, dtype=object)
+    route_id = np.empty(n, dtype=object)
+    lat = np.empty(n, dtype=np.float64)
+    lon = np.empty(n, dtype=np.float64)
+    timestamp = np.zeros(n, dtype=np.int64)
+    keep = np.zeros(n, dtype=bool)
+
+    for i, ent in enumerate(entities):
+        if not ent.HasField("vehicle"):
+            continue
+        vp = ent.vehicle
+        if not vp.HasField("position"):
+            continue
+        pos = vp.position
+        lat[i] = pos.latitude
+        lon[i] = pos.longitude
+        timestamp[i] = vp.timestamp
+        vehicle_id[i] = vp.vehicle.id or None
+        trip_id[i] = vp.trip.trip_id or None
+        route_id[i] = vp.trip.route_id or None
+        keep[i] = True
+
+    if bbox is not None:
+        keep &= bbox_mask(lon, lat, bbox)
+
+    columns = {
+        "vehicle_id": vehicle_id[keep],
+        "trip_id": trip_id[keep],
+        "route_id": route_id[keep],
+        "lat": lat[keep],
+        "lon": lon[keep],
+        "timestamp": timestamp[keep],
+    }
+    return columns, feed.header.timestamp
+
+
+def decode_trip_updates(content):
+    """
+    Decode a TripUpdates feed into one row per StopTimeUpdate.
+
+    Returns:
+        DataFrame with trip_id, route_id, vehicle_id, stop_sequence, stop_id,
+        arrival_time, arrival_delay, departure_time, departure_delay. Times are
+        tz-aware datetimes in LOCAL_TZ, delays nullable integer seconds.
+    """
+    feed = content if isinstance(content, gtfs_realtime_pb2.FeedMessage) else parse_feed(content)
+
+    trip_id, route_id, vehicle_id, counts = [], [], [], []
+    stop_id = []
+    stop_sequence = array("q")
+    ints = {name: array("q") for name in ("arrival_time", "arrival_delay", "departure_time", "departure_delay")}
+    present = {name: array("b") for name in ints}
+
+    for ent in feed.entity:
+        if not ent.HasField("trip_update"):
+            continue
+        tu = ent.trip_update
+        trip_id.append(tu.trip.trip_id or None)
+        route_id.append(tu.trip.route_id or None)
+        vehicle_id.append(tu.vehicle.id or None)
+        counts.append(len(tu.stop_time_update))
+        for stu in tu.stop_time_update:
+            stop_sequence.append(stu.stop_sequence)
+            stop_id.append(stu.stop_id or None)
+            for prefix in ("arrival", "departure"):
+                has_event = stu.HasField(prefix)
+                event = getattr(stu, prefix)
+                has_time = has_event and event.HasField("time")
+                has_delay = has_event and event.HasField("delay")
+                ints[f"{prefix}_time"].append(event.time if has_time else 0)
+                ints[f"{prefix}_delay"].append(event.delay if has_delay else 0)
+                present[f"{prefix}_time"].append(has_time)
+                present[f"{prefix}_delay"].append(has_delay)
+
+    counts = np.asarray(counts, dtype=np.int64)
+    values = {name: np.frombuffer(col, dtype=np.int64) for name, col in ints.items()}
+    mask = {name: ~np.frombuffer(col, dtype=np.int8).astype(bool) for name, col in present.items()}
+
+    return pd.DataFrame({
+        "trip_id": np.repeat(np.asarray(trip_id, dtype=object), counts),
+        "route_id": np.repeat(np.asarray(route_id, dtype=object), counts),
+        "vehicle_id": np.repeat(np.asarray(vehicle_id, dtype=object), counts),
+        "stop_sequence": np.frombuffer(stop_sequence, dtype=np.int64),
+        "stop_id": np.asarray(stop_id, dtype=object),
+        "arrival_time": to_local_datetimes(np.where(mask["arrival_time"], 0, values["arrival_time"])),
+        "arrival_delay": pd.arrays.IntegerArray(values["arrival_delay"].copy(), mask["arrival_delay"]),
+        "departure_time": to_local_datetimes(np.where(mask["departure_time"], 0, values["departure_time"])),
+        "departure_delay": pd.arrays.IntegerArray(values["departure_delay"].copy(), mask["departure_delay"]),
+    })
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from src.trajectories import haversine_m
+
+# ---------------------------------------------
+# Streaming kinematics
+# ---------------------------------------------
+# Each new snapshot is aligned by vehicle with the previous one (the frame
+# this function returned last time, which is the whole state) and speed,
+# heading and stationary/dwell flags are computed with NumPy over the whole
+# fleet at once. Used by the live cache (src.live_cache) and the snapshot
+# archive (src.archive).
+#
+# A vehicle whose report time did not change keeps its previous values;
+# steps shorter than STATIONARY_M count as standing still (GPS jitter) and
+# keep the previous heading; speeds above MAX_SPEED_KMH are position jumps
+# and are left empty. A standing vehicle only moves again once it is more
+# than STATIONARY_EXIT_M from where it stopped, so jitter around the
+# STATIONARY_M threshold does not flip the flag on every report.
+
+STATIONARY_M = 15.0      # displacement below which a vehicle is standing
+STATIONARY_EXIT_M = 30.0 # distance from the stop place at which it moves again
+MAX_SPEED_KMH = 130.0    # faster steps are GPS glitches
+KINEMATICS_COLUMNS = ["distance_m", "dt_s", "speed_kmh", "heading_deg", "stationary", "dwell_s"]
+
+
+def bearing_deg(lat1, lon1, lat2, lon2):
+    """Initial bearing in degrees (0 = north, clockwise) between arrays of points."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    dlon = lon2 - lon1
+    x = np.sin(dlon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(dlon)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+
+def _seconds(times):
+    """Float seconds since the epoch (NaN for missing) of a Series of timestamps."""
+    times = pd.to_datetime(times, utc=True)
+    return np.where(times.isna(), np.nan, times.dt.tz_convert(None).to_numpy().astype("datetime64[ms]").astype(float) / 1000)
+
+
+def update_kinematics(current, previous=None, time_col="timestamp", stationary_m=STATIONARY_M,
+                      stationary_exit_m=STATIONARY_EXIT_M, max_speed_kmh=MAX_SPEED_KMH):
+    """
+    Add KINEMATICS_COLUMNS to `current` (one row per vehicle, indexed by its
+    key) against `previous`, the frame returned for the previous snapshot.
+
+    Returns:
+        Copy of `current` with distance_m, dt_s (since the previous report),
+        speed_kmh, heading_deg, stationary and dwell_s (seconds standing at
+        the current place), plus the internal dwell_since, dwell_lat and
+        dwell_lon columns (when and where it stopped). It is also the
+        `previous` of the next call.
+    """
+    out = current[~current.index.duplicated(keep="last")].copy()
+    t1 = _seconds(out[time_col])
+    if previous is None or previous.empty:
+        prev = pd.DataFrame(index=out.index, dtype=float,
+                            columns=["lat", "lon", "speed_kmh", "heading_deg", "dwell_since", "dwell_lat", "dwell_lon"])
+        prev["stationary"] = False
+        t0 = np.full(len(out), np.nan)
+    else:
+        prev = previous.reindex(out.index)
+        t0 = _seconds(prev[time_col])
+
+    lat0, lon0 = prev["lat"].to_numpy(dtype=float), prev["lon"].to_numpy(dtype=float)
+    lat1, lon1 = out["lat"].to_numpy(dtype=float), out["lon"].to_numpy(dtype=float)
+    dt = t1 - t0
+    dist = haversine_m(lat0, lon0, lat1, lon1)
+    fresh = dt > 0                     # a new report (NaN → False)
+    same = dt == 0                     # the same report again: carry values over
+    prev_stationary = prev["stationary"].fillna(False).to_numpy(dtype=bool)
+    dwell_lat0, dwell_lon0 = prev["dwell_lat"].to_numpy(dtype=float), prev["dwell_lon"].to_numpy(dtype=float)
+    # Hysteresis: stopping takes a short step, moving on takes leaving the stop place
+    from_stop = haversine_m(dwell_lat0, dwell_lon0, lat1, lon1)
+    stays = prev_stationary & ((from_stop < stationary_exit_m) | (dist < stationary_m))
+    standing = fresh & (stays | (dist < stationary_m))
+    moving = fresh & ~standing
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        speed = np.where(fresh, dist / dt * 3.6, np.nan)
+    speed[standing] = 0.0
+    speed[speed > max_speed_kmh] = np.nan
+    prev_speed = prev["speed_kmh"].to_numpy(dtype=float)
+    prev_heading = prev["heading_deg"].to_numpy(dtype=float)
+    speed = np.where(same, prev_speed, speed)
+
+    heading = np.where(moving, bearing_deg(lat0, lon0, lat1, lon1), prev_heading)
+    stationary = np.where(same, prev_stationary, standing)
+
+    # Standing since (and where) the previous report, or whenever it stopped before
+    kept = stationary & prev_stationary
+    dwell_since = np.where(kept, prev["dwell_since"].to_numpy(dtype=float), t0)
+    dwell_since = np.where(stationary, dwell_since, np.nan)
+    dwell_lat = np.where(stationary, np.where(kept, dwell_lat0, lat0), np.nan)
+    dwell_lon = np.where(stationary, np.where(kept, dwell_lon0, lon0), np.nan)
+
+    out["distance_m"] = np.where(fresh, dist, np.nan)
+    out["dt_s"] = dt
+    out["speed_kmh"] = speed
+    out["heading_deg"] = heading
+    out["stationary"] = stationary
+    out["dwell_s"] = np.where(stationary, t1 - dwell_since, 0.0)
+    out["dwell_since"] = dwell_since
+    out["dwell_lat"] = dwell_lat
+    out["dwell_lon"] = dwell_lon
+    return out
+
+
+def add_kinematics(df, previous=None, key="vehicle_id", time_col="timestamp"):
+    """
+    Kinematics for a frame with a `key` column (rows kept as they are; a
+    repeated key gets the values of its last row).
+
+    Returns:
+        (df with KINEMATICS_COLUMNS, state to pass as `previous` next time)
+    """
+    if df.empty or key not in df.columns:
+        return df, previous
+    state = update_kinematics(df.dropna(subset=[key]).set_index(key), previous, time_col)
+    return df.join(state[KINEMATICS_COLUMNS], on=key), state
@@ -0,0 +1,131 @@
+import math
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from src.static_layers import get_derived, layer_version
+
+# ---------------------------------------------
+# Line geometries for rendering
+# ---------------------------------------------
+# Route geometries are sent to the browser as GeoJSON. Instead of the full
+# source precision, each line is prepared at a few levels of detail: simplified
+# with a tolerance well below one screen pixel at the level's zoom and rounded
+# to the decimals that still resolve a fraction of that pixel. The levels of a
+# static layer are built once (src.static_layers.get_derived); a map picks the
+# level that matches its zoom and the extent of the selected lines.
+
+# (max zoom, tolerance in degrees, decimals); one pixel is ~0.0014° at zoom 10,
+# ~0.00034° at zoom 12 and ~0.000086° at zoom 14. The last level only drops
+# vertices that move the line by less than ~0.5 m.
+LINE_LEVELS = (
+    (10, 0.0005, 4),
+    (12, 0.00012, 5),
+    (14, 0.00003, 5),
+    (None, 0.000005, 6),
+)
+ZOOM_HEADROOM = 1          # levels of zoom-in before the detail becomes visibly coarse
+VIEWPORT_PX = (1000, 700)  # width, height used to estimate the zoom that fits an extent
+MAX_FIT_ZOOM = 16
+
+
+def level_for_zoom(zoom):
+    """Index in LINE_LEVELS of the coarsest level good enough at `zoom`."""
+    for i, (max_zoom, _, _) in enumerate(LINE_LEVELS):
+        if max_zoom is None or zoom <= max_zoom:
+            return i
+    return len(LINE_LEVELS) - 1
+
+
+def fit_zoom(bounds, viewport=VIEWPORT_PX):
+    """Web-mercator zoom at which `bounds` (minx, miny, maxx, maxy in degrees) fill the viewport."""
+    minx, miny, maxx, maxy = bounds
+    if not np.isfinite([minx, miny, maxx, maxy]).all():
+        return 0
+    # Degrees of latitude are stretched by 1 / cos(lat) in web mercator
+    stretch = 1 / max(math.cos(math.radians((miny + maxy) / 2)), 1e-6)
+    width, height = max(maxx - minx, 1e-9), max((maxy - miny) * stretch, 1e-9)
+    zoom = math.log2(min(viewport[0] / width, viewport[1] / height) * 360 / 256)
+    return int(min(max(math.floor(zoom), 0), MAX_FIT_ZOOM))
+
+
+def pick_level(lines_gdf, zoom):
+    """Level for a map opened at `zoom` showing `lines_gdf` (the finer of zoom and extent)."""
+    if lines_gdf.empty:
+        return level_for_zoom(zoom)
+    zoom = max(zoom, fit_zoom(lines_gdf.total_bounds))
+    return level_for_zoom(zoom + ZOOM_HEADROOM)
+
+
+def simplify_geometries(geometries, level, preserve_topology=False):
+    """
+    Geometries (array-like, EPSG:4326) simplified and quantized for
+    LINE_LEVELS[level]. Use preserve_topology=True for polygons.
+    """
+    _, tolerance, decimals = LINE_LEVELS[level]
+    geometries = np.asarray(geometries, dtype=object)
+    if tolerance > 0:
+        geometries = shapely.simplify(geometries, tolerance, preserve_topology=preserve_topology)
+    # np.round keeps the shortest decimal repr, so the JSON holds `decimals` digits
+    return shapely.transform(geometries, lambda coords: np.round(coords, decimals))
+
+
+def build_line_levels(lines_gdf):
+    """List with one GeoSeries per level of LINE_LEVELS, aligned with `lines_gdf`."""
+    return [
+        gpd.GeoSeries(simplify_geometries(lines_gdf.geometry.values, level), index=lines_gdf.index, crs=lines_gdf.crs)
+        for level in range(len(LINE_LEVELS))
+    ]
+
+
+def _build_prebuilt(lines_gdf):
+    """(levels of build_line_levels, geometry objects per row) of a static layer."""
+    geometries = pd.Series(lines_gdf.geometry.values.to_numpy(), index=lines_gdf.index, dtype=object)
+    return build_line_levels(lines_gdf), geometries
+
+
+def _same_objects(a, b):
+    """True when `a` and `b` hold the very same objects, position by position."""
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+
+def _prebuilt_levels(lines_gdf):
+    """
+    Prebuilt levels of the static layer named in the attrs of `lines_gdf`
+    when its rows are rows of that layer with their original index and
+    geometry, else None. pandas carries attrs over to derived frames
+    (reset_index, explode, to_crs, ...), so the tag alone does not prove the
+    levels line up: the layer version and the index must match, and every
+    row must still hold the geometry object of that layer row (row subsets
+    share them; an identity check costs far less than comparing shapes).
+    """
+    name = lines_gdf.attrs.get("static_layer")
+    if name is None or lines_gdf.crs != "EPSG:4326" or not lines_gdf.index.is_unique:
+        return None
+    try:
+        if lines_gdf.attrs.get("static_layer_version") != layer_version(name):
+            return None
+    except FileNotFoundError:
+        return None
+    levels, geometries = get_derived(name, "line_levels", _build_prebuilt)
+    if not lines_gdf.index.isin(geometries.index).all():
+        return None
+    if not _same_objects(lines_gdf.geometry.values.to_numpy(), geometries.loc[lines_gdf.index].to_numpy()):
+        return None
+    return levels
+
+
+def lines_for_zoom(lines_gdf, zoom):
+    """
+    `lines_gdf` with the geometry of the level picked for `zoom`. Rows of a
+    static layer (src.static_layers.load_layer, or a row subset of it) use
+    the prebuilt levels; other frames are simplified on the fly.
+    """
+    level = pick_level(lines_gdf, zoom)
+    prebuilt = _prebuilt_levels(lines_gdf)
+    if prebuilt is not None:
+        geometries = prebuilt[level].loc[lines_gdf.index].values
+    else:
+        geometries = simplify_geometries(lines_gdf.geometry.values, level)
+    geometry = gpd.GeoSeries(geometries, index=lines_gdf.index, crs=lines_gdf.crs)
+    return lines_gdf.assign(**{lines_gdf.geometry.name: geometry})
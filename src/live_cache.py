@@ -0,0 +1,224 @@
+import threading
+import time
+from collections import deque
+import pandas as pd
+from src.config import LIVE_SOURCE
+from src.kinematics import add_kinematics
+from src.map_matching import match_bus_positions
+from src.static_layers import layer_version
+from src.vehicles import DEFAULT_FEEDS, VEHICLE_COLUMNS, load_positions_all
+
+# ---------------------------------------------
+# Process-wide live feed cache
+# ---------------------------------------------
+# One background thread polls the feeds; every Streamlit session/rerun reads
+# the latest parsed frames from memory instead of downloading them again.
+# Frames handed out are shared between sessions: treat them as read-only.
+# Each new frame gets speed, heading and dwell columns against the previous
+# frame of the same feed (src.kinematics), and feeds with a matcher in
+# ROUTE_MATCHERS get their position along the route (src.map_matching).
+# Both run in the refresh thread outside the lock the readers take; a
+# matcher error serves that feed unmatched and counts as an error. A shared
+# snapshot (src.shared_snapshot) is only processed once per version.
+
+REFRESH_INTERVAL = 30  # seconds between polls
+HISTORY_SIZE = 10      # recent snapshots kept per feed
+FEED_TIMEOUT = 10      # seconds per feed and poll
+SHARED_POLL_INTERVAL = 2  # seconds between checks for a new shared snapshot
+ROUTE_MATCHERS = {"bus": (match_bus_positions, "bus_lines")}  # feed -> (matcher, static layer)
+
+
+def _feed_timestamp(df):
+    """The feed's own time for a frame: newest vehicle timestamp."""
+    if df.empty or "timestamp" not in df or df["timestamp"].isna().all():
+        return None
+    return df["timestamp"].max()
+
+
+def _snapshot_version(timing):
+    """(version, published_at) of a shared snapshot from its timings row (None for upstream polls)."""
+    if timing.get("version") is None or pd.isna(timing.get("version")):
+        return None
+    return timing["version"], timing.get("published_at")
+
+
+def _layer_version_or_none(layer):
+    try:
+        return layer_version(layer)
+    except FileNotFoundError:
+        return None
+
+
+class LiveFeedCache:
+    """
+    Latest frame per feed plus a ring buffer of recent snapshots, kept fresh
+    by a daemon thread.
+
+    Args:
+        feeds: Dict name -> (url, parse_function, extra_args), as taken by
+            src.vehicles.load_positions_all.
+        interval: Seconds between polls.
+        history: Snapshots kept per feed (keyed by the feed's own timestamp).
+        timeout: Per-feed timeout of each poll.
+        loader: Function (feeds, timeout) -> (frames, timings). Defaults to
+            polling upstream with load_positions_all; see
+            src.shared_snapshot.load_shared_snapshots for the multi-worker one.
+    """
+
+    def __init__(self, feeds=DEFAULT_FEEDS, interval=REFRESH_INTERVAL,
+                 history=HISTORY_SIZE, timeout=FEED_TIMEOUT, loader=None):
+        self.feeds = feeds
+        self.loader = loader or (lambda feeds, timeout: load_positions_all(feeds, timeout=timeout))
+        self.interval = interval
+        self.timeout = timeout
+        self._lock = threading.Lock()          # shared state read by the sessions
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self._latest = {}  # name -> {"frame", "feed_ts", "fetched_at", "version"}
+        self._history = {name: deque(maxlen=history) for name in feeds}
+        self._kinematics = {}  # name -> kinematics state of the last frame
+        self._no_routes = {}  # feed -> version of its route layer when matching failed
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+        self._timings = pd.DataFrame()
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- refresher ------------------------------------------------------
+    def start(self):
+        """Start the background refresher (no-op if already running)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-feed-cache", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ Live cache refresh failed: {e}")
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        """Poll every feed once and store the results."""
+        frames, timings = self.loader(self.feeds, self.timeout)
+        now = time.time()
+        # Derived columns are computed outside self._lock so readers are never
+        # blocked by them; the refresh lock keeps the kinematics state serial
+        with self._refresh_lock:
+            fresh, errors = {}, 0
+            feed_timings = {t["feed"]: t for t in timings.to_dict("records")}
+            for name, df in frames.items():
+                timing = feed_timings.get(name, {})
+                if not pd.isna(timing.get("error")):
+                    # Keep serving the previous frame; staleness shows the age
+                    errors += 1
+                    continue
+                version = _snapshot_version(timing)
+                if version is not None and self._latest.get(name, {}).get("version") == version:
+                    continue  # shared snapshot already processed
+                df, state = add_kinematics(df, self._kinematics.get(name))
+                try:
+                    df = self._match_routes(name, df)
+                except Exception as e:
+                    # One feed's matcher must not cost the other feeds their poll
+                    print(f"❌ Route matching failed for {name}: {e}")
+                    errors += 1
+                fresh[name] = (df, state, version)
+
+            with self._lock:
+                for name, (df, state, version) in fresh.items():
+                    # The kinematics state moves on only with the frame it belongs to
+                    self._kinematics[name] = state
+                    feed_ts = _feed_timestamp(df)
+                    self._latest[name] = {"frame": df, "feed_ts": feed_ts, "fetched_at": now, "version": version}
+                    ring = self._history[name]
+                    if not ring or ring[-1][0] != feed_ts:
+                        ring.append((feed_ts, df))
+                self._timings = timings
+                self._stats["errors"] += errors
+                self._stats["refreshes"] += 1
+        self._ready.set()
+
+    def _match_routes(self, name, df):
+        if name not in ROUTE_MATCHERS or df.empty:
+            return df
+        matcher, layer = ROUTE_MATCHERS[name]
+        version = _layer_version_or_none(layer)
+        if name in self._no_routes and self._no_routes[name] == version:
+            return df
+        try:
+            df = matcher(df)
+        except FileNotFoundError as e:
+            # Route layer not available: serve positions unmatched until it changes
+            print(f"⚠️  No route matching for {name}: {e}")
+            self._no_routes[name] = version
+            return df
+        self._no_routes.pop(name, None)
+        return df
+
+    # ---- readers --------------------------------------------------------
+    def get(self, name, wait=None):
+        """
+        Latest frame for feed `name`. If nothing has been fetched yet, wait
+        up to `wait` seconds (default: the feed timeout) for the first poll.
+        """
+        with self._lock:
+            entry = self._latest.get(name)
+            self._stats["hits" if entry is not None else "misses"] += 1
+        if entry is None:
+            self.start()
+            self._ready.wait(self.timeout + 1 if wait is None else wait)
+            with self._lock:
+                entry = self._latest.get(name)
+        if entry is None:
+            return pd.DataFrame(columns=VEHICLE_COLUMNS)
+        return entry["frame"]
+
+    def history(self, name):
+        """Recent snapshots for `name`, oldest first, as (feed_ts, frame)."""
+        with self._lock:
+            return list(self._history.get(name, ()))
+
+    def staleness(self, name):
+        """Seconds since `name` was last fetched successfully (None if never)."""
+        with self._lock:
+            entry = self._latest.get(name)
+        return None if entry is None else time.time() - entry["fetched_at"]
+
+    def stats(self):
+        """Hit/miss/refresh/error counters, per-feed staleness and last timings."""
+        with self._lock:
+            stats = dict(self._stats)
+            timings = self._timings
+        stats["staleness_s"] = {name: self.staleness(name) for name in self.feeds}
+        stats["timings"] = timings
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_live_cache():
+    """
+    The process-wide LiveFeedCache, started on first use. With
+    LIVE_SOURCE="shared" it follows the snapshots of the shared publisher
+    instead of polling upstream.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            if LIVE_SOURCE == "shared":
+                from src.shared_snapshot import load_shared_snapshots
+                _cache = LiveFeedCache(loader=load_shared_snapshots, interval=SHARED_POLL_INTERVAL)
+            else:
+                _cache = LiveFeedCache()
+            _cache.start()
+    return _cache
@@ -0,0 +1,139 @@
+import json
+import pandas as pd
+from src.config import PROJ_ROOT
+from src.decorations import get_decoration
+from src.static_layers import layer_version
+
+# ---------------------------------------------
+# Live vehicle map (Streamlit custom component)
+# ---------------------------------------------
+# The Folium maps are rebuilt and shipped as a new iframe on every rerun,
+# which also resets pan and zoom. This component (src/live_map_component) stays
+# mounted across reruns: the base map and static layers are sent once, and
+# every rerun only sends the vehicles added, moved and removed since the
+# previous one, keyed by "<mode>:<vehicle_id>".
+#
+# Protocol: every message carries `seq` and `prev_seq`. The browser applies a
+# delta only if `prev_seq` is the last seq it applied; otherwise (new iframe,
+# missed message) it asks for a resync through the component value and the
+# next run sends the full state. A rerun without changes only sends the
+# current `seq`.
+
+FRONTEND_DIR = PROJ_ROOT / "src" / "live_map_component"
+COORD_DECIMALS = 6
+
+_component = None
+
+
+def _get_component():
+    global _component
+    if _component is None:
+        import streamlit.components.v1 as components
+        _component = components.declare_component("live_map", path=str(FRONTEND_DIR))
+    return _component
+
+
+# ======================================================
+# 1) PAYLOADS
+# ======================================================
+def vehicle_table(df_vehicles, label_cols=("vehicle_id",)):
+    """
+    Frame indexed by "<mode>:<vehicle_id>" with lat, lon (rounded), mode and
+    a popup label of the non-null `label_cols`. Rows without position or
+    vehicle_id are dropped; for repeated ids the last report wins.
+    """
+    df = df_vehicles.dropna(subset=["lat", "lon", "vehicle_id"])
+    mode = df["mode"].astype(str) if "mode" in df.columns else pd.Series("", index=df.index)
+    label = mode.str.upper()
+    for col in label_cols:
+        if col in df.columns:
+            label = label.where(df[col].isna(), label + " — " + df[col].astype(str))
+    table = pd.DataFrame({
+        "lat": df["lat"].to_numpy(dtype=float).round(COORD_DECIMALS),
+        "lon": df["lon"].to_numpy(dtype=float).round(COORD_DECIMALS),
+        "mode": mode.to_numpy(),
+        "label": label.to_numpy(),
+    }, index=(mode + ":" + df["vehicle_id"].astype(str)).to_numpy())
+    return table[~table.index.duplicated(keep="last")]
+
+
+def vehicle_delta(previous, current):
+    """
+    Difference between two vehicle_table frames as compact lists:
+    added [[key, lat, lon, mode, label]], moved [[key, lat, lon, label]],
+    removed [key].
+    """
+    added = current.index.difference(previous.index)
+    removed = previous.index.difference(current.index)
+    common = current.index.intersection(previous.index)
+    before, after = previous.loc[common], current.loc[common]
+    changed = (
+        (before["lat"].to_numpy() != after["lat"].to_numpy())
+        | (before["lon"].to_numpy() != after["lon"].to_numpy())
+        | (before["label"].to_numpy() != after["label"].to_numpy())
+    )
+    moved = after[changed]
+    return {
+        "added": current.loc[added].reset_index().to_numpy().tolist(),
+        "moved": moved[["lat", "lon", "label"]].reset_index().to_numpy().tolist(),
+        "removed": removed.tolist(),
+    }
+
+
+def base_layers(zoom):
+    """Static layers of the live map (sent once per browser) and their version."""
+    return {"boundary": get_decoration("boundary", zoom)}, str(layer_version("boundary"))
+
+
+# ======================================================
+# 2) STREAMLIT COMPONENT
+# ======================================================
+def live_map(df_vehicles, mode_colors=None, map_center=(43.25, -2.93), zoom_start=10,
+             radius=6, height=700, key="live_map"):
+    """
+    Render (or update) the live vehicle map. Must be called with the same
+    `key` on every rerun so the browser keeps the mounted map.
+
+    Returns:
+        Size of the message sent to the browser, in bytes (for the stats panel).
+    """
+    import streamlit as st
+
+    if mode_colors is None:
+        mode_colors = {"bus": "green", "metro": "orange", "renfe": "purple"}
+
+    state = st.session_state.setdefault(f"{key}__state", {"seq": 0, "table": None, "resync": None,
+                                                              "base_version": None})
+    client = st.session_state.get(key) or {}
+    base, base_version = base_layers(zoom_start)
+    table = vehicle_table(df_vehicles)
+
+    resync = client.get("resync")
+    full = (
+        state["table"] is None
+        or base_version != state["base_version"]
+        or (resync is not None and resync != state["resync"])
+    )
+    if full:
+        state.update(resync=resync, base_version=base_version)
+        delta = vehicle_delta(table.iloc[:0], table)
+    else:
+        delta = vehicle_delta(state["table"], table)
+
+    if full or any(delta.values()):
+        args = {
+            "seq": state["seq"] + 1,
+            "prev_seq": None if full else state["seq"],
+            "full": full,
+            "delta": delta,
+            "base": base if full else None,
+            "options": {"center": list(map_center), "zoom": zoom_start, "radius": radius,
+                        "colors": mode_colors, "height": height},
+        }
+        state.update(seq=args["seq"], table=table)
+    else:
+        # No change: only the current seq, which the browser has already applied
+        args = {"seq": state["seq"], "delta": {}}
+
+    _get_component()(**args, key=key, default=None)
+    return len(json.dumps(args, default=str))
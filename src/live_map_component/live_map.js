@@ -0,0 +1,135 @@
+//-----------------------------------------------------
+// Live vehicle map: Streamlit component (see src/live_map.py)
+//-----------------------------------------------------
+// The map is created once per iframe. Each render message carries a delta
+// (added / moved / removed vehicles); markers are updated in place so pan,
+// zoom and open popups survive reruns.
+
+let map = null;
+let boundaryLayer = null;
+let options = null;
+let appliedSeq = null;
+const layers = {};   // mode -> L.layerGroup
+const markers = {};  // "<mode>:<vehicle_id>" -> L.circleMarker
+
+//-----------------------------------------------------
+// Streamlit component protocol (no build step)
+//-----------------------------------------------------
+function sendMessage(type, data) {
+  window.parent.postMessage(
+    Object.assign({ isStreamlitMessage: true, type: type }, data),
+    "*"
+  );
+}
+
+function setComponentValue(value) {
+  sendMessage("streamlit:setComponentValue", { value: value, dataType: "json" });
+}
+
+function setFrameHeight(height) {
+  sendMessage("streamlit:setFrameHeight", { height: height });
+}
+
+window.addEventListener("message", (event) => {
+  if (event.data.type === "streamlit:render") {
+    onRender(event.data.args);
+  }
+});
+
+sendMessage("streamlit:componentReady", { apiVersion: 1 });
+
+//-----------------------------------------------------
+// Map
+//-----------------------------------------------------
+function createMap(opts) {
+  options = opts;
+  setFrameHeight(opts.height);
+  map = L.map("map", { preferCanvas: true }).setView(opts.center, opts.zoom);
+  L.tileLayer("https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png", {
+    attribution: "&copy; OpenStreetMap contributors &copy; CARTO",
+    maxZoom: 19,
+  }).addTo(map);
+
+  const overlays = {};
+  for (const [mode, color] of Object.entries(opts.colors)) {
+    layers[mode] = L.layerGroup().addTo(map);
+    overlays[`<span style="color:${color}; font-size:20px;">●</span> ${mode}`] = layers[mode];
+  }
+  L.control.layers(null, overlays, { collapsed: false }).addTo(map);
+}
+
+function setBase(base) {
+  if (boundaryLayer) boundaryLayer.remove();
+  // Decorations arrive as pre-serialized GeoJSON strings
+  boundaryLayer = L.geoJSON(JSON.parse(base.boundary), {
+    style: { color: "orange", weight: 2, fillColor: "orange", fillOpacity: 0.05 },
+    interactive: false,
+  }).addTo(map);
+}
+
+function layerFor(mode) {
+  if (!layers[mode]) layers[mode] = L.layerGroup().addTo(map);
+  return layers[mode];
+}
+
+function clearVehicles() {
+  for (const key of Object.keys(markers)) {
+    markers[key].remove();
+    delete markers[key];
+  }
+}
+
+function popupContent(label) {
+  // Labels come from the feeds: shown as text, never parsed as HTML
+  const span = document.createElement("span");
+  span.textContent = label;
+  return span;
+}
+
+function applyDelta(delta) {
+  for (const [key, lat, lon, mode, label] of delta.added) {
+    if (markers[key]) markers[key].remove();
+    const color = options.colors[mode] || "gray";
+    markers[key] = L.circleMarker([lat, lon], {
+      radius: options.radius,
+      color: color,
+      fillColor: color,
+      fillOpacity: 0.8,
+    })
+      .bindPopup(popupContent(label))
+      .addTo(layerFor(mode));
+  }
+  for (const [key, lat, lon, label] of delta.moved) {
+    const marker = markers[key];
+    if (!marker) continue;
+    marker.setLatLng([lat, lon]);
+    marker.setPopupContent(popupContent(label));
+  }
+  for (const key of delta.removed) {
+    if (markers[key]) {
+      markers[key].remove();
+      delete markers[key];
+    }
+  }
+}
+
+function onRender(args) {
+  if (args.seq === appliedSeq) return; // unchanged rerun
+  if (!args.options) {
+    // Unchanged rerun, but this iframe never applied that seq: ask for the full state
+    setComponentValue({ resync: `${Date.now()}-${Math.random()}` });
+    return;
+  }
+  if (map === null) createMap(args.options);
+
+  if (args.full) {
+    if (args.base) setBase(args.base);
+    clearVehicles();
+  } else if (args.prev_seq !== appliedSeq || boundaryLayer === null) {
+    // Missed a message or the iframe was re-created: ask for the full state
+    setComponentValue({ resync: `${Date.now()}-${Math.random()}` });
+    return;
+  }
+  applyDelta(args.delta);
+  appliedSeq = args.seq;
+}
@@ -0,0 +1,250 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from src.config import LIVE_STREAM_HOST, LIVE_STREAM_PORT, PROJ_ROOT
+from src.live_map import vehicle_delta, vehicle_table
+from src.vehicles import DEFAULT_FEEDS, load_positions_all, parse_positions_bus
+
+# ---------------------------------------------
+# Push-based live position stream (Server-Sent Events)
+# ---------------------------------------------
+# One poller thread fetches the feeds with src.vehicles.load_positions_all,
+# so upstream requests do not depend on the number of viewers. Each poll is
+# diffed against the previous one (src.live_map.vehicle_delta) and the delta
+# is encoded once as an SSE message and queued to every connected client.
+# A client gets the full snapshot when it connects (unless its Last-Event-ID
+# is already current) and then only deltas. The page it serves
+# (src/live_stream_client) moves its markers in place; public/ stays the
+# static GitLab Pages map, which has no /events endpoint.
+
+REFRESH_INTERVAL = 15  # seconds between upstream polls
+FEED_TIMEOUT = 10
+KEEPALIVE = 15         # seconds between SSE comments on an idle connection
+QUEUE_SIZE = 64        # messages buffered per client before it is dropped
+LABEL_COLS = ("line_id", "vehicle_id")
+CLIENT_DIR = PROJ_ROOT / "src" / "live_stream_client"
+STATIC_FILES = {
+    "/": ("index.html", "text/html; charset=utf-8"),
+    "/index.html": ("index.html", "text/html; charset=utf-8"),
+    "/map.js": ("map.js", "application/javascript; charset=utf-8"),
+}
+
+
+def sse_message(event, seq, payload):
+    """One SSE message (bytes)."""
+    data = json.dumps(payload, separators=(",", ":"), default=str)
+    return f"id: {seq}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class LiveStream:
+    """
+    Polls `feeds` and fans vehicle deltas out to subscribers.
+
+    Args:
+        feeds: Dict name -> (url, parse_function, extra_args), as taken by
+            src.vehicles.load_positions_all.
+        interval: Seconds between polls.
+        timeout: Per-feed timeout of each poll.
+        loader: Function (feeds, timeout) -> (frames, timings); defaults to
+            load_positions_all.
+    """
+
+    def __init__(self, feeds=DEFAULT_FEEDS, interval=REFRESH_INTERVAL, timeout=FEED_TIMEOUT, loader=None):
+        self.feeds = feeds
+        self.loader = loader or (lambda feeds, timeout: load_positions_all(feeds, timeout=timeout))
+        self.interval = interval
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._frames = {}        # feed -> last good frame
+        self._table = vehicle_table(pd.DataFrame(columns=["vehicle_id", "lat", "lon", "mode"]))
+        self._seq = 0
+        self._snapshot = sse_message("snapshot", 0, {"seq": 0, "vehicles": []})
+        self._clients = set()
+        self._stats = {"polls": 0, "errors": 0, "deltas": 0, "dropped": 0, "delta_bytes": 0, "snapshot_bytes": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- poller ---------------------------------------------------------
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="live-stream", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Live stream poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """Fetch every feed once and broadcast what changed."""
+        frames, timings = self.loader(self.feeds, self.timeout)
+        failed = set(timings.loc[timings["error"].notna(), "feed"])
+        with self._lock:
+            self._stats["polls"] += 1
+            self._stats["errors"] += len(failed)
+            # A failing feed keeps its previous vehicles instead of removing them
+            self._frames.update({name: df for name, df in frames.items() if name not in failed})
+            current = [df for df in self._frames.values() if not df.empty]
+        table = vehicle_table(pd.concat(current, ignore_index=True) if current else
+                              pd.DataFrame(columns=["vehicle_id", "lat", "lon", "mode"]), LABEL_COLS)
+
+        delta = vehicle_delta(self._table, table)
+        if not any(delta.values()):
+            return
+        with self._lock:
+            self._seq += 1
+            self._table = table
+            message = sse_message("delta", self._seq, {"seq": self._seq, **delta})
+            self._snapshot = sse_message("snapshot", self._seq, {
+                "seq": self._seq, "vehicles": table.reset_index().to_numpy().tolist(),
+            })
+            self._stats["deltas"] += 1
+            self._stats["delta_bytes"] = len(message)
+            self._stats["snapshot_bytes"] = len(self._snapshot)
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # Too slow to keep up: drop it; EventSource reconnects and gets a snapshot
+                self.unsubscribe(client)
+                with client.mutex:
+                    client.queue.clear()
+                client.put_nowait(None)
+                with self._lock:
+                    self._stats["dropped"] += 1
+
+    # ---- subscribers ----------------------------------------------------
+    def subscribe(self, last_event_id=None):
+        """(queue of SSE messages, first message or None if the client is up to date)."""
+        client = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._clients.add(client)
+            current = last_event_id is not None and last_event_id == str(self._seq)
+            return client, None if current else self._snapshot
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "seq": self._seq, "clients": len(self._clients), "vehicles": len(self._table)}
+
+
+class StreamRequestHandler(BaseHTTPRequestHandler):
+    stream = None  # LiveStream, set by make_server
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/events":
+            return self._events()
+        if path == "/stats":
+            return self._send(200, json.dumps(self.stream.stats()).encode(), "application/json")
+        if path in STATIC_FILES:
+            name, content_type = STATIC_FILES[path]
+            return self._send(200, (CLIENT_DIR / name).read_bytes(), content_type)
+        return self._send(404, b"not found", "text/plain")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _events(self):
+        client, first = self.stream.subscribe(self.headers.get("Last-Event-ID"))
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("X-Accel-Buffering", "no")
+            self.end_headers()
+            self.wfile.write(f"retry: {REFRESH_INTERVAL * 1000}\n\n".encode())
+            if first is not None:
+                self.wfile.write(first)
+            self.wfile.flush()
+            while True:
+                try:
+                    message = client.get(timeout=KEEPALIVE)
+                except queue.Empty:
+                    message = b": keepalive\n\n"
+                if message is None:  # dropped by the poller
+                    break
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.stream.unsubscribe(client)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(stream, host=LIVE_STREAM_HOST, port=LIVE_STREAM_PORT):
+    handler = type("Handler", (StreamRequestHandler,), {"stream": stream})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+# ======================================================
+# LOCAL STAND-IN FEED
+# ======================================================
+def start_standin_feed(port=0, n_vehicles=300, step_s=REFRESH_INTERVAL):
+    """
+    Serve a synthetic SIRI-VM feed (scripts.benchmark_siri) whose vehicles
+    move every `step_s` seconds. Returns its URL.
+    """
+    from scripts.benchmark_siri import make_synthetic_feed
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = make_synthetic_feed(n_vehicles, step=int(time.time() // step_s))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/xml")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, name="standin-feed", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/bizkaibus-vehicle-positions.xml"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push live vehicle positions to the public map over SSE.")
+    parser.add_argument("--port", type=int, default=LIVE_STREAM_PORT)
+    parser.add_argument("--interval", type=float, default=REFRESH_INTERVAL, help="seconds between polls")
+    parser.add_argument("--standin", action="store_true", help="poll a local synthetic bus feed")
+    parser.add_argument("--vehicles", type=int, default=300, help="vehicles in the stand-in feed")
+    args = parser.parse_args()
+
+    feeds = DEFAULT_FEEDS
+    if args.standin:
+        url = start_standin_feed(n_vehicles=args.vehicles, step_s=args.interval)
+        feeds = {"bus": (url, parse_positions_bus, ())}
+        print(f"Stand-in feed at {url}")
+
+    live = LiveStream(feeds, interval=args.interval).start()
+    server = make_server(live, port=args.port)
+    print(f"Serving the live map on http://{LIVE_STREAM_HOST}:{args.port}/ (events at /events)")
+    server.serve_forever()
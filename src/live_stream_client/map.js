@@ -0,0 +1,96 @@
+//-----------------------------------------------------
+// CONFIG
+//-----------------------------------------------------
+// Positions are pushed by `python -m src.live_stream` (Server-Sent Events),
+// which polls the feeds once for every viewer: a snapshot on connect, then
+// only the vehicles added, moved and removed.
+const EVENTS_URL = "/events";
+
+const MODE_COLORS = { bus: "green", metro: "orange", renfe: "purple" };
+
+let map = L.map("map", { preferCanvas: true }).setView([43.25, -2.93], 10);
+
+L.tileLayer("https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png", {
+  maxZoom: 19
+}).addTo(map);
+
+let vehicleLayer = L.layerGroup().addTo(map);
+const markers = {}; // "<mode>:<vehicle_id>" -> L.circleMarker
+let lastSeq = null;
+
+//-----------------------------------------------------
+// Apply snapshot / deltas, moving markers in place
+//-----------------------------------------------------
+function popupContent(label) {
+  // Labels come from the feeds: shown as text, never parsed as HTML
+  const span = document.createElement("span");
+  span.textContent = label;
+  return span;
+}
+
+function addVehicle([key, lat, lon, mode, label]) {
+  if (markers[key]) markers[key].remove();
+  const color = MODE_COLORS[mode] || "gray";
+  markers[key] = L.circleMarker([lat, lon], {
+    radius: 6,
+    color: color,
+    fillColor: color,
+    fillOpacity: 0.8
+  })
+    .bindPopup(popupContent(label))
+    .addTo(vehicleLayer);
+}
+
+function applySnapshot(msg) {
+  vehicleLayer.clearLayers();
+  for (const key of Object.keys(markers)) delete markers[key];
+  msg.vehicles.forEach(addVehicle);
+  lastSeq = msg.seq;
+}
+
+function applyDelta(msg) {
+  msg.added.forEach(addVehicle);
+  for (const [key, lat, lon, label] of msg.moved) {
+    const marker = markers[key];
+    if (!marker) continue;
+    marker.setLatLng([lat, lon]);
+    marker.setPopupContent(popupContent(label));
+  }
+  for (const key of msg.removed) {
+    if (!markers[key]) continue;
+    markers[key].remove();
+    delete markers[key];
+  }
+  lastSeq = msg.seq;
+}
+
+//-----------------------------------------------------
+// Event stream (EventSource reconnects on its own and sends
+// Last-Event-ID: the server resumes or sends a new snapshot)
+//-----------------------------------------------------
+let events = null;
+
+function connect() {
+  events = new EventSource(EVENTS_URL);
+
+  events.addEventListener("snapshot", (e) => {
+    applySnapshot(JSON.parse(e.data));
+    console.log(`Snapshot ${lastSeq}: ${Object.keys(markers).length} vehicles`);
+  });
+
+  events.addEventListener("delta", (e) => {
+    const msg = JSON.parse(e.data);
+    if (lastSeq === null || msg.seq !== lastSeq + 1) {
+      // Missed a message: a fresh connection (no Last-Event-ID) gets a snapshot
+      events.close();
+      lastSeq = null;
+      connect();
+      return;
+    }
+    applyDelta(msg);
+  });
+
+  events.onerror = (err) => console.error("Live stream error:", err);
+}
+
+connect();
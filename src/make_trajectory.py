@@ -1,50 +1,193 @@
-import geopandas as gpd
-from shapely.geometry import LineString
-from pathlib import Path
+import argparse
+import json
+import os
+import time
+import numpy as np
 import pandas as pd
-from config import RAW_DATA_DIR as INPUT
-from config import PROCESSED_DATA_DIR as OUTPUT
-
-
-# 1️⃣ Read all GPKG files in order
-files = sorted(INPUT.glob("bizkaibus_*.gpkg"))
-
-gdfs = []
-for f in files:
-    gdf = gpd.read_file(f)
-    # Keep only essential columns
-    gdf = gdf[["vehicle_ref", "journey_ref", "stop_ref", "recorded_at", "geometry"]]
-    gdfs.append(gdf)
-
-# 2️⃣ Combine all snapshots
-all_vehicles = pd.concat(gdfs, ignore_index=True)
-all_vehicles["recorded_at"] = pd.to_datetime(all_vehicles["recorded_at"])
-
-# 3️⃣ Optional: sort by vehicle and time
-all_vehicles = all_vehicles.sort_values(["vehicle_ref", "recorded_at"])
-
-# 4️⃣ Convert back to GeoDataFrame
-all_vehicles_gdf = gpd.GeoDataFrame(all_vehicles, geometry="geometry", crs="EPSG:4326")
-
-# 5️⃣ Create trajectories per vehicle (LineString)
-trajectories = []
-for vehicle, group in all_vehicles_gdf.groupby("vehicle_ref"):
-    # Only keep vehicles with at least 2 points
-    if len(group) >= 2:
-        line = LineString(group.geometry.tolist())
-        traj = {
-            "vehicle_ref": vehicle,
-            "journey_ref": group["journey_ref"].iloc[0],
-            "stop_ref": group["stop_ref"].iloc[0],
-            "start_time": group["recorded_at"].min(),
-            "end_time": group["recorded_at"].max(),
-            "geometry": line
-        }
-        trajectories.append(traj)
-
-traj_gdf = gpd.GeoDataFrame(trajectories, geometry="geometry", crs="EPSG:4326")
-
-# 6️⃣ Save trajectories to a single GPKG
-traj_gdf.to_file(OUTPUT / "bizkaibus_trajectories.gpkg", driver="GPKG")
-
-print(f"Created {len(traj_gdf)} vehicle trajectories")
+from src.archive import ARCHIVE_DIR, read_archive
+from src.config import PROCESSED_DATA_DIR
+from src.trajectories import (
+    MAX_GAP, build_trajectories, offsets_from_starts, select_trajectories, sort_points, trajectory_starts,
+)
+
+# ---------------------------------------------
+# Incremental trajectory builder
+# ---------------------------------------------
+# Each run reads only the archived snapshots newer than the checkpoint
+# watermark (src.archive, one dataset scan), merges them with the points of
+# the trajectories still open, and splits the points of each vehicle into
+# trajectories on journey_ref changes and on absences longer than MAX_GAP
+# (src.trajectories, vectorized).
+#
+# The archive is delta-encoded: a vehicle that does not move has no rows, so
+# a long time without rows is not an absence. A vehicle counts as away only
+# when it has a "gone" row or is missing from a keyframe in between. The
+# scan therefore starts at the oldest open point, so those markers are seen
+# for the open trajectories too.
+# Trajectories that can no longer grow are appended to the output GPKG; the
+# open ones stay in the checkpoint until a later run extends or closes them.
+#
+# The output is appended before the checkpoint is replaced, so a run that
+# dies in between re-appends its trajectories on the next run (use --rebuild
+# to start over).
+
+OUTPUT_PATH = PROCESSED_DATA_DIR / "bizkaibus_trajectories.gpkg"
+TRAJECTORY_DIR = PROCESSED_DATA_DIR / "trajectories"  # checkpoint
+CHECKPOINT_PATH = TRAJECTORY_DIR / "checkpoint.json"
+OPEN_POINTS_PATH = TRAJECTORY_DIR / "open_points.parquet"
+POINT_COLS = ["vehicle_ref", "journey_ref", "stop_ref", "recorded_at", "lat", "lon", "snapshot_ts"]
+
+
+# ======================================================
+# 1) CHECKPOINT
+# ======================================================
+def load_checkpoint():
+    """(watermark or None, open points DataFrame)."""
+    if not CHECKPOINT_PATH.exists():
+        return None, pd.DataFrame(columns=POINT_COLS)
+    checkpoint = json.loads(CHECKPOINT_PATH.read_text())
+    watermark = pd.Timestamp(checkpoint["watermark"])
+    open_points = pd.read_parquet(OPEN_POINTS_PATH) if OPEN_POINTS_PATH.exists() else pd.DataFrame(columns=POINT_COLS)
+    if "snapshot_ts" not in open_points.columns:  # checkpoints written before snapshot_ts was kept
+        open_points["snapshot_ts"] = open_points["recorded_at"]
+    return watermark, open_points
+
+
+def save_checkpoint(watermark, open_points, stats):
+    """Replace the checkpoint (open points first, then the watermark that refers to them)."""
+    TRAJECTORY_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = OPEN_POINTS_PATH.with_suffix(".tmp")
+    open_points.to_parquet(tmp, index=False)
+    os.replace(tmp, OPEN_POINTS_PATH)
+    tmp = CHECKPOINT_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"watermark": watermark.isoformat(), **stats}, indent=2))
+    os.replace(tmp, CHECKPOINT_PATH)
+
+
+# ======================================================
+# 2) SEGMENTATION
+# ======================================================
+def _ms(times):
+    return pd.to_datetime(times, utc=True).dt.tz_convert(None).to_numpy().astype("datetime64[ms]").astype(np.int64)
+
+
+def _count_between(sorted_keys, lo, hi):
+    """Number of keys k with lo < k < hi, for arrays of bounds."""
+    return np.searchsorted(sorted_keys, hi, side="left") - np.searchsorted(sorted_keys, lo, side="right")
+
+
+def absences(points, rows, watermark):
+    """
+    For sorted `points` (with snapshot_ts) and the archive `rows` covering
+    them up to `watermark`: (absent, absent_after). absent[i] is True when
+    the vehicle left the feed between its previous point and point i;
+    absent_after[i] when it left after point i (up to the watermark).
+
+    A vehicle left the feed when it has a "gone" row in the interval, or
+    when the interval contains keyframes that do not list it.
+    """
+    vehicles = pd.Index(pd.unique(points["vehicle_ref"]))
+    code = vehicles.get_indexer(points["vehicle_ref"])
+    s = _ms(points["snapshot_ts"])
+    row_code = vehicles.get_indexer(rows["vehicle_ref"])
+    row_s = _ms(rows["snapshot_ts"])
+    t0 = min(s.min(), row_s.min()) - 1
+    span = max(s.max(), row_s.max(), _ms(pd.Series([watermark]))[0]) - t0 + 2
+    key = code * span + (s - t0)  # (vehicle, time) as one sortable integer
+
+    event = rows["event"].to_numpy()
+    known = row_code >= 0
+    gone = np.sort((row_code * span + (row_s - t0))[known & (event == "gone")])
+    listed = np.sort((row_code * span + (row_s - t0))[known & (event == "key")])
+    keyframes = np.unique(row_s[event == "key"])
+
+    def left_between(lo, hi):
+        # keyframe times: strip the vehicle part of the keys
+        missing = _count_between(keyframes, lo % span + t0, hi % span + t0) > _count_between(listed, lo, hi)
+        return (_count_between(gone, lo, hi) > 0) | missing
+
+    first = np.append(True, code[1:] != code[:-1])
+    prev_key = np.append(key[0], key[:-1])
+    absent = np.where(first, False, left_between(prev_key, key))
+    end_key = code * span + (_ms(pd.Series([watermark]))[0] - t0) + 1  # (point, watermark]
+    absent_after = left_between(key, end_key)
+    return absent, absent_after
+
+
+def split_trajectories(points, rows, watermark, max_gap=MAX_GAP):
+    """
+    Split `points` into trajectories (src.trajectories). Returns (points
+    sorted, offsets, boolean array: trajectory still open).
+
+    The last trajectory of a vehicle stays open while the vehicle is still
+    in the feed, and for `max_gap` after it left.
+    """
+    points = sort_points(points)
+    absent, absent_after = absences(points, rows, watermark)
+    offsets = offsets_from_starts(trajectory_starts(points, max_gap, absent))
+    last = offsets[1:] - 1
+    vehicle = points["vehicle_ref"].to_numpy()
+    vehicle_last = np.append(vehicle[1:] != vehicle[:-1], True)[last]
+    recent = ((watermark - points["snapshot_ts"].take(last)) <= max_gap).to_numpy()
+    is_open = vehicle_last & (~absent_after[last] | recent)
+    return points, offsets, is_open
+
+
+# ======================================================
+# 3) RUN
+# ======================================================
+def update_trajectories(max_gap=MAX_GAP, directory=ARCHIVE_DIR):
+    """
+    Ingest the snapshots archived since the last run. Returns a dict with
+    the rows read, trajectories written and open, and the new watermark.
+    """
+    watermark, open_points = load_checkpoint()
+    start = None if watermark is None else watermark + pd.Timedelta(milliseconds=1)
+    # From the oldest open point: absence markers of the open trajectories
+    scan_start = start if open_points.empty else min(start, open_points["snapshot_ts"].min())
+    rows = read_archive(start=scan_start, directory=directory)
+    new_rows = rows if start is None else rows[rows["snapshot_ts"] >= start]
+    if new_rows.empty:
+        return {"rows": 0, "written": 0, "open": int(open_points["vehicle_ref"].nunique()), "watermark": watermark}
+
+    new_watermark = new_rows["snapshot_ts"].max()
+    # "gone" rows carry no position, they only mark absences
+    positions = new_rows.loc[new_rows["event"] != "gone", POINT_COLS]
+    points = pd.concat([open_points.astype(positions.dtypes.to_dict()), positions], ignore_index=True)
+    if points.empty:
+        # Only "gone" rows and nothing open (e.g. the last vehicles leaving at night)
+        stats = {"rows": len(new_rows), "written": 0, "open": 0}
+        save_checkpoint(new_watermark, points[POINT_COLS], stats)
+        return {**stats, "watermark": new_watermark}
+    points, offsets, is_open = split_trajectories(points, rows, new_watermark, max_gap)
+    trajectories = build_trajectories(*select_trajectories(points, offsets, ~is_open))
+    if len(trajectories):
+        # Without a checkpoint the output is rebuilt from scratch
+        append = watermark is not None and OUTPUT_PATH.exists()
+        trajectories.to_file(OUTPUT_PATH, driver="GPKG", mode="a" if append else "w")
+
+    still_open = select_trajectories(points, offsets, is_open)[0][POINT_COLS]
+    stats = {"rows": len(new_rows), "written": len(trajectories), "open": int(is_open.sum())}
+    save_checkpoint(new_watermark, still_open, stats)
+    return {**stats, "watermark": new_watermark}
+
+
+def reset():
+    """Delete the output and the checkpoint (next run rebuilds from the whole archive)."""
+    for path in (OUTPUT_PATH, CHECKPOINT_PATH, OPEN_POINTS_PATH):
+        path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Append the trajectories of newly archived snapshots.")
+    parser.add_argument("--rebuild", action="store_true", help="discard output and checkpoint first")
+    parser.add_argument("--max-gap", type=float, default=MAX_GAP.total_seconds() / 60, help="minutes")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        reset()
+    start_time = time.perf_counter()
+    result = update_trajectories(pd.Timedelta(minutes=args.max_gap))
+    print(f"✔️  {result['rows']} new rows → {result['written']} trajectories appended, "
+          f"{result['open']} open (watermark {result['watermark']}) in {time.perf_counter() - start_time:.1f}s "
+          f"→ {OUTPUT_PATH}")
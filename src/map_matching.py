@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import Transformer
+from src.static_layers import get_derived
+
+# ---------------------------------------------
+# Map-matching of vehicles onto route shapes
+# ---------------------------------------------
+# Route geometries are projected once to a metric CRS, merged into one line
+# per route and put in an STRtree (built once per version of the source layer
+# through get_derived). A snapshot is matched in one vectorized pass:
+#   1) vehicles whose line_id has routes are paired with every route of
+#      that line (both directions) and keep the closest one, if it is within
+#      MAX_DEVIATION_M;
+#   2) the rest take the nearest route within MAX_DEVIATION_M (STRtree);
+#      vehicles with none are left unmatched and flagged off route;
+#   3) shapely.line_locate_point gives the distance along the route and the
+#      distance to it is the off-route deviation.
+
+METRIC_CRS = "EPSG:25830"
+MAX_DEVIATION_M = 300.0  # nearest-route fallback radius
+OFF_ROUTE_M = 50.0       # deviations above this flag the vehicle as off route
+MATCH_COLUMNS = ["route_idx", "route_line_id", "matched_by", "along_m", "route_length_m",
+                 "deviation_m", "off_route", "snap_lat", "snap_lon"]
+
+_to_metric = Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+_to_wgs84 = Transformer.from_crs(METRIC_CRS, "EPSG:4326", always_xy=True)
+
+
+# ======================================================
+# 1) ROUTE INDEX
+# ======================================================
+def build_route_index(routes, id_col="line_id"):
+    """
+    Matching structures for a GeoDataFrame of route lines: dict with
+    "geometry" (metric lines), "line_id", "length_m", "tree" (STRtree) and
+    "by_line" (DataFrame line_id -> route position, for the pairing join).
+    """
+    routes = routes[routes.geometry.notna() & ~routes.geometry.is_empty]
+    geometry = shapely.line_merge(shapely.force_2d(routes.geometry.to_crs(METRIC_CRS).values.to_numpy()))
+    line_ids = routes[id_col].astype(str).to_numpy()
+    return {
+        "geometry": geometry,
+        "line_id": line_ids,
+        "length_m": shapely.length(geometry),
+        "tree": shapely.STRtree(geometry),
+        "by_line": pd.DataFrame({"line_id": line_ids, "route_idx": np.arange(len(geometry))}),
+    }
+
+
+def get_bus_route_index():
+    """Route index of the static "bus_lines" layer (rebuilt only when it changes)."""
+    return get_derived("bus_lines", "route_index", build_route_index)
+
+
+# ======================================================
+# 2) MATCHING
+# ======================================================
+def match_positions(df, index, line_col="line_id", max_deviation_m=MAX_DEVIATION_M, off_route_m=OFF_ROUTE_M):
+    """
+    Snap the vehicles of `df` (lat, lon and `line_col`) onto the routes of
+    `index` (build_route_index). Returns a copy of `df` with MATCH_COLUMNS:
+    route_idx (-1 when unmatched), route_line_id, matched_by ("line" /
+    "nearest"), along_m (distance along the route), route_length_m,
+    deviation_m, off_route and the snapped position snap_lat / snap_lon.
+    A vehicle with no route within `max_deviation_m` keeps NaN along_m /
+    snap fields and is flagged off_route.
+    """
+    out = df.copy()
+    n = len(out)
+    x, y = _to_metric.transform(out["lon"].to_numpy(dtype=float), out["lat"].to_numpy(dtype=float))
+    points = shapely.points(x, y)
+    valid = np.isfinite(x) & np.isfinite(y)
+    route = np.full(n, -1)
+    matched_by = np.full(n, None, dtype=object)
+
+    # 1) Own line: every (vehicle, route of its line) pair, closest route wins
+    #    unless even that one is too far (detour, wrong line_id)
+    if line_col in out.columns:
+        vehicles = pd.DataFrame({"pos": np.flatnonzero(valid),
+                                 "line_id": out[line_col].astype(str).to_numpy()[valid]})
+        pairs = vehicles.merge(index["by_line"], on="line_id")
+        if len(pairs):
+            pos, idx = pairs["pos"].to_numpy(), pairs["route_idx"].to_numpy()
+            dist = shapely.distance(points[pos], index["geometry"][idx])
+            order = np.lexsort((dist, pos))
+            first = np.append(True, pos[order][1:] != pos[order][:-1])
+            first &= dist[order] <= max_deviation_m
+            route[pos[order][first]] = idx[order][first]
+            matched_by[pos[order][first]] = "line"
+
+    # 2) Unknown line, no route for it or too far from it: nearest route within the radius
+    rest = np.flatnonzero(valid & (route < 0))
+    if len(rest):
+        hit, idx = index["tree"].query_nearest(points[rest], max_distance=max_deviation_m, all_matches=False)
+        route[rest[hit]] = idx
+        matched_by[rest[hit]] = "nearest"
+
+    # 3) Linear referencing on the chosen routes
+    matched = np.flatnonzero(route >= 0)
+    lines = index["geometry"][route[matched]]
+    along = np.full(n, np.nan)
+    deviation = np.full(n, np.nan)
+    snap_x, snap_y = np.full(n, np.nan), np.full(n, np.nan)
+    along[matched] = shapely.line_locate_point(lines, points[matched])
+    snapped = shapely.line_interpolate_point(lines, along[matched])
+    deviation[matched] = shapely.distance(points[matched], snapped)
+    snap_x[matched], snap_y[matched] = shapely.get_x(snapped), shapely.get_y(snapped)
+    snap_lon, snap_lat = _to_wgs84.transform(snap_x, snap_y)
+
+    out["route_idx"] = route
+    out["route_line_id"] = np.where(route >= 0, index["line_id"][np.maximum(route, 0)], None)
+    out["matched_by"] = matched_by
+    out["along_m"] = along
+    out["route_length_m"] = np.where(route >= 0, index["length_m"][np.maximum(route, 0)], np.nan)
+    out["deviation_m"] = deviation
+    out["off_route"] = (deviation > off_route_m) | (valid & (route < 0))
+    out["snap_lat"] = snap_lat
+    out["snap_lon"] = snap_lon
+    return out
+
+
+def match_bus_positions(df_bus):
+    """match_positions of a bus frame (src.vehicles) against the "bus_lines" layer."""
+    return match_positions(df_bus, get_bus_route_index())
+
+
+if __name__ == "__main__":
+    import time
+    from src.config import BUS_URL
+    from src.vehicles import load_positions_bus
+
+    df_bus = load_positions_bus(BUS_URL, None, timeout=10)
+    start = time.perf_counter()
+    index = get_bus_route_index()
+    built = time.perf_counter()
+    matched = match_positions(df_bus, index)
+    elapsed = time.perf_counter() - built
+    counts = matched["matched_by"].value_counts(dropna=False).to_dict()
+    print(f"✔️  {len(index['geometry'])} routes indexed in {built - start:.2f}s; "
+          f"{len(matched)} buses matched in {elapsed * 1000:.0f} ms {counts}")
+    print(f"   off route (> {OFF_ROUTE_M:.0f} m): {int(matched['off_route'].sum())}, "
+          f"median deviation {matched['deviation_m'].median():.1f} m")
@@ -2,7 +2,73 @@ import folium
 import geopandas as gpd
 import pandas as pd
 from folium.plugins import Fullscreen
-from src.config import PROCESSED_DATA_DIR
+from src.decorations import get_decoration
+from src.line_geometry import lines_for_zoom
+from src.static_layers import render_ready
+
+
+# Markers are emitted as one GeoJSON FeatureCollection per layer and drawn on
+# a canvas renderer (prefer_canvas) instead of one CircleMarker per row.
+# Popups are bound once per layer and built from the feature properties only
+# when opened; a per-feature "color" property overrides the layer colour.
+COORD_DECIMALS = 6  # ~0.1 m
+
+_STYLE_FROM_PROPERTIES = folium.JsCode("""
+function(feature, layer) {
+    var c = feature.properties.color;
+    if (c) { layer.setStyle({color: c, fillColor: c}); }
+}
+""")
+
+
+def _points_feature_collection(df, properties=(), lon_col="lon", lat_col="lat"):
+    """Point FeatureCollection (dict) from lon/lat columns, without iterrows."""
+    coords = df[[lon_col, lat_col]].to_numpy(dtype=float).round(COORD_DECIMALS).tolist()
+    properties = [c for c in properties if c in df.columns]
+    if properties:
+        props = df[properties].astype(str).where(df[properties].notna(), "").to_dict("records")
+    else:
+        props = [{}] * len(coords)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": c}, "properties": p}
+            for c, p in zip(coords, props)
+        ],
+    }
+
+
+def _add_points_layer(parent, df, color, fill_color, radius, fill_opacity=None,
+                      popup_fields=(), popup_labels=True, lon_col="lon", lat_col="lat"):
+    """Add all rows of `df` as circle markers in a single GeoJSON layer."""
+    popup_fields = [c for c in popup_fields if c in df.columns]
+    extra = ["color"] if "color" in df.columns else []
+    marker_style = {"color": color, "fill": True, "fill_color": fill_color}
+    if fill_opacity is not None:
+        marker_style["fill_opacity"] = fill_opacity
+    folium.GeoJson(
+        _points_feature_collection(df, popup_fields + extra, lon_col, lat_col),
+        marker=folium.CircleMarker(radius=radius, **marker_style),
+        popup=folium.GeoJsonPopup(fields=popup_fields, labels=popup_labels) if popup_fields else None,
+        on_each_feature=_STYLE_FROM_PROPERTIES if extra else None,
+        control=False,
+    ).add_to(parent)
+
+
+def _stop_points(stops_gdf):
+    """Stops GeoDataFrame → frame with lon/lat columns for _add_points_layer."""
+    return pd.DataFrame(stops_gdf.drop(columns="geometry")).assign(
+        lon=stops_gdf.geometry.x.to_numpy(), lat=stops_gdf.geometry.y.to_numpy()
+    )
+
+
+def _line_features(lines_gdf, properties, zoom):
+    """GeoJSON of `lines_gdf` at the level of detail for `zoom`, with only `properties`."""
+    properties = [c for c in properties if c in lines_gdf.columns]
+    lines_gdf = lines_for_zoom(lines_gdf[properties + [lines_gdf.geometry.name]], zoom)
+    return lines_gdf.__geo_interface__
+
+
 def plot_vehicles_by_mode(
     df_vehicles: pd.DataFrame,
     map_center: tuple = (43.2630, -2.9350),
@@ -31,13 +97,10 @@ def plot_vehicles_by_mode(
         return f'<span style="color:{color}; font-size:20px;">●</span>'
     
     # Create map
-    m = folium.Map(location=map_center, zoom_start=zoom_start, tiles="CartoDB Positron")
+    m = folium.Map(location=map_center, zoom_start=zoom_start, tiles="CartoDB Positron", prefer_canvas=True)
     boundary_fg = folium.FeatureGroup(name="Bizkaia")
-    _boundary_gdf=gpd.read_file(PROCESSED_DATA_DIR/"bizkaia_boundary.gpkg")
-    for _, r in _boundary_gdf.iterrows():
-        sim_geo = gpd.GeoSeries(r["geometry"]).simplify(tolerance=0.001)
-        folium.GeoJson(sim_geo.to_json(), style_function=lambda x: {"fillColor": "orange"}).add_to(boundary_fg)
-    boundary_fg.add_to(m)   
+    folium.GeoJson(get_decoration("boundary", zoom_start), style_function=lambda x: {"fillColor": "orange"}).add_to(boundary_fg)
+    boundary_fg.add_to(m)
     # Create a feature group for each mode
     layers = {}
     for mode, color in mode_colors.items():
@@ -45,24 +108,14 @@ def plot_vehicles_by_mode(
         fg.add_to(m)
         layers[mode] = fg
     
-    # Add markers
-    for _, row in df_vehicles.iterrows():
-        mode = row.get("mode")
+    # Add markers (one GeoJSON layer per mode)
+    for mode, group in df_vehicles.groupby("mode", sort=False):
         if mode not in layers:
             continue
         color = mode_colors[mode]
-        popup = f"{mode.upper()} — {row.get('vehicle_id')}"
-        folium.CircleMarker(
-            [row["lat"], row["lon"]],
-            radius=radius,
-            color=color,
-            fill=True,
-            fill_color=color,
-            popup=popup
-        ).add_to(layers[mode])
-
-
-
+        group = group.assign(popup=mode.upper() + " — " + group["vehicle_id"].astype(str))
+        _add_points_layer(layers[mode], group, color, color, radius,
+                          popup_fields=["popup"], popup_labels=False)
 
     Fullscreen(
         position="topleft",
@@ -109,24 +162,18 @@ def create_stops_lines_folium_map(
     Returns HTML string for Streamlit.
     """
     
-    # Ensure WGS84
-    lines_gdf = lines_gdf.to_crs(epsg=4326)
-    stops_gdf = stops_gdf.to_crs(epsg=4326)
-    
-    # Convert datetime columns to string to avoid JSON serialization errors
-    for df in [lines_gdf, stops_gdf]:
-        datetime_cols = df.select_dtypes(include=['datetime64[ns]', 'datetime64[ns, UTC]']).columns
-        for col in datetime_cols:
-            df[col] = df[col].astype(str)
+    # Ensure WGS84 and JSON-serializable columns (no-op for src.static_layers frames)
+    lines_gdf = render_ready(lines_gdf)
+    stops_gdf = render_ready(stops_gdf)
     
     # Create Folium map
-    m = folium.Map(location=map_center, zoom_start=zoom_start, tiles="CartoDB Positron")
+    m = folium.Map(location=map_center, zoom_start=zoom_start, tiles="CartoDB Positron", prefer_canvas=True)
     
     # Add bus lines split by layer
     for layer_name, group in lines_gdf.groupby(lines_group_col):
         fg = folium.FeatureGroup(name=f"Line: {layer_name}", show=False)
         folium.GeoJson(
-            group.__geo_interface__,
+            _line_features(group, lines_tooltip_cols, zoom_start),
             style_function=lambda x, c=line_color, w=line_weight, o=line_opacity: {
                 'color': c,
                 'weight': w,
@@ -138,36 +185,19 @@ def create_stops_lines_folium_map(
     
     # Add bus stops
     fg_stops = folium.FeatureGroup(name="Bus Stops", show=True)
-    for _, stop in stops_gdf.iterrows():
-        folium.CircleMarker(
-            [stop.geometry.y, stop.geometry.x],
-            radius=stop_radius,
-            color=stop_color,
-            fill=True,
-            fill_color=stop_fill_color,
-            fill_opacity=stop_opacity,
-            popup=stop.get(stops_popup_col, "Bus Stop")
-        ).add_to(fg_stops)
+    _add_points_layer(fg_stops, _stop_points(stops_gdf), stop_color, stop_fill_color, stop_radius,
+                      stop_opacity, popup_fields=[stops_popup_col], popup_labels=False)
     fg_stops.add_to(m)
     
     # Add vehicles if provided
     if vehicles_df is not None and not vehicles_df.empty:
         fg_vehicles = folium.FeatureGroup(name="Vehicles", show=True)
-        # Convert timestamp to string if exists
+        # Convert timestamp to string if exists (on a copy: frames may be shared)
         if "timestamp" in vehicles_df.columns:
-            vehicles_df["timestamp"] = vehicles_df["timestamp"].astype(str)
+            vehicles_df = vehicles_df.assign(timestamp=vehicles_df["timestamp"].astype(str))
         
-        for _, vehicle in vehicles_df.iterrows():
-            popup_text = "<br>".join(f"{col}: {vehicle.get(col, '')}" for col in vehicles_popup_cols if col in vehicle)
-            folium.CircleMarker(
-                [vehicle['lat'], vehicle['lon']],
-                radius=vehicle_radius,
-                color=vehicle_color,
-                fill=True,
-                fill_color=vehicle_fill_color,
-                fill_opacity=vehicle_opacity,
-                popup=popup_text
-            ).add_to(fg_vehicles)
+        _add_points_layer(fg_vehicles, vehicles_df, vehicle_color, vehicle_fill_color, vehicle_radius,
+                          vehicle_opacity, popup_fields=vehicles_popup_cols)
         fg_vehicles.add_to(m)
     
     Fullscreen(
@@ -210,25 +240,19 @@ def create_filtered_map(
     Returns HTML string for Streamlit.
     """
     
-    # Ensure WGS84
-    lines_gdf = lines_gdf.to_crs(epsg=4326)
-    stops_gdf = stops_gdf.to_crs(epsg=4326)
-    
-    # Convert datetime columns to string to avoid JSON serialization errors
-    for df in [lines_gdf, stops_gdf]:
-        datetime_cols = df.select_dtypes(include=['datetime64[ns]', 'datetime64[ns, UTC]']).columns
-        for col in datetime_cols:
-            df[col] = df[col].astype(str)
+    # Ensure WGS84 and JSON-serializable columns (no-op for src.static_layers frames)
+    lines_gdf = render_ready(lines_gdf)
+    stops_gdf = render_ready(stops_gdf)
     
     # Create Folium map
-    m = folium.Map(location=map_center, zoom_start=zoom_start, tiles="CartoDB Positron")
+    m = folium.Map(location=map_center, zoom_start=zoom_start, tiles="CartoDB Positron", prefer_canvas=True)
     
     # Add bus lines split by layer
     fg_lines = folium.FeatureGroup(name="Bus Lines", show=True)
 
  
     folium.GeoJson(
-        lines_gdf.__geo_interface__,
+        _line_features(lines_gdf, lines_tooltip_cols, zoom_start),
         style_function=lambda x, c=line_color, w=line_weight, o=line_opacity: {
             'color': c,
             'weight': w,
@@ -239,36 +263,19 @@ def create_filtered_map(
     
     # Add bus stops
     fg_stops = folium.FeatureGroup(name="Bus Stops", show=True)
-    for _, stop in stops_gdf.iterrows():
-        folium.CircleMarker(
-            [stop.geometry.y, stop.geometry.x],
-            radius=stop_radius,
-            color=stop_color,
-            fill=True,
-            fill_color=stop_fill_color,
-            fill_opacity=stop_opacity,
-            popup=stop.get(stops_popup_col, "Bus Stop")
-        ).add_to(fg_stops)
+    _add_points_layer(fg_stops, _stop_points(stops_gdf), stop_color, stop_fill_color, stop_radius,
+                      stop_opacity, popup_fields=[stops_popup_col], popup_labels=False)
     fg_stops.add_to(m)
     
     # Add vehicles if provided
     if vehicles_df is not None and not vehicles_df.empty:
         fg_vehicles = folium.FeatureGroup(name="Vehicles", show=True)
-        # Convert timestamp to string if exists
+        # Convert timestamp to string if exists (on a copy: frames may be shared)
         if "timestamp" in vehicles_df.columns:
-            vehicles_df["timestamp"] = vehicles_df["timestamp"].astype(str)
+            vehicles_df = vehicles_df.assign(timestamp=vehicles_df["timestamp"].astype(str))
         
-        for _, vehicle in vehicles_df.iterrows():
-            popup_text = "<br>".join(f"{col}: {vehicle.get(col, '')}" for col in vehicles_popup_cols if col in vehicle)
-            folium.CircleMarker(
-                [vehicle['lat'], vehicle['lon']],
-                radius=vehicle_radius,
-                color=vehicle_color,
-                fill=True,
-                fill_color=vehicle_fill_color,
-                fill_opacity=vehicle_opacity,
-                popup=popup_text
-            ).add_to(fg_vehicles)
+        _add_points_layer(fg_vehicles, vehicles_df, vehicle_color, vehicle_fill_color, vehicle_radius,
+                          vehicle_opacity, popup_fields=vehicles_popup_cols)
         fg_vehicles.add_to(m)
     Fullscreen(
         position="topleft",
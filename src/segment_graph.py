@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from src.config import PROCESSED_DATA_DIR
+from src.static_layers import get_derived
+from src.stop_network import build_adjacency, stops_of_lines
+
+# ---------------------------------------------
+# Shared-corridor segment graph
+# ---------------------------------------------
+# bizkaibus_lines.gpkg stores every route separately, so a road used by 30
+# lines is stored (and drawn) 30 times. Here all routes are noded together on
+# a metric grid: the result is a set of unique segments, each carrying the
+# comma-separated `line_ids` that run over it (same convention as the stops
+# layer). Consecutive pieces used by exactly the same lines are merged into
+# one segment. The line <-> segment relation is a CSR adjacency built with
+# src.stop_network.build_adjacency, so "segments of these lines" is a slice.
+
+METRIC_CRS = "EPSG:25830"
+GRID_SIZE_M = 1.0  # vertices closer than this are snapped together
+SEGMENTS_PATH = PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_segments.gpkg"
+
+
+def build_segment_graph(lines, id_col="line_id", grid_size=GRID_SIZE_M):
+    """
+    Node the route LineStrings of `lines` into unique segments.
+
+    Returns
+    -------
+    GeoDataFrame (EPSG:4326) with segment_id, line_ids, n_lines, length_m.
+    """
+    lines = lines[lines.geometry.notna() & ~lines.geometry.is_empty]
+    metric = lines.geometry.to_crs(METRIC_CRS).values
+    line_ids = lines[id_col].astype(str).to_numpy()
+
+    # 1) Node every route against every other one: overlapping stretches
+    #    collapse into one edge and crossings become edge endpoints
+    edges = shapely.get_parts(shapely.union_all(metric, grid_size=grid_size))
+    edges = edges[shapely.get_type_id(edges) == 1]  # LineStrings only
+
+    # 2) Lines using each edge: the ones passing through its midpoint. The
+    #    routes are queried as their 2-point pieces, whose small boxes keep
+    #    the STRtree from testing every midpoint against whole routes. Pieces
+    #    are cut per part, so none bridges the gap between two parts of a
+    #    MultiLineString
+    parts, part_line = shapely.get_parts(metric, return_index=True)
+    coords, owner = shapely.get_coordinates(parts, return_index=True)
+    same = owner[:-1] == owner[1:]
+    pieces = shapely.linestrings(np.stack([coords[:-1][same], coords[1:][same]], axis=1))
+    piece_line = part_line[owner[:-1][same]]
+    midpoints = shapely.line_interpolate_point(edges, 0.5, normalized=True)
+    edge_pos, piece_pos = shapely.STRtree(pieces).query(midpoints, predicate="dwithin", distance=grid_size)
+    pairs = pd.DataFrame({"edge": edge_pos, "line_id": line_ids[piece_line[piece_pos]]}).drop_duplicates()
+    edge_lines = pairs.sort_values(["edge", "line_id"]).groupby("edge")["line_id"].agg(",".join)
+
+    # 3) Merge consecutive edges with the same set of lines into segments
+    keys = pd.Series(edge_lines.to_numpy(), index=edge_lines.index)
+    segments, segment_lines = [], []
+    for key, group in keys.groupby(keys, sort=True):
+        merged = shapely.line_merge(shapely.multilinestrings(edges[group.index.to_numpy()]))
+        parts = shapely.get_parts(merged)
+        segments.extend(parts)
+        segment_lines.extend([key] * len(parts))
+
+    segments = np.asarray(segments, dtype=object)
+    return gpd.GeoDataFrame(
+        {
+            "segment_id": np.arange(len(segments)),
+            "line_ids": segment_lines,
+            "n_lines": [key.count(",") + 1 for key in segment_lines],
+            "length_m": shapely.length(segments).round(1),
+        },
+        geometry=gpd.GeoSeries(segments, crs=METRIC_CRS).to_crs("EPSG:4326").values,
+        crs="EPSG:4326",
+    )
+
+
+def _build_graph(lines):
+    segments = build_segment_graph(lines)
+    return {"segments": segments, "adjacency": build_adjacency(segments)}
+
+
+def get_segment_graph():
+    """Segments of the static "bus_lines" layer and their CSR adjacency (built once per version)."""
+    return get_derived("bus_lines", "segment_graph", _build_graph)
+
+
+def segments_of_lines(graph, line_ids):
+    """Rows of graph["segments"] used by any of `line_ids` (each segment once)."""
+    return graph["segments"].iloc[stops_of_lines(graph["adjacency"], line_ids)]
+
+
+def aggregate_by_segment(graph, values_by_line):
+    """
+    Per-corridor totals: for every segment, the sum of `values_by_line`
+    (a Series indexed by line_id, e.g. vehicles per line) over the lines
+    that use it. Returns a Series aligned with graph["segments"].
+    """
+    adjacency = graph["adjacency"]
+    values = pd.Series(values_by_line).reindex(adjacency["line_ids"]).fillna(0).to_numpy(dtype=float)
+    counts = np.diff(adjacency["stop_offsets"])
+    owner = np.repeat(np.arange(len(counts)), counts)
+    totals = np.bincount(owner, weights=values[adjacency["stop_lines"]], minlength=len(counts))
+    return pd.Series(totals, index=graph["segments"].index)
+
+
+def corridor_stats(segments):
+    """Geometry volume of the routes vs. the unique segments."""
+    route_m = float((segments["length_m"] * segments["n_lines"]).sum())
+    unique_m = float(segments["length_m"].sum())
+    return {
+        "segments": len(segments),
+        "route_km": route_m / 1000,
+        "unique_km": unique_m / 1000,
+        "shared_ratio": 1 - unique_m / route_m if route_m else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    import time
+    from src.static_layers import load_layer
+
+    start = time.perf_counter()
+    graph = get_segment_graph()
+    elapsed = time.perf_counter() - start
+    segments = graph["segments"]
+    stats = corridor_stats(segments)
+    lines = load_layer("bus_lines")
+    route_vertices = int(shapely.get_num_coordinates(lines.geometry.values).sum())
+    segment_vertices = int(shapely.get_num_coordinates(segments.geometry.values).sum())
+
+    segments.to_file(SEGMENTS_PATH, layer="segments", driver="GPKG")
+    print(f"✔️  {len(lines)} lines → {stats['segments']} segments in {elapsed:.2f}s → {SEGMENTS_PATH}")
+    print(f"   length:   {stats['route_km']:.0f} km of routes, {stats['unique_km']:.0f} km unique "
+          f"({stats['shared_ratio']:.0%} shared)")
+    print(f"   vertices: {route_vertices} → {segment_vertices}")
@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+import time
+import pandas as pd
+import pyarrow as pa
+from src.config import LIVE_SNAPSHOT_DIR
+from src.vehicles import DEFAULT_FEEDS, VEHICLE_COLUMNS, load_positions_all
+
+# ---------------------------------------------
+# Shared live snapshots for multi-worker deployments
+# ---------------------------------------------
+# One publisher process polls the feeds and writes every new snapshot as an
+# Arrow IPC file (<feed>.arrow) plus a small _status.json. Files are written
+# to a temp name and renamed into place, so a reader always maps one complete
+# version. Worker processes memory-map the file and only re-map when it
+# changes, so upstream load per feed is the same whatever the number of
+# workers. read_table serves the mapped Arrow buffers as they are; the
+# DataFrame of read_snapshot views the numeric columns without nulls in
+# place (one block per column), while string and nullable columns are
+# converted once per version in each worker.
+
+STATUS_FILE = "_status.json"
+PUBLISH_INTERVAL = 30  # seconds between polls
+
+
+def _snapshot_path(name, directory=LIVE_SNAPSHOT_DIR):
+    return directory / f"{name}.arrow"
+
+
+def _atomic_write(path, write):
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+# ======================================================
+# 1) PUBLISHER
+# ======================================================
+def publish_snapshot(name, df, version, directory=LIVE_SNAPSHOT_DIR):
+    """Write `df` as the current snapshot of feed `name`."""
+    directory.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"version": str(version).encode(),
+        b"published_at": str(time.time()).encode(),
+    })
+
+    def write(tmp):
+        with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _atomic_write(_snapshot_path(name, directory), write)
+
+
+def publish_status(status, directory=LIVE_SNAPSHOT_DIR):
+    """Write the per-feed status (version, timings, errors) next to the snapshots."""
+    directory.mkdir(parents=True, exist_ok=True)
+    _atomic_write(
+        directory / STATUS_FILE,
+        lambda tmp: tmp.write_text(json.dumps(status, default=str)),
+    )
+
+
+def run_publisher(feeds=DEFAULT_FEEDS, interval=PUBLISH_INTERVAL, timeout=10, directory=LIVE_SNAPSHOT_DIR):
+    """Poll `feeds` forever and publish each snapshot whose feed time changed."""
+    status = {name: {"version": 0, "feed_ts": None} for name in feeds}
+    print(f"Publishing live snapshots to {directory} (every {interval}s)...")
+
+    while True:
+        try:
+            frames, timings = load_positions_all(feeds, timeout=timeout)
+            now = time.time()
+            for t in timings.to_dict("records"):
+                name = t["feed"]
+                entry = status[name]
+                entry.update({k: t[k] for k in ("status", "fetch_s", "parse_s", "rows", "error")})
+                if t["error"] is not None and not pd.isna(t["error"]):
+                    print(f"❌ {name}: {t['error']}")
+                    continue
+                df = frames[name]
+                feed_ts = str(df["timestamp"].max()) if len(df) else None
+                if entry["version"] == 0 or feed_ts != entry["feed_ts"]:
+                    entry["version"] += 1
+                    entry["feed_ts"] = feed_ts
+                    entry["published_at"] = now
+                    publish_snapshot(name, df, entry["version"], directory)
+                    print(f"✔️  {name} v{entry['version']} ({len(df)} vehicles)")
+            publish_status(status, directory)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+        time.sleep(interval)
+
+
+# ======================================================
+# 2) READERS (worker processes)
+# ======================================================
+_mapped = {}  # path -> (file identity, table, frame)
+_mapped_lock = threading.Lock()
+
+
+def read_table(name, directory=LIVE_SNAPSHOT_DIR):
+    """
+    Current snapshot of `name` as a pyarrow Table backed by the memory-mapped
+    file (None if nothing has been published yet). Re-mapped only when the
+    publisher replaced the file.
+    """
+    return _attach(name, directory)[0]
+
+
+def read_snapshot(name, directory=LIVE_SNAPSHOT_DIR):
+    """Current snapshot of `name` as a DataFrame (built once per version, read-only)."""
+    return _attach(name, directory)[1]
+
+
+def _attach(name, directory):
+    path = _snapshot_path(name, directory)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None, pd.DataFrame(columns=VEHICLE_COLUMNS)
+    identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    with _mapped_lock:
+        cached = _mapped.get(path)
+        if cached is not None and cached[0] == identity:
+            return cached[1], cached[2]
+
+    source = pa.memory_map(str(path), "r")
+    table = pa.ipc.open_file(source).read_all()
+    # split_blocks: no consolidation, so null-free numeric columns stay views of the map
+    df = table.to_pandas(split_blocks=True)
+    with _mapped_lock:
+        _mapped[path] = (identity, table, df)
+    return table, df
+
+
+def read_status(directory=LIVE_SNAPSHOT_DIR):
+    """Per-feed status written by the publisher ({} if there is none yet)."""
+    try:
+        return json.loads((directory / STATUS_FILE).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def load_shared_snapshots(feeds, timeout=None, directory=LIVE_SNAPSHOT_DIR):
+    """
+    Drop-in for src.vehicles.load_positions_all that reads the published
+    snapshots instead of the upstream feeds. Returns (frames, timings).
+
+    `error` is only set for a feed with no snapshot file; the last good
+    snapshot is served while upstream fails, with the publisher's error in
+    `publisher_error`. `version` and `published_at` are those of the mapped
+    file, so callers can skip a snapshot they already processed.
+    """
+    start = time.perf_counter()
+    status = read_status(directory)
+    frames = {}
+    timings = []
+    for name in feeds:
+        table, frames[name] = _attach(name, directory)
+        entry = status.get(name, {})
+        metadata = {} if table is None else table.schema.metadata or {}
+        timings.append({
+            "feed": name,
+            "status": entry.get("status"),
+            "version": int(metadata[b"version"]) if b"version" in metadata else None,
+            "published_at": float(metadata[b"published_at"]) if b"published_at" in metadata else None,
+            "fetch_s": entry.get("fetch_s"),
+            "parse_s": entry.get("parse_s"),
+            "rows": len(frames[name]),
+            "error": "no snapshot published" if table is None else None,
+            "publisher_error": entry.get("error"),
+        })
+    timings = pd.DataFrame(timings)
+    timings.attrs["total_s"] = time.perf_counter() - start
+    return frames, timings
+
+
+if __name__ == "__main__":
+    run_publisher()
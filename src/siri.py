@@ -0,0 +1,103 @@
+import io
+from array import array
+import xml.etree.ElementTree as ET
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+
+# ---------------------------------------------
+# Streaming SIRI-VM parser
+# ---------------------------------------------
+# Shared by the live loader (src/vehicles.py) and the archiver
+# (src/store_unique.py). The feed is read with iterparse and every
+# VehicleActivity is dropped from the tree as soon as it has been read, so
+# memory does not grow with the size of the document; values go straight into
+# column buffers instead of one dict per row.
+
+SIRI_NS = "http://www.siri.org.uk/siri"
+
+_ACTIVITY = f"{{{SIRI_NS}}}VehicleActivity"
+_MVJ = f"{{{SIRI_NS}}}MonitoredVehicleJourney"
+_LOCATION = f"{{{SIRI_NS}}}VehicleLocation"
+_MONITORED_CALL = f"{{{SIRI_NS}}}MonitoredCall"
+
+# (tag, parent tag) -> column
+_FIELDS = {
+    (f"{{{SIRI_NS}}}RecordedAtTime", _ACTIVITY): "recorded_at",
+    (f"{{{SIRI_NS}}}VehicleRef", _MVJ): "vehicle_ref",
+    (f"{{{SIRI_NS}}}VehicleJourneyRef", _MVJ): "journey_ref",
+    (f"{{{SIRI_NS}}}StopPointRef", _MONITORED_CALL): "stop_ref",
+    (f"{{{SIRI_NS}}}Latitude", _LOCATION): "lat",
+    (f"{{{SIRI_NS}}}Longitude", _LOCATION): "lon",
+}
+STRING_COLUMNS = ["vehicle_ref", "journey_ref", "stop_ref", "recorded_at"]
+
+
+def parse_siri_vm(source):
+    """
+    Stream-parse a SIRI-VM VehicleMonitoring document.
+
+    Args:
+        source: Raw bytes/str of the feed, or a path / file object.
+    Returns:
+        (df, dataset_timestamp): DataFrame with columns vehicle_ref,
+        journey_ref, stop_ref, recorded_at (ISO8601 strings) and lat/lon
+        (float64), one row per VehicleActivity that has a location; and the
+        newest RecordedAtTime in the document (None if there is none).
+    """
+    if isinstance(source, str) and source.lstrip().startswith("<"):
+        source = source.encode("utf-8")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+
+    lat_col = array("d")
+    lon_col = array("d")
+    str_cols = {c: [] for c in STRING_COLUMNS}
+    dataset_timestamp = None
+
+    row = dict.fromkeys(_FIELDS.values())
+    stack = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        tag = elem.tag
+        if tag == _ACTIVITY:
+            recorded_at = row["recorded_at"]
+            if recorded_at and (dataset_timestamp is None or recorded_at > dataset_timestamp):
+                dataset_timestamp = recorded_at
+            if row["lat"] and row["lon"]:
+                lat_col.append(float(row["lat"]))
+                lon_col.append(float(row["lon"]))
+                for c in STRING_COLUMNS:
+                    str_cols[c].append(row[c])
+            row = dict.fromkeys(_FIELDS.values())
+            # Drop the finished activity so the tree never holds more than one
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+        elif stack:
+            column = _FIELDS.get((tag, stack[-1].tag))
+            if column is not None:
+                row[column] = elem.text
+
+    df = pd.DataFrame(
+        {
+            **{c: np.array(str_cols[c], dtype=object) for c in STRING_COLUMNS[:3]},
+            "lat": np.frombuffer(lat_col, dtype=np.float64),
+            "lon": np.frombuffer(lon_col, dtype=np.float64),
+            "recorded_at": np.array(str_cols["recorded_at"], dtype=object),
+        }
+    )
+    return df, dataset_timestamp
+
+
+def to_geodataframe(df, crs="EPSG:4326"):
+    """Attach point geometries built in one vectorized call from lon/lat."""
+    return gpd.GeoDataFrame(
+        df,
+        geometry=gpd.points_from_xy(df["lon"].to_numpy(), df["lat"].to_numpy()),
+        crs=crs,
+    )
@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyogrio
+from src.config import RAW_DATA_DIR
+
+# ---------------------------------------------
+# Bulk reader for per-poll snapshot files
+# ---------------------------------------------
+# The collector used to write one GPKG per feed version (bizkaibus_*.gpkg),
+# so history is thousands of small files. They are read here through the
+# Arrow path of pyogrio (only the needed columns, no geometry parsing) in
+# batches on a process pool, and the Arrow tables are concatenated once.
+# A file that cannot be read or lacks a column is moved to QUARANTINE_DIR
+# (keeping its path below RAW_DATA_DIR) with its reason logged, instead of
+# being skipped silently. A file that crashes the reader (GDAL segfault)
+# breaks the pool; the batches that were lost are then read again one file
+# per process, so only the culprit is quarantined.
+
+SNAPSHOT_GLOB = "bizkaibus_*.gpkg"
+SNAPSHOT_COLUMNS = ["vehicle_ref", "journey_ref", "stop_ref", "lat", "lon", "recorded_at"]
+QUARANTINE_DIR = RAW_DATA_DIR / "quarantine"
+QUARANTINE_LOG = QUARANTINE_DIR / "quarantine.jsonl"
+BATCH_SIZE = 32  # files per pool task
+
+
+def find_snapshot_files(directory=RAW_DATA_DIR):
+    """Snapshot GPKGs under `directory` (recursively), in name (= time) order."""
+    return sorted(p for p in Path(directory).rglob(SNAPSHOT_GLOB) if QUARANTINE_DIR not in p.parents)
+
+
+def read_snapshot_file(path, columns=SNAPSHOT_COLUMNS):
+    """One snapshot file as an Arrow Table with `columns` (all read as strings or doubles, as stored)."""
+    _, table = pyogrio.read_arrow(path, columns=columns, read_geometry=False)
+    missing = [c for c in columns if c not in table.column_names]
+    if missing:
+        raise ValueError(f"missing columns {missing}")
+    return table.select(columns)
+
+
+def _read_batch(batch, columns):
+    """Read a batch of (file number, path) in a worker: (tables, errors)."""
+    tables, errors = [], []
+    for number, path in batch:
+        try:
+            table = read_snapshot_file(path, columns)
+        except Exception as e:
+            errors.append((path, f"{type(e).__name__}: {e}"))
+            continue
+        tables.append(table.append_column("file", pa.array([number] * table.num_rows, pa.int32())))
+    return tables, errors
+
+
+def _read_file_isolated(number, path, columns):
+    """_read_batch of one file in a process of its own, so a crash only loses that file."""
+    try:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            return pool.submit(_read_batch, [(number, path)], columns).result()
+    except BrokenProcessPool:
+        return [], [(path, "BrokenProcessPool: the reader process crashed on this file")]
+
+
+def quarantine(path, reason):
+    """Move a malformed snapshot to QUARANTINE_DIR (same relative path) and log why."""
+    path = Path(path)
+    try:
+        relative = path.resolve().relative_to(RAW_DATA_DIR.resolve())
+    except ValueError:
+        relative = Path(path.name)
+    target = QUARANTINE_DIR / relative
+    if target.exists():
+        target = target.with_name(f"{target.stem}-{uuid.uuid4().hex[:8]}{target.suffix}")
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(path, target)
+    with open(QUARANTINE_LOG, "a") as f:
+        f.write(json.dumps({"file": str(path), "moved_to": str(target), "reason": reason,
+                            "at": pd.Timestamp.now(tz="UTC").isoformat()}) + "\n")
+    return target
+
+
+def read_snapshot_files(paths, columns=SNAPSHOT_COLUMNS, workers=None, batch_size=BATCH_SIZE,
+                        move_bad=True):
+    """
+    Read many snapshot files in parallel.
+
+    Args:
+        paths: Snapshot files.
+        columns: Columns to read.
+        workers: Processes (default: CPU count); 1 reads in this process.
+        batch_size: Files per pool task.
+        move_bad: Quarantine the files that fail (otherwise only report them).
+
+    Returns:
+        (DataFrame with `columns` plus "file", the position of the file in
+        `paths`; list of (path, reason) for the files that failed)
+    """
+    paths = [str(p) for p in paths]
+    numbered = list(enumerate(paths))
+    batches = [numbered[i:i + batch_size] for i in range(0, len(numbered), batch_size)]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(batches) <= 1:
+        results = [_read_batch(batch, columns) for batch in batches]
+    else:
+        results = [None] * len(batches)  # in batch order, so files stay in `paths` order
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_read_batch, batch, columns) for batch in batches]
+            for i, future in enumerate(futures):
+                try:
+                    results[i] = future.result()
+                except BrokenProcessPool:
+                    pass  # a worker died: every batch still in flight is lost
+        lost = [i for i, result in enumerate(results) if result is None]
+        if lost:
+            print(f"⚠️  Reader process crashed; re-reading {len(lost)} batches file by file")
+        for i in lost:
+            file_results = [_read_file_isolated(number, path, columns) for number, path in batches[i]]
+            results[i] = ([t for ts, _ in file_results for t in ts], [e for _, es in file_results for e in es])
+
+    tables = [t for batch_tables, _ in results for t in batch_tables]
+    errors = [e for _, batch_errors in results for e in batch_errors]
+
+    for path, reason in errors:
+        print(f"⚠️  Bad snapshot {path}: {reason}")
+        if move_bad:
+            quarantine(path, reason)
+
+    if not tables:
+        return pd.DataFrame(columns=[*columns, "file"]), errors
+    # Files disagree on types when a column was all-null in some of them
+    table = pa.concat_tables(tables, promote_options="permissive")
+    return table.to_pandas(), errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-read the per-poll snapshot GPKGs.")
+    parser.add_argument("directory", nargs="?", default=str(RAW_DATA_DIR))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-quarantine", action="store_true", help="only report bad files")
+    args = parser.parse_args()
+
+    files = find_snapshot_files(args.directory)
+    start_time = time.perf_counter()
+    df, bad = read_snapshot_files(files, workers=args.workers, move_bad=not args.no_quarantine)
+    print(f"✔️  {len(files) - len(bad)} files, {len(df)} rows in {time.perf_counter() - start_time:.2f}s "
+          f"({len(bad)} bad)")
@@ -0,0 +1,152 @@
+import os
+import threading
+import geopandas as gpd
+from src.config import PROCESSED_DATA_DIR
+from src.stop_network import collapse_stops
+
+# ---------------------------------------------
+# Static layer store
+# ---------------------------------------------
+# The static layers (Bizkaibus lines and stops, ...) are built once from
+# their source GPKG into a GeoParquet file that is already in WGS84 and has
+# only render-ready (JSON-serializable) columns. Within a process every layer
+# is then held in memory, keyed by the version (mtime + size) of its source,
+# so a rerun only costs an os.stat. Editing the source file invalidates both
+# the parquet file and the in-memory copy: the parquet records the version of
+# the source it was built from and PREPARE_VERSION, and is rebuilt when either
+# differs.
+
+LAYER_CACHE_DIR = PROCESSED_DATA_DIR / "cache"
+PREPARE_VERSION = 1  # bump when a prepare function or render_ready changes its output
+
+# name -> (source path, layer inside the source or None, prepare function or None)
+STATIC_LAYERS = {
+    "bus_lines": (PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_lines.gpkg", "lines", None),
+    "bus_stops": (PROCESSED_DATA_DIR / "Bizkaibus" / "bizkaibus_stops.gpkg", "stops", collapse_stops),
+    "boundary": (PROCESSED_DATA_DIR / "bizkaia_boundary.gpkg", None, None),
+    "metro_lines": (PROCESSED_DATA_DIR / "metro" / "bilbao_lines.geojson", None, None),
+    "renfe_lines": (PROCESSED_DATA_DIR / "renfe" / "renfe_lines.gpkg", "lines", None),
+    "renfe_stops": (PROCESSED_DATA_DIR / "renfe" / "renfe_stops.gpkg", "stops", None),
+}
+
+_layers = {}   # name -> (version, gdf)
+_derived = {}  # (names, kind) -> (versions, value)
+_lock = threading.Lock()
+
+
+def layer_version(name):
+    """Version of layer `name`: (mtime_ns, size) of its source file, or of
+    the built parquet when the source is not available."""
+    source = STATIC_LAYERS[name][0]
+    for path in (source, _parquet_path(name)):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        return (st.st_mtime_ns, st.st_size)
+    raise FileNotFoundError(f"No source or built file for static layer '{name}': {source}")
+
+
+def _parquet_path(name):
+    return LAYER_CACHE_DIR / f"{name}.parquet"
+
+
+def render_ready(gdf):
+    """
+    `gdf` in EPSG:4326 (assumed when it has no CRS) with datetime columns as
+    strings (folium cannot serialize them), copying only if needed.
+    """
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    elif gdf.crs != "EPSG:4326":
+        gdf = gdf.to_crs("EPSG:4326")
+    datetime_cols = gdf.select_dtypes(include=["datetime", "datetimetz"]).columns
+    if len(datetime_cols):
+        gdf = gdf.assign(**{col: gdf[col].astype(str) for col in datetime_cols})
+    return gdf
+
+
+def _build_stamp(name):
+    """What a built parquet must record to be current (None if the source is missing)."""
+    try:
+        st = os.stat(STATIC_LAYERS[name][0])
+    except FileNotFoundError:
+        return None
+    return {"source": [st.st_mtime_ns, st.st_size], "prepare_version": PREPARE_VERSION}
+
+
+def build_layer(name):
+    """(Re)build the GeoParquet file of layer `name` from its source."""
+    source, layer, prepare = STATIC_LAYERS[name]
+    stamp = _build_stamp(name)  # before reading: an edit during the build triggers a rebuild
+    gdf = gpd.read_file(source, layer=layer)
+    if prepare is not None:
+        gdf = prepare(gdf)
+    gdf = render_ready(gdf)
+    # Stored in the parquet metadata (pandas attrs) and checked by _read_layer
+    gdf.attrs["build"] = stamp
+    LAYER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _parquet_path(name)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    gdf.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return gdf
+
+
+def _read_layer(name):
+    """Built parquet of `name` if it matches its source and PREPARE_VERSION, else a rebuild."""
+    path = _parquet_path(name)
+    stamp = _build_stamp(name)
+    if path.exists():
+        gdf = gpd.read_parquet(path)
+        if stamp is None or gdf.attrs.get("build") == stamp:
+            return gdf
+    return build_layer(name)
+
+
+def load_layer(name):
+    """
+    Layer `name` as a GeoDataFrame in EPSG:4326. Served from memory while
+    the source is unchanged; the frame is shared, so treat it as read-only.
+    """
+    version = layer_version(name)
+    with _lock:
+        cached = _layers.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    gdf = _read_layer(name)
+    # Lets consumers find prebuilt derivatives (e.g. src.line_geometry) for rows of this layer
+    gdf.attrs["static_layer"] = name
+    gdf.attrs["static_layer_version"] = version
+    with _lock:
+        _layers[name] = (version, gdf)
+    return gdf
+
+
+def get_derived(names, kind, build):
+    """
+    Value `build(*layers)` memoized per version of the static layer(s)
+    `names` (a name or a tuple of names). Used for structures derived from
+    static layers (indexes, simplified geometries, ...) so they are rebuilt
+    only when a source changes.
+    """
+    names = (names,) if isinstance(names, str) else tuple(names)
+    version = tuple(layer_version(name) for name in names)
+    key = (names, kind)
+    with _lock:
+        cached = _derived.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    value = build(*(load_layer(name) for name in names))
+    with _lock:
+        _derived[key] = (version, value)
+    return value
+
+
+if __name__ == "__main__":
+    for layer_name, (source_path, _, _) in STATIC_LAYERS.items():
+        if source_path.exists():
+            built = build_layer(layer_name)
+            print(f"✔️  {layer_name}: {len(built)} features → {_parquet_path(layer_name)}")
+        else:
+            print(f"⚠️  {layer_name}: source not found ({source_path})")
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------
+# Bizkaibus stop model
+# ---------------------------------------------
+# Every stop appears once, with the lines serving it in a comma-separated
+# `line_ids` column. The line <-> stop relation is kept as two CSR arrays
+# (offsets + indices) so "stops of these lines" and "lines of these stops"
+# are slices of NumPy arrays instead of table scans. Code written for the
+# old one-row-per-stop-line table can get it back with `explode_stops`.
+
+STOP_ID_COL = "CodigoReducidoParada"
+
+
+def _line_ids_from_routes(routes):
+    """'A3641_Orduña-Galdakao,A3641_...' → 'A3641' (unique, in order)."""
+    parts = [p.split("_", 1)[0].strip() for p in (routes or "").split(",") if p.strip()]
+    return ",".join(dict.fromkeys(parts))
+
+
+def collapse_stops(stops, stop_col=STOP_ID_COL):
+    """
+    One row per stop with a `line_ids` column. Accepts the old exploded
+    table (one row per stop-line pair, `line_id` column), a table with only
+    `CodificacionRuta`, or an already collapsed one.
+    """
+    if "line_ids" in stops.columns:
+        return stops
+    if "line_id" in stops.columns:
+        joined = (
+            stops[[stop_col, "line_id"]]
+            .dropna()
+            .astype(str)
+            .drop_duplicates()
+            .groupby(stop_col, sort=False)["line_id"]
+            .agg(",".join)
+        )
+        unique = stops[~stops[stop_col].duplicated()].drop(columns="line_id")
+        # `joined` is keyed by the stop id as a string (integer ids included)
+        unique = unique.assign(line_ids=unique[stop_col].astype(str).map(joined).fillna(""))
+    else:
+        unique = stops[~stops[stop_col].duplicated()]
+        unique = unique.assign(line_ids=unique["CodificacionRuta"].map(_line_ids_from_routes))
+    return unique.reset_index(drop=True)
+
+
+def explode_stops(stops, line_ids_col="line_ids"):
+    """
+    Inverse of `collapse_stops`: one row per stop-line pair with a `line_id`
+    column, the layout bizkaibus_stops.gpkg had before it was collapsed.
+    Stops served by no line keep one row with an empty line_id.
+    """
+    if line_ids_col not in stops.columns:
+        return stops
+    line_id = stops[line_ids_col].fillna("").str.split(",")
+    exploded = stops.drop(columns=line_ids_col).assign(line_id=line_id).explode("line_id")
+    return exploded.reset_index(drop=True)
+
+
+def build_adjacency(stops, line_ids_col="line_ids"):
+    """
+    CSR adjacency between lines and the (unique) rows of `stops`.
+
+    Returns
+    -------
+    dict with
+        line_ids : sorted array of line ids; line_pos maps id -> position
+        line_offsets, line_stops : stops of line i are
+            line_stops[line_offsets[i]:line_offsets[i + 1]] (row positions)
+        stop_offsets, stop_lines : lines of stop j are
+            stop_lines[stop_offsets[j]:stop_offsets[j + 1]] (line positions)
+    """
+    pairs = stops[line_ids_col].fillna("").str.split(",").explode()
+    pairs = pairs[pairs.notna() & (pairs != "")]
+    stop_pos = stops.index.get_indexer(pairs.index).astype(np.int64)
+    line_codes, line_ids = pd.factorize(pairs.to_numpy(), sort=True)
+    line_codes = line_codes.astype(np.int64)
+    n_lines, n_stops = len(line_ids), len(stops)
+
+    by_line = np.lexsort((stop_pos, line_codes))
+    by_stop = np.lexsort((line_codes, stop_pos))
+    line_ids = np.asarray(line_ids, dtype=object)
+    return {
+        "line_ids": line_ids,
+        "line_pos": {line: i for i, line in enumerate(line_ids)},
+        "line_offsets": np.concatenate([[0], np.cumsum(np.bincount(line_codes, minlength=n_lines))]),
+        "line_stops": stop_pos[by_line],
+        "stop_offsets": np.concatenate([[0], np.cumsum(np.bincount(stop_pos, minlength=n_stops))]),
+        "stop_lines": line_codes[by_stop],
+    }
+
+
+def _gather_ranges(values, offsets, rows):
+    """Concatenation of values[offsets[r]:offsets[r + 1]] for every r in rows."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts, ends = offsets[rows], offsets[rows + 1]
+    lengths = ends - starts
+    if lengths.sum() == 0:
+        return values[:0]
+    # Position of every gathered element: its range start + rank inside the range
+    shift = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+    return values[np.arange(lengths.sum()) + shift]
+
+
+def stops_of_lines(adjacency, line_ids):
+    """Sorted unique row positions of the stops served by any of `line_ids`."""
+    line_pos = adjacency["line_pos"]
+    rows = [line_pos[l] for l in set(line_ids) if l in line_pos]
+    return np.unique(_gather_ranges(adjacency["line_stops"], adjacency["line_offsets"], rows))
+
+
+def lines_of_stops(adjacency, stop_positions):
+    """Sorted unique line ids serving any of the stops at `stop_positions`."""
+    codes = _gather_ranges(adjacency["stop_lines"], adjacency["stop_offsets"], stop_positions)
+    return adjacency["line_ids"][np.unique(codes)].tolist()
@@ -0,0 +1,214 @@
+import gzip
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.config import TILE_SERVER_HOST, TILE_SERVER_PORT
+from src.static_layers import layer_version
+from src.tiles import MBTILES_PATH, TILE_LAYERS, encode_tile, prepare_layers
+
+# ---------------------------------------------
+# Vector tile server
+# ---------------------------------------------
+# Serves /tiles/{z}/{x}/{y}.pbf (python -m src.tile_server; make_server for
+# embedding it in another process).
+# Tiles come from the MBTiles archive built by src.tiles when it covers the
+# zoom, and are otherwise generated on demand from the static layers (STRtree
+# per zoom, see src.tiles.encode_tile). Encoded tiles are kept gzipped in a
+# bounded LRU cache keyed by the version of the static layers, and served with
+# an ETag so browsers revalidate with a 304 instead of downloading them again.
+
+CACHE_SIZE = 2048      # tiles kept in memory
+MAX_AGE = 3600         # Cache-Control max-age, seconds
+VERSION_TTL = 2.0      # seconds a checked source version is trusted without an os.stat
+TILE_PATH = re.compile(r"^/tiles/(\d+)/(\d+)/(\d+)\.(?:pbf|mvt)$")
+MVT_CONTENT_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+class TileSource:
+    """
+    Gzipped MVT tiles by (z, x, y): MBTiles archive first, then on-demand
+    generation, behind an LRU cache.
+    """
+
+    def __init__(self, mbtiles_path=MBTILES_PATH, names=None, cache_size=CACHE_SIZE):
+        self.mbtiles_path = mbtiles_path
+        self.names = list(names or TILE_LAYERS)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (version, z, x, y) -> (data or None, etag)
+        self._lock = threading.Lock()
+        self._layers = None          # (version, prepared layers)
+        self._build_lock = threading.Lock()  # one prepare_layers at a time
+        self._version = None         # (monotonic time checked, version)
+        self._archive_lock = threading.Lock()
+        self._archive = None         # (file identity, connection, min zoom, max zoom)
+        self.stats = {"hits": 0, "misses": 0, "archive": 0, "generated": 0, "empty": 0}
+
+    # ---- versions and sources ---------------------------------------------
+    def version(self):
+        """
+        Versions of the source layers (+ archive), part of every cache key and
+        ETag. Re-checked at most every VERSION_TTL seconds, so a burst of tile
+        requests does not stat every source per tile.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._version[0] < VERSION_TTL:
+                return self._version[1]
+        version = self._check_version()
+        with self._lock:
+            self._version = (now, version)
+        return version
+
+    def _check_version(self):
+        versions = []
+        for name in self.names:
+            try:
+                versions.append(layer_version(TILE_LAYERS[name][0]))
+            except FileNotFoundError:
+                versions.append(None)
+        if self.mbtiles_path.exists():
+            st = self.mbtiles_path.stat()
+            versions.append((st.st_mtime_ns, st.st_size))
+        return tuple(versions)
+
+    def _read_archive(self, z, x, y):
+        """
+        Tile from the MBTiles archive: (True, data or None) when the archive
+        covers zoom `z`, (False, None) otherwise. ThreadingHTTPServer runs
+        every request on a new thread, so one read-only connection is shared
+        (under its own lock) and reopened only when the file changes.
+        """
+        try:
+            st = self.mbtiles_path.stat()
+        except FileNotFoundError:
+            return False, None
+        identity = (st.st_mtime_ns, st.st_size)
+        with self._archive_lock:
+            if self._archive is None or self._archive[0] != identity:
+                if self._archive is not None:
+                    self._archive[1].close()
+                con = sqlite3.connect(f"file:{self.mbtiles_path}?mode=ro", uri=True, check_same_thread=False)
+                meta = dict(con.execute("SELECT name, value FROM metadata").fetchall())
+                self._archive = (identity, con, int(meta.get("minzoom", 0)), int(meta.get("maxzoom", -1)))
+            _, con, min_zoom, max_zoom = self._archive
+            if not min_zoom <= z <= max_zoom:
+                return False, None
+            row = con.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level=? AND tile_column=? AND tile_row=?",
+                (z, x, (2 ** z - 1) - y),
+            ).fetchone()
+        return True, row[0] if row else None
+
+    def _prepared_layers(self, version):
+        with self._lock:
+            if self._layers is not None and self._layers[0] == version:
+                return self._layers[1]
+        # Concurrent misses wait for one build instead of each reprojecting every layer
+        with self._build_lock:
+            with self._lock:
+                if self._layers is not None and self._layers[0] == version:
+                    return self._layers[1]
+            layers = prepare_layers(self.names)
+            with self._lock:
+                self._layers = (version, layers)
+        return layers
+
+    def _load(self, version, z, x, y):
+        covered, data = self._read_archive(z, x, y)
+        if covered:
+            self._count("archive")
+            return data
+        data = encode_tile(self._prepared_layers(version), z, x, y)
+        self._count("generated")
+        return None if data is None else gzip.compress(data, compresslevel=6)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # ---- public ---------------------------------------------------------
+    def get(self, z, x, y):
+        """(gzipped MVT or None when the tile is empty, etag)."""
+        version = self.version()
+        key = (version, z, x, y)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry
+            self.stats["misses"] += 1
+
+        data = self._load(version, z, x, y)
+        etag = '"' + hashlib.blake2b(repr(key).encode(), digest_size=12).hexdigest() + '"'
+        with self._lock:
+            if data is None:
+                self.stats["empty"] += 1
+            self._cache[key] = (data, etag)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return data, etag
+
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    source = None  # TileSource, set by make_server
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/stats":
+            with self.source._lock:
+                stats = {**self.source.stats, "cached": len(self.source._cache)}
+            body = json.dumps(stats).encode()
+            return self._send(200, body, {"Content-Type": "application/json"})
+        match = TILE_PATH.match(self.path.split("?")[0])
+        if match is None:
+            return self._send(404, b"not found", {"Content-Type": "text/plain"})
+        z, x, y = (int(v) for v in match.groups())
+        if x >= 2 ** z or y >= 2 ** z:
+            return self._send(404, b"tile out of range", {"Content-Type": "text/plain"})
+
+        data, etag = self.source.get(z, x, y)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={MAX_AGE}"}
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, b"", headers)
+        if data is None:
+            return self._send(204, b"", headers)
+        headers["Content-Type"] = MVT_CONTENT_TYPE
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            data = gzip.decompress(data)
+        headers["Vary"] = "Accept-Encoding"
+        return self._send(200, data, headers)
+
+    do_HEAD = do_GET
+
+    def _send(self, status, body, headers):
+        self.send_response(status)
+        self.send_header("Access-Control-Allow-Origin", "*")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per tile would flood the log
+
+
+def make_server(host=TILE_SERVER_HOST, port=TILE_SERVER_PORT, source=None):
+    """ThreadingHTTPServer serving `source` (default: a new TileSource)."""
+    handler = type("Handler", (TileRequestHandler,), {"source": source or TileSource()})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    server = make_server()
+    print(f"Serving vector tiles on http://{TILE_SERVER_HOST}:{TILE_SERVER_PORT}/tiles/{{z}}/{{x}}/{{y}}.pbf")
+    server.serve_forever()
@@ -0,0 +1,265 @@
+import argparse
+import gzip
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import mapbox_vector_tile
+import mercantile
+import numpy as np
+import shapely
+from src.config import PROCESSED_DATA_DIR
+from src.static_layers import load_layer
+
+# ---------------------------------------------
+# Vector tiles (MVT) for the static layers
+# ---------------------------------------------
+# Every layer is projected to web mercator once. For each zoom its geometries
+# are simplified to one tile pixel (1/EXTENT of a tile) and put in an STRtree,
+# so a tile only clips and encodes the features the tree returns for its box.
+# Tiles are built in batches on a process pool and written to one MBTiles
+# archive (gzipped MVT, TMS rows) instead of loose z/x/y files.
+
+EXTENT = 4096   # MVT coordinate units per tile side
+BUFFER = 64     # units of geometry kept outside the tile (avoids seams at edges)
+MIN_ZOOM, MAX_ZOOM = 8, 14
+BATCH_SIZE = 256
+MBTILES_PATH = PROCESSED_DATA_DIR / "tiles" / "bizkaia.mbtiles"
+WEB_MERCATOR_HALF = 20037508.342789244  # metres from the origin to the edge of the world
+
+# tile layer -> (static layer, properties kept, min zoom)
+TILE_LAYERS = {
+    "bus_lines": ("bus_lines", ["line_id"], 8),
+    "bus_stops": ("bus_stops", ["CodigoReducidoParada", "Denominacion"], 12),
+    "metro_lines": ("metro_lines", ["route_id"], 8),
+    "renfe_lines": ("renfe_lines", ["nombre"], 8),
+    "renfe_stops": ("renfe_stops", ["nombre"], 11),
+}
+
+
+_zooms_lock = threading.Lock()  # guards the per-zoom caches of prepared layers
+
+
+def tile_size_m(zoom):
+    return 2 * WEB_MERCATOR_HALF / 2 ** zoom
+
+
+def tile_bounds_m(x, y, zoom):
+    """(minx, miny, maxx, maxy) of XYZ tile x/y/zoom in EPSG:3857 metres."""
+    size = tile_size_m(zoom)
+    minx = -WEB_MERCATOR_HALF + x * size
+    maxy = WEB_MERCATOR_HALF - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+# ======================================================
+# 1) LAYERS
+# ======================================================
+def prepare_layers(names=None):
+    """
+    Static layers as plain arrays ready for tiling: dict tile layer ->
+    {"geometry": 2D EPSG:3857 geometries, "properties": list of dicts,
+    "minzoom": int}. Layers whose source is missing are skipped.
+    """
+    prepared = {}
+    for name in names or TILE_LAYERS:
+        layer_name, columns, minzoom = TILE_LAYERS[name]
+        try:
+            gdf = load_layer(layer_name)
+        except FileNotFoundError as e:
+            print(f"⚠️  {name}: {e}")
+            continue
+        gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+        columns = [c for c in columns if c in gdf.columns]
+        records = gdf[columns].astype(object).where(gdf[columns].notna(), None).to_dict("records")
+        prepared[name] = {
+            "geometry": shapely.force_2d(gdf.geometry.to_crs("EPSG:3857").values.to_numpy()),
+            "properties": [{k: v for k, v in r.items() if v is not None} for r in records],
+            "minzoom": minzoom,
+        }
+    return prepared
+
+
+def _layer_at_zoom(layer, zoom):
+    """
+    (simplified geometries, STRtree) of a prepared layer at `zoom`, built
+    once. The tile server calls this from its handler threads, hence the lock.
+    """
+    with _zooms_lock:
+        cache = layer.setdefault("zooms", {})
+        if zoom not in cache:
+            geometry = layer["geometry"]
+            if not (shapely.get_type_id(geometry) == 0).all():  # points need no simplification
+                geometry = shapely.simplify(geometry, tile_size_m(zoom) / EXTENT, preserve_topology=True)
+            cache[zoom] = (geometry, shapely.STRtree(geometry))
+        return cache[zoom]
+
+
+def layers_bounds(layers):
+    """(west, south, east, north) in degrees covering all prepared layers."""
+    bounds = np.array([shapely.total_bounds(layer["geometry"]) for layer in layers.values()])
+    minx, miny = bounds[:, 0].min(), bounds[:, 1].min()
+    maxx, maxy = bounds[:, 2].max(), bounds[:, 3].max()
+    west, south = mercantile.lnglat(minx, miny)
+    east, north = mercantile.lnglat(maxx, maxy)
+    return west, south, east, north
+
+
+# ======================================================
+# 2) TILE ENCODING
+# ======================================================
+def encode_tile(layers, zoom, x, y):
+    """MVT bytes (uncompressed) of tile zoom/x/y, or None when it is empty."""
+    minx, miny, maxx, maxy = tile_bounds_m(x, y, zoom)
+    margin = tile_size_m(zoom) * BUFFER / EXTENT
+    clip_box = (minx - margin, miny - margin, maxx + margin, maxy + margin)
+
+    encoded = []
+    for name, layer in layers.items():
+        if zoom < layer["minzoom"]:
+            continue
+        geometry, tree = _layer_at_zoom(layer, zoom)
+        candidates = tree.query(shapely.box(*clip_box), predicate="intersects")
+        if len(candidates) == 0:
+            continue
+        clipped = shapely.clip_by_rect(geometry[candidates], *clip_box)
+        keep = ~shapely.is_empty(clipped)
+        if not keep.any():
+            continue
+        properties = layer["properties"]
+        encoded.append({
+            "name": name,
+            "features": [
+                {"geometry": geom, "properties": properties[i]}
+                for geom, i in zip(clipped[keep], candidates[keep])
+            ],
+        })
+    if not encoded:
+        return None
+    return mapbox_vector_tile.encode(
+        encoded, default_options={"quantize_bounds": (minx, miny, maxx, maxy), "extents": EXTENT}
+    )
+
+
+# Prepared layers of a pool worker (sent once through the initializer)
+_worker_layers = None
+
+
+def _init_worker(layers):
+    global _worker_layers
+    _worker_layers = layers
+
+
+def _encode_batch(tiles):
+    """Encode a batch of (zoom, x, y) in a worker: list of (zoom, x, y, gzipped MVT)."""
+    out = []
+    for zoom, x, y in tiles:
+        data = encode_tile(_worker_layers, zoom, x, y)
+        if data is not None:
+            out.append((zoom, x, y, gzip.compress(data, compresslevel=6)))
+    return out
+
+
+# ======================================================
+# 3) MBTILES
+# ======================================================
+def open_mbtiles(path):
+    """Create (or truncate) an MBTiles archive and return the connection."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+    con = sqlite3.connect(path)
+    con.executescript("""
+        CREATE TABLE metadata (name TEXT, value TEXT);
+        CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB);
+        CREATE UNIQUE INDEX tile_index ON tiles (zoom_level, tile_column, tile_row);
+    """)
+    return con
+
+
+def write_tiles(con, tiles):
+    """Insert (zoom, x, y, data) tiles, XYZ y converted to the TMS rows of MBTiles."""
+    con.executemany(
+        "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?)",
+        [(z, x, (2 ** z - 1) - y, data) for z, x, y, data in tiles],
+    )
+
+
+def write_metadata(con, layers, min_zoom, max_zoom, bounds):
+    west, south, east, north = bounds
+    vector_layers = [
+        {"id": name, "fields": {k: "String" for k in TILE_LAYERS[name][1]},
+         "minzoom": max(layer["minzoom"], min_zoom), "maxzoom": max_zoom}
+        for name, layer in layers.items()
+    ]
+    metadata = {
+        "name": "bizkaia",
+        "format": "pbf",
+        "type": "overlay",
+        "minzoom": str(min_zoom),
+        "maxzoom": str(max_zoom),
+        "bounds": f"{west},{south},{east},{north}",
+        "center": f"{(west + east) / 2},{(south + north) / 2},{min_zoom}",
+        "json": json.dumps({"vector_layers": vector_layers}),
+    }
+    con.executemany("INSERT INTO metadata VALUES (?, ?)", metadata.items())
+
+
+# ======================================================
+# 4) BUILD
+# ======================================================
+def build_tiles(path=MBTILES_PATH, names=None, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM,
+                workers=None, batch_size=BATCH_SIZE):
+    """
+    Build the MBTiles archive for `names` (default: all TILE_LAYERS) over
+    min_zoom..max_zoom. Returns a dict with tiles written, tiles scanned,
+    seconds and tiles per second.
+    """
+    start = time.perf_counter()
+    layers = prepare_layers(names)
+    if not layers:
+        raise ValueError("No tile layer could be loaded")
+    bounds = layers_bounds(layers)
+    workers = workers or os.cpu_count() or 1
+
+    tiles = [(t.z, t.x, t.y) for t in mercantile.tiles(*bounds, zooms=range(min_zoom, max_zoom + 1))]
+    batches = [tiles[i:i + batch_size] for i in range(0, len(tiles), batch_size)]
+    print(f"Building {len(tiles)} tiles (z{min_zoom}-{max_zoom}, {len(layers)} layers) on {workers} workers...")
+
+    con = open_mbtiles(path)
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(layers,)) as pool:
+        for future in as_completed([pool.submit(_encode_batch, batch) for batch in batches]):
+            encoded = future.result()
+            write_tiles(con, encoded)
+            written += len(encoded)
+    write_metadata(con, layers, min_zoom, max_zoom, bounds)
+    con.commit()
+    con.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "tiles": written,
+        "scanned": len(tiles),
+        "seconds": elapsed,
+        "tiles_per_s": len(tiles) / elapsed if elapsed else math.inf,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the vector tile archive of the static layers.")
+    parser.add_argument("--out", type=str, default=str(MBTILES_PATH), help="MBTiles file to write")
+    parser.add_argument("--layers", nargs="+", choices=list(TILE_LAYERS), help="tile layers (default: all)")
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    args = parser.parse_args()
+
+    from pathlib import Path
+    result = build_tiles(Path(args.out), args.layers, args.min_zoom, args.max_zoom, args.workers)
+    size_mb = Path(args.out).stat().st_size / 1e6
+    print(f"✔️  {result['tiles']} tiles ({result['scanned']} scanned) in {result['seconds']:.1f}s "
+          f"→ {result['tiles_per_s']:.0f} tiles/s, {size_mb:.1f} MB → {args.out}")
@@ -0,0 +1,135 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# ---------------------------------------------
+# Vectorized trajectories
+# ---------------------------------------------
+# Points are sorted once by (vehicle_ref, recorded_at) into flat arrays. A
+# trajectory starts wherever the vehicle or its journey_ref changes or the
+# vehicle was away for longer than a gap; the starts give an offsets
+# array (trajectory i = points offsets[i]:offsets[i + 1]). Lines are built in
+# one shapely.linestrings call and the per-trajectory stats come from
+# np.*.reduceat over the same arrays, so there is no Python work per vehicle
+# or per trajectory.
+
+MAX_GAP = pd.Timedelta(minutes=10)  # longer absences end a trajectory
+MIN_POINTS = 2
+EARTH_RADIUS_M = 6_371_000.0
+TRAJECTORY_COLS = ["vehicle_ref", "journey_ref", "stop_ref", "start_time", "end_time",
+                   "duration_s", "length_m", "n_points"]
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres between arrays of points (degrees)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def sort_points(points):
+    """Points sorted by vehicle and time, one row per (vehicle_ref, recorded_at)."""
+    points = points.drop_duplicates(["vehicle_ref", "recorded_at"], keep="last")
+    return points.sort_values(["vehicle_ref", "recorded_at"], kind="stable", ignore_index=True)
+
+
+def _utc_naive(times):
+    """datetime64 array (naive UTC) of a Series of timestamps."""
+    return pd.to_datetime(times, utc=True).dt.tz_convert(None).to_numpy()
+
+
+def trajectory_starts(points, max_gap=MAX_GAP, absent=None):
+    """
+    Boolean array over sorted `points`: True where a new trajectory starts.
+
+    A silence longer than `max_gap` only ends a trajectory when the vehicle
+    was actually away: `absent` (one flag per point, True when the vehicle
+    left the feed since its previous point) when the caller knows it;
+    otherwise every long silence counts, except after a point flagged
+    `stationary` (a standing vehicle stays on its trajectory).
+    """
+    vehicle = points["vehicle_ref"].to_numpy()
+    journey = points["journey_ref"].fillna("").to_numpy()
+    t = _utc_naive(points["recorded_at"])
+    gap = (t[1:] - t[:-1]) > pd.Timedelta(max_gap).to_timedelta64()
+    if absent is not None:
+        gap &= np.asarray(absent, dtype=bool)[1:]
+    elif "stationary" in points.columns:
+        gap &= ~points["stationary"].fillna(False).to_numpy(dtype=bool)[:-1]
+    starts = np.ones(len(points), dtype=bool)
+    starts[1:] = (vehicle[1:] != vehicle[:-1]) | (journey[1:] != journey[:-1]) | gap
+    return starts
+
+
+def offsets_from_starts(starts):
+    """Offsets array (n_trajectories + 1) from trajectory start flags."""
+    return np.append(np.flatnonzero(starts), len(starts))
+
+
+def trajectory_ids(offsets):
+    """Trajectory number of every point."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def select_trajectories(points, offsets, mask):
+    """(points, offsets) of the trajectories where boolean `mask` is True."""
+    counts = np.diff(offsets)
+    return (points[np.repeat(mask, counts)].reset_index(drop=True),
+            np.append(0, np.cumsum(counts[mask])))
+
+
+def trajectory_stats(points, offsets):
+    """
+    DataFrame with one row per trajectory: vehicle/journey/stop of its first
+    point, start_time, end_time, duration_s, length_m, n_points.
+    """
+    first, last = offsets[:-1], offsets[1:] - 1
+    lat, lon = points["lat"].to_numpy(dtype=float), points["lon"].to_numpy(dtype=float)
+    t = _utc_naive(points["recorded_at"])
+
+    # step i goes from point i to i + 1; steps crossing a trajectory boundary
+    # are zeroed so reduceat over the starts sums each trajectory's own steps
+    steps = np.zeros(len(points))
+    if len(points) > 1:
+        steps[:-1] = haversine_m(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    steps[last] = 0.0
+    length = np.add.reduceat(steps, first) if len(first) else np.zeros(0)
+
+    recorded_at = points["recorded_at"]
+    return pd.DataFrame({
+        "vehicle_ref": points["vehicle_ref"].to_numpy()[first],
+        "journey_ref": points["journey_ref"].to_numpy()[first],
+        "stop_ref": points["stop_ref"].to_numpy()[first],
+        "start_time": recorded_at.take(first).to_numpy(),
+        "end_time": recorded_at.take(last).to_numpy(),
+        "duration_s": (t[last] - t[first]) / np.timedelta64(1, "s"),
+        "length_m": length,
+        "n_points": np.diff(offsets),
+    })
+
+
+def build_trajectories(points, offsets=None, max_gap=MAX_GAP, min_points=MIN_POINTS):
+    """
+    GeoDataFrame (EPSG:4326) with one LineString and its stats
+    (TRAJECTORY_COLS) per trajectory of at least `min_points` points.
+
+    Args:
+        points: Points with vehicle_ref, journey_ref, stop_ref, recorded_at,
+            lat, lon, sorted as by sort_points.
+        offsets: Trajectory offsets; computed with `max_gap` when None.
+        max_gap: Absence that ends a trajectory (see trajectory_starts).
+        min_points: Shorter trajectories are dropped (a line needs 2).
+    """
+    if offsets is None:
+        offsets = offsets_from_starts(trajectory_starts(points, max_gap))
+    keep = np.diff(offsets) >= max(min_points, 2)
+    if not keep.any():
+        return gpd.GeoDataFrame(columns=[*TRAJECTORY_COLS, "geometry"], geometry="geometry", crs="EPSG:4326")
+    points, offsets = select_trajectories(points, offsets, keep)
+
+    lines = shapely.linestrings(
+        points["lon"].to_numpy(dtype=float), points["lat"].to_numpy(dtype=float),
+        indices=trajectory_ids(offsets),
+    )
+    return gpd.GeoDataFrame(trajectory_stats(points, offsets), geometry=lines, crs="EPSG:4326")
@@ -0,0 +1,102 @@
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------------------------------------
+# Shared HTTP transport
+# ---------------------------------------------
+# One pooled keep-alive session per process, so repeated polls of the same
+# hosts reuse TCP/TLS connections, plus conditional GETs (ETag /
+# If-Modified-Since) so an unchanged feed is neither re-downloaded nor
+# re-parsed.
+
+POOL_CONNECTIONS = 8  # number of hosts kept in the pool
+POOL_MAXSIZE = 16     # connections per host (concurrent fetches)
+
+_session = None
+_session_lock = threading.Lock()
+
+# (url, parse, args) -> {"etag", "last_modified", "result"}
+_conditional_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_session():
+    """Return the process-wide pooled session (created on first use)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({"Accept-Encoding": "gzip, deflate"})
+            _session = session
+    return _session
+
+
+def get(url, timeout=None, **kwargs):
+    """GET through the pooled session. Raises on HTTP errors."""
+    resp = get_session().get(url, timeout=timeout, **kwargs)
+    resp.raise_for_status()
+    return resp
+
+
+def fetch_parsed(url, parse, *args, timeout=None):
+    """
+    Conditional GET of `url` followed by `parse(content, *args)`.
+
+    The validators (ETag / Last-Modified) and the parsed result are kept per
+    (url, parse, args). When the server answers 304 Not Modified the previous
+    result is returned as is, without downloading or parsing anything. The
+    cached result is shared between callers, so treat it as read-only.
+
+    Returns:
+        (result, info) where info is a dict with status, fetch_s, parse_s and
+        bytes (0 on a 304).
+    """
+    key = (url, parse, repr(args))
+    with _cache_lock:
+        entry = _conditional_cache.get(key)
+
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    t0 = time.perf_counter()
+    resp = get_session().get(url, headers=headers, timeout=timeout)
+    t1 = time.perf_counter()
+
+    if resp.status_code == 304 and entry is not None:
+        return entry["result"], {"status": 304, "fetch_s": t1 - t0, "parse_s": 0.0, "bytes": 0}
+
+    resp.raise_for_status()
+    result = parse(resp.content, *args)
+    t2 = time.perf_counter()
+
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if etag or last_modified:
+        with _cache_lock:
+            _conditional_cache[key] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "result": result,
+            }
+
+    return result, {
+        "status": resp.status_code,
+        "fetch_s": t1 - t0,
+        "parse_s": t2 - t1,
+        "bytes": len(resp.content),
+    }
+
+
+def clear_cache():
+    """Forget all stored validators and cached results."""
+    with _cache_lock:
+        _conditional_cache.clear()
@@ -1,10 +1,15 @@
-from google.transit import gtfs_realtime_pb2
-import requests
+import time
+import numpy as np
 import pandas as pd
-import geopandas as gpd
 from datetime import datetime
-import xml.etree.ElementTree as ET
-from src.config import PROCESSED_DATA_DIR
+from concurrent.futures import ThreadPoolExecutor, wait
+from src.config import LOCAL_TZ, BIZKAIA_BBOX, BUS_URL, METRO_URL, RENFE_URL
+from src.boundary import clip_to_boundary
+from src.siri import parse_siri_vm
+from src.gtfs_rt import decode_vehicle_positions, to_local_datetimes
+from src import transport
+
+VEHICLE_COLUMNS = ["vehicle_id", "line_id", "lat", "lon", "timestamp", "mode"]
 
 # ---------------------------------------------
 # Utils
@@ -15,117 +20,147 @@ def parse_iso8601(ts):
         return datetime.fromisoformat(ts.replace("Z", "+00:00"))
     except:
         return None
+
+
+def fetch_feed(url, timeout=None):
+    """Download a feed and return its raw bytes."""
+    return transport.get(url, timeout=timeout).content
 # ======================================================
 # 1) FETCH BUS DATA (SIRI XML)
 # ======================================================
 
-def load_positions_bus(url,ns):
-    resp_bus = requests.get(url)
-    resp_bus.raise_for_status()
-    root = ET.fromstring(resp_bus.content)
+def load_positions_bus(url, ns, timeout=None):
+    return transport.fetch_parsed(url, parse_positions_bus, ns, timeout=timeout)[0]
+
+
+def parse_positions_bus(content, ns=None, clip=False):
+    """
+    SIRI-VM bytes → one row per bus. `ns` is accepted for backwards
+    compatibility; the SIRI namespace is fixed (see src/siri.py).
+    With clip=True only buses inside the Bizkaia boundary are kept.
+    """
+    df, _ = parse_siri_vm(content)
+    if clip:
+        df = clip_to_boundary(df)
+    return pd.DataFrame({
+        "vehicle_id": df["vehicle_ref"],
+        "line_id": df["journey_ref"].str.split("_").str[1],
+        "lat": df["lat"],
+        "lon": df["lon"],
+        "timestamp": pd.to_datetime(df["recorded_at"], utc=True, errors="coerce").dt.tz_convert(LOCAL_TZ),
+        "mode": "bus",
+    })
 
-    bus_rows = []
 
-    for activity in root.findall(".//siri:VehicleActivity", ns):
-        mvj = activity.find(".//siri:MonitoredVehicleJourney", ns)
-        if mvj is None:
-            continue
+# ======================================================
+# 2) FETCH METRO DATA (GTFS-RT)
+# ======================================================
+def load_positions_metro(url, timeout=None):
+    return transport.fetch_parsed(url, parse_positions_metro, timeout=timeout)[0]
+
+
+def parse_positions_metro(content, clip=False):
+    cols, header_ts = decode_vehicle_positions(content, bbox=BIZKAIA_BBOX if clip else None)
+    # Metro Bilbao does not stamp each vehicle; use the feed header time
+    times = to_local_datetimes(np.full(len(cols["lat"]), header_ts, dtype=np.int64))
+    df_metro = pd.DataFrame({
+        "vehicle_id": cols["vehicle_id"],
+        "lat": cols["lat"],
+        "lon": cols["lon"],
+        "timestamp": times,
+        "mode": "metro",
+    })
+    return clip_to_boundary(df_metro) if clip else df_metro
+# ======================================================
+# 3) FETCH RENFE DATA (GTFS-RT)
+# ======================================================
+def load_positions_renfe(url, timeout=None):
+    return transport.fetch_parsed(url, parse_positions_renfe, timeout=timeout)[0]
 
-        loc = mvj.find(".//siri:VehicleLocation", ns)
-        if loc is None:
-            continue
 
-        lat = loc.find("siri:Latitude", ns)
-        lon = loc.find("siri:Longitude", ns)
-        if lat is None or lon is None:
-            continue
-        vehicle_id = mvj.findtext("siri:VehicleRef", default=None, namespaces=ns)
-        timestamp = activity.findtext("siri:RecordedAtTime", default=None, namespaces=ns)
-        line_id = mvj.findtext("siri:VehicleJourneyRef", default=None, namespaces=ns)
+def parse_positions_renfe(content):
+    # The national feed carries every train in Spain: drop everything outside
+    # the Bizkaia bounding box before building any frame
+    cols, _ = decode_vehicle_positions(content, bbox=BIZKAIA_BBOX)
 
-        line_id =line_id.split("_")[1]
-        bus_rows.append({
-            "vehicle_id": vehicle_id,
-            "line_id": line_id,
-            "lat": float(lat.text),
-            "lon": float(lon.text),
-            "timestamp": parse_iso8601(timestamp),
-            "mode": "bus"
-        })
+    df_renfe = pd.DataFrame({
+        "vehicle_id": cols["vehicle_id"],
+        "lat": cols["lat"],
+        "lon": cols["lon"],
+        "timestamp": to_local_datetimes(cols["timestamp"]),
+        "mode": "renfe",
+    })
 
-    return pd.DataFrame(bus_rows)
+    return clip_to_boundary(df_renfe)
 
 
 # ======================================================
-# 2) FETCH METRO DATA (GTFS-RT)
-# ======================================================
-def load_positions_metro(url):
-    feed = gtfs_realtime_pb2.FeedMessage()
-    resp_metro = requests.get(url)
-    feed.ParseFromString(resp_metro.content)
-    time_metro = datetime.fromtimestamp(feed.header.timestamp)
-
-    metro_rows = []
-    for ent in feed.entity:
-        if ent.HasField("vehicle"):
-            vp = ent.vehicle
-            pos = vp.position
-            if pos.latitude is None or pos.longitude is None:
-                continue
-            metro_rows.append({
-                "vehicle_id": vp.vehicle.id if vp.vehicle.id else None,
-                "lat": pos.latitude,
-                "lon": pos.longitude,
-                "timestamp": time_metro,
-                "mode": "metro"
-            })
-
-    return pd.DataFrame(metro_rows)
-# ======================================================
-# 3) FETCH RENFE DATA (GTFS-RT)
+# 4) FETCH ALL FEEDS CONCURRENTLY
 # ======================================================
-def load_positions_renfe(url):
-
-    feed = gtfs_realtime_pb2.FeedMessage()
-    resp_renfe = requests.get(url)
-    feed.ParseFromString(resp_renfe.content)
-
-    renfe_rows = []
-    for ent in feed.entity:
-        if ent.HasField("vehicle"):
-            vp = ent.vehicle
-            pos = vp.position
-            if pos.latitude is None or pos.longitude is None:
-                continue
-            renfe_rows.append({
-                "vehicle_id": vp.vehicle.id if vp.vehicle.id else None,
-                "lat": pos.latitude,
-                "lon": pos.longitude,
-                "timestamp": datetime.fromtimestamp(vp.timestamp) if vp.timestamp else None,
-                "mode": "renfe"
-            })
-
-    df_renfe = pd.DataFrame(renfe_rows)
-
-    boundary_gdf=gpd.read_file(PROCESSED_DATA_DIR/"bizkaia_boundary.gpkg")
-
-    # Keep only Renfe positions inside boundary_gdf
-    df_gdf = gpd.GeoDataFrame(
-        df_renfe,
-        geometry=gpd.points_from_xy(df_renfe.lon, df_renfe.lat),
-        crs="EPSG:4326"
-    )
-
-    # Ensure boundary_gdf has a CRS and match CRS
-    if boundary_gdf.crs is None:
-        boundary_gdf = boundary_gdf.set_crs("EPSG:4326")
-    if df_gdf.crs != boundary_gdf.crs:
-        df_gdf = df_gdf.to_crs(boundary_gdf.crs)
-
-    # Filter points within the boundary polygon(s)
-    boundary_union = boundary_gdf.unary_union
-    df_gdf = df_gdf[df_gdf.geometry.within(boundary_union)].reset_index(drop=True)
-
-    # Convert back to plain DataFrame (drop geometry)
-    df_renfe = pd.DataFrame(df_gdf.drop(columns="geometry"))
-    return df_renfe
\ No newline at end of file
+# name -> (url, parse_function, extra_args), the format load_positions_all takes
+DEFAULT_FEEDS = {
+    "bus": (BUS_URL, parse_positions_bus, ()),
+    "metro": (METRO_URL, parse_positions_metro, ()),
+    "renfe": (RENFE_URL, parse_positions_renfe, ()),
+}
+
+
+def _timed_load(name, url, parse, args, timeout):
+    """Fetch + parse one feed, returning (DataFrame, timing row)."""
+    df, info = transport.fetch_parsed(url, parse, *args, timeout=timeout)
+    return df, {"feed": name, **info, "rows": len(df), "error": None}
+
+
+def load_positions_all(feeds, timeout=10, max_workers=None):
+    """
+    Fetch several vehicle feeds in parallel.
+
+    Args:
+        feeds: Dict name -> (url, parse_function, extra_args), e.g.
+            {"bus": (BUS_URL, parse_positions_bus, (ns,)),
+             "metro": (METRO_URL, parse_positions_metro, ())}
+        timeout: Seconds each feed may take (fetch + parse) before it is
+            given up on. Also used as the HTTP timeout.
+        max_workers: Thread pool size (defaults to one thread per feed).
+    Returns:
+        (frames, timings): dict name -> DataFrame, and a DataFrame with one
+        row per feed (status, fetch_s, parse_s, bytes, rows, error). A feed
+        that fails or times out yields an empty DataFrame, so the others can
+        still be shown. Unchanged feeds (HTTP 304) return the cached frame
+        with parse_s == 0.
+    """
+    pool = ThreadPoolExecutor(max_workers=max_workers or max(len(feeds), 1))
+    start = time.perf_counter()
+    futures = {
+        name: pool.submit(_timed_load, name, url, parse, args, timeout)
+        for name, (url, parse, args) in feeds.items()
+    }
+    wait(futures.values(), timeout=timeout)
+    # Don't block on feeds that are still hanging; their threads finish on their own
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    frames = {}
+    timings = []
+    for name, fut in futures.items():
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            frames[name], timing = fut.result()
+        else:
+            if fut.done() and not fut.cancelled():
+                error = fut.exception()
+            else:
+                error = f"timeout after {timeout}s"
+            frames[name] = pd.DataFrame(columns=VEHICLE_COLUMNS)
+            timing = {
+                "feed": name,
+                "status": None,
+                "fetch_s": None,
+                "parse_s": None,
+                "bytes": None,
+                "rows": 0,
+                "error": str(error),
+            }
+        timings.append(timing)
+
+    timings = pd.DataFrame(timings)
+    timings.attrs["total_s"] = time.perf_counter() - start
+    return frames, timings
@@ -0,0 +1,134 @@
+import pandas as pd
+from src.archive import (
+    append_delta, append_snapshot, archive_info, compact_day, day_of, fleet_state_at, read_archive, read_day,
+)
+
+T0 = pd.Timestamp("2025-11-28 08:00", tz="UTC")
+STEP = pd.Timedelta(seconds=15)
+# ~0.00009° of latitude is 10 m
+JITTER, MOVE = 0.00002, 0.001
+
+
+def positions(rows, at):
+    """
+    parse_siri_vm-like frame from (vehicle_ref, lat, lon) or (vehicle_ref,
+    lat, lon, recorded_at) tuples; recorded_at defaults to `at`.
+    """
+    rows = [(*r, at) if len(r) == 3 else r for r in rows]
+    df = pd.DataFrame(rows, columns=["vehicle_ref", "lat", "lon", "recorded_at"])
+    return df.assign(journey_ref="J-" + df["vehicle_ref"], stop_ref="S1")
+
+
+def test_snapshots_are_partitioned_by_local_day(tmp_path):
+    # 23:30 UTC on the 28th is already the 29th in Bilbao
+    late = pd.Timestamp("2025-11-28 23:30", tz="UTC")
+    append_snapshot(positions([("A", 43.26, -2.93)], T0), T0, tmp_path)
+    append_snapshot(positions([("A", 43.27, -2.93)], late), late, tmp_path)
+    assert day_of(late) == "2025-11-29"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["day=2025-11-28", "day=2025-11-29"]
+    assert read_day("2025-11-29", tmp_path)["snapshot_ts"].tolist() == [late]
+
+
+def test_read_archive_filters_time_window_and_vehicles(tmp_path):
+    for i in range(4):
+        t = T0 + i * STEP
+        append_snapshot(positions([("A", 43.26, -2.93), ("B", 43.30, -2.90)], t), t, tmp_path)
+    rows = read_archive(T0 + STEP, T0 + 3 * STEP, vehicle_refs=["B"], directory=tmp_path)
+    assert rows["snapshot_ts"].tolist() == [T0 + STEP, T0 + 2 * STEP]
+    assert rows["vehicle_ref"].tolist() == ["B", "B"]
+    assert rows["event"].tolist() == ["key", "key"]
+    assert read_archive(directory=tmp_path / "missing").empty
+
+
+def test_compact_day_merges_files_sorted(tmp_path):
+    for i in (2, 0, 1):  # appended out of order
+        t = T0 + i * STEP
+        append_snapshot(positions([("B", 43.30, -2.90), ("A", 43.26, -2.93)], t), t, tmp_path)
+    before = read_archive(directory=tmp_path)
+    assert compact_day("2025-11-28", tmp_path) == (3, 6)
+    info = archive_info(tmp_path)
+    assert info[["day", "files", "rows"]].values.tolist() == [["2025-11-28", 1, 6]]
+    pd.testing.assert_frame_equal(read_archive(directory=tmp_path), before)
+    assert compact_day("2025-11-28", tmp_path) == (0, 0)  # already a single file
+
+
+def events_by_snapshot(directory):
+    rows = read_archive(directory=directory)
+    return rows.groupby("snapshot_ts")[["vehicle_ref", "event"]].apply(
+        lambda g: sorted(zip(g["vehicle_ref"], g["event"]))).to_dict()
+
+
+def test_first_snapshot_is_a_keyframe_and_deltas_only_hold_changes(tmp_path):
+    _, state = append_delta(positions([("A", 43.26, -2.93), ("B", 43.30, -2.90)], T0), T0, None, tmp_path)
+    t1 = T0 + STEP
+    # A sends the same report again, B moves, C appears
+    current = positions([("A", 43.26, -2.93, T0), ("B", 43.30 + MOVE, -2.90), ("C", 43.20, -2.80)], t1)
+    _, state = append_delta(current, t1, state, tmp_path)
+    t2 = t1 + STEP
+    # B leaves the feed, nothing else changes
+    current = positions([("A", 43.26, -2.93, T0), ("C", 43.20, -2.80, t1)], t2)
+    _, state = append_delta(current, t2, state, tmp_path)
+
+    assert events_by_snapshot(tmp_path) == {
+        T0: [("A", "key"), ("B", "key")],
+        t1: [("B", "moved"), ("C", "new")],
+        t2: [("B", "gone")],
+    }
+
+
+def test_nothing_written_when_nothing_changed(tmp_path):
+    _, state = append_delta(positions([("A", 43.26, -2.93)], T0), T0, None, tmp_path)
+    path, _ = append_delta(positions([("A", 43.26, -2.93, T0)], T0 + STEP), T0 + STEP, state, tmp_path)
+    assert path is None
+
+
+def test_jitter_of_a_standing_vehicle_is_not_stored(tmp_path):
+    state = None
+    for i, lat in enumerate([43.26, 43.26, 43.26 + JITTER, 43.26 - JITTER]):
+        t = T0 + i * STEP
+        _, state = append_delta(positions([("A", lat, -2.93)], t), t, state, tmp_path)
+    # Stopping is a change (stationary flips), the jitter after it is not
+    assert events_by_snapshot(tmp_path) == {T0: [("A", "key")], T0 + STEP: [("A", "moved")]}
+
+
+def test_keyframe_every_n_deltas(tmp_path):
+    state = None
+    for i in range(4):
+        t = T0 + i * STEP
+        _, state = append_delta(positions([("A", 43.26 + i * MOVE, -2.93)], t), t, state, tmp_path,
+                                keyframe_every=2)
+    assert read_archive(directory=tmp_path)["event"].tolist() == ["key", "moved", "moved", "key"]
+
+
+def test_slow_creep_adds_up_to_a_move(tmp_path):
+    state = None
+    for i in range(8):
+        t = T0 + i * STEP
+        # 4 m per snapshot: below MIN_MOVE_M each time, but the stored position
+        # stays where it was last written, so every third step is a move
+        _, state = append_delta(positions([("A", 43.26 + i * 0.000036, -2.93)], t), t, state, tmp_path)
+    rows = read_archive(directory=tmp_path)
+    # i=1: it stopped (stationary flips); i=4 and i=7: 12 m from the stored position
+    assert rows["event"].tolist() == ["key", "moved", "moved", "moved"]
+    assert rows["snapshot_ts"].tolist() == [T0 + i * STEP for i in (0, 1, 4, 7)]
+
+
+def test_fleet_state_round_trip(tmp_path):
+    snapshots = [
+        [("A", 43.26, -2.93), ("B", 43.30, -2.90)],
+        [("A", 43.26 + JITTER, -2.93), ("B", 43.30 + MOVE, -2.90), ("C", 43.20, -2.80)],
+        [("A", 43.26 + MOVE, -2.93), ("C", 43.20, -2.80)],
+        [("A", 43.26 + MOVE, -2.93), ("C", 43.20, -2.80), ("B", 43.31, -2.91)],
+    ]
+    state = None
+    for i, rows in enumerate(snapshots):
+        t = T0 + i * STEP
+        _, state = append_delta(positions(rows, t), t, state, tmp_path, keyframe_every=2)
+
+    for i, rows in enumerate(snapshots):
+        fleet = fleet_state_at(T0 + i * STEP, directory=tmp_path).set_index("vehicle_ref").sort_index()
+        expected = pd.DataFrame(rows, columns=["vehicle_ref", "lat", "lon"]).set_index("vehicle_ref").sort_index()
+        assert fleet.index.tolist() == expected.index.tolist()
+        # Jitter below MIN_MOVE_M may keep the stored position
+        pd.testing.assert_frame_equal(fleet[["lat", "lon"]], expected, check_exact=False, atol=JITTER * 1.01)
+    assert fleet_state_at(T0 - STEP, directory=tmp_path).empty
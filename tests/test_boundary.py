@@ -0,0 +1,38 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from src.boundary import clip_to_boundary, inside_mask
+
+# L-shaped boundary: its bounding box contains points that are outside it
+BOUNDARY = shapely.Polygon([(-3.0, 43.0), (-2.0, 43.0), (-2.0, 43.2), (-2.8, 43.2), (-2.8, 43.5), (-3.0, 43.5)])
+
+
+@pytest.fixture
+def boundary_path(tmp_path):
+    path = tmp_path / "boundary.gpkg"
+    # Two parts, stored in a metric CRS: unioned and reprojected on load
+    parts = [BOUNDARY.intersection(shapely.box(-3.1, 42.9, -2.5, 43.6)),
+             BOUNDARY.intersection(shapely.box(-2.5, 42.9, -1.9, 43.6))]
+    gpd.GeoDataFrame(geometry=parts, crs="EPSG:4326").to_crs("EPSG:25830").to_file(path)
+    return path
+
+
+def test_inside_mask_matches_contains_xy(boundary_path):
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-3.3, -1.7, 5000)
+    lat = rng.uniform(42.8, 43.7, 5000)
+    lon[:3], lat[:3] = [-2.5, -2.5, -2.9], [43.1, 43.4, 43.4]  # inside, in the bbox but outside, inside the arm
+
+    mask = inside_mask(lon, lat, boundary_path)
+    expected = shapely.contains_xy(BOUNDARY, lon, lat)
+    # Only the reprojection round trip may disagree, right on the edge
+    disagree = mask != expected
+    assert shapely.distance(BOUNDARY.boundary, shapely.points(lon[disagree], lat[disagree])).max(initial=0) < 1e-6
+    assert mask[:3].tolist() == [True, False, True]
+
+
+def test_clip_to_boundary_keeps_rows_inside(boundary_path):
+    df = pd.DataFrame({"id": [1, 2, 3], "lon": [-2.5, -2.5, np.nan], "lat": [43.1, 43.4, 43.1]})
+    assert clip_to_boundary(df, path=boundary_path)["id"].tolist() == [1]
@@ -0,0 +1,53 @@
+import json
+import os
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from src import static_layers
+from src.decorations import get_decoration
+from src.line_geometry import LINE_LEVELS
+
+
+def wiggly_polygon(radius):
+    angles = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+    r = radius * (1 + 0.002 * np.sin(angles * 300))
+    return shapely.Polygon(np.column_stack([-2.9 + r * np.cos(angles), 43.2 + r * np.sin(angles)]))
+
+
+@pytest.fixture
+def boundary_source(tmp_path, monkeypatch):
+    path = tmp_path / "boundary.gpkg"
+    gpd.GeoDataFrame({"name": ["Bizkaia"]}, geometry=[wiggly_polygon(0.2)], crs="EPSG:4326").to_file(path)
+    monkeypatch.setattr(static_layers, "LAYER_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setitem(static_layers.STATIC_LAYERS, "boundary", (path, None, None))
+    monkeypatch.setattr(static_layers, "_layers", {})
+    monkeypatch.setattr(static_layers, "_derived", {})
+    return path
+
+
+def n_coords(geojson):
+    features = json.loads(geojson)["features"]
+    return sum(shapely.get_num_coordinates(shapely.geometry.shape(f["geometry"])) for f in features)
+
+
+def test_levels_are_prebuilt_geojson(boundary_source):
+    levels = [get_decoration("boundary", level=i) for i in range(len(LINE_LEVELS))]
+    counts = [n_coords(level) for level in levels]
+    assert counts == sorted(counts) and counts[0] < counts[-1]
+    # Only the geometry is kept, the polygon stays valid at every level
+    feature = json.loads(levels[0])["features"][0]
+    assert feature["properties"] == {} and shapely.geometry.shape(feature["geometry"]).is_valid
+
+    assert get_decoration("boundary") is levels[-1]  # full detail, served from memory
+    assert get_decoration("boundary", zoom=8) is levels[0]
+
+
+def test_rebuilt_when_the_source_changes(boundary_source):
+    before = get_decoration("boundary", level=0)
+    gpd.GeoDataFrame({"name": ["Bizkaia"]}, geometry=[wiggly_polygon(0.3)], crs="EPSG:4326").to_file(boundary_source)
+    st = os.stat(boundary_source)
+    os.utime(boundary_source, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    after = get_decoration("boundary", level=0)
+    assert after != before
+    assert shapely.geometry.shape(json.loads(after)["features"][0]["geometry"]).bounds[0] < -3.19
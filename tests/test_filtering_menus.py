@@ -0,0 +1,54 @@
+import pandas as pd
+from src.filtering_menus import (
+    build_line_index, filter_datasets_by_lines, get_unique_options, lines_for_stop_groups, sync_selection,
+)
+
+# Layer order, not sorted; A2 appears twice with a renamed second row
+LINES = pd.DataFrame({
+    "line_id": ["A3", "A1", "A2", "A2"],
+    "DenominacionLinea": ["Getxo", "Bilbao", "Leioa (old)", "Leioa"],
+})
+# Exploded stops table (one row per stop-line pair), integer stop ids
+STOPS = pd.DataFrame({
+    "CodigoReducidoParada": [10, 10, 20, 30, 40],
+    "line_id": ["A1", "A2", "A2", "A3", None],
+    "DescripcionMunicipio": ["Bilbao", "Bilbao", "Leioa", "Getxo", "Getxo"],
+})
+VEHICLES = pd.DataFrame({"vehicle_id": ["v1", "v2", "v3"], "line_id": ["A1", "A3", "A9"]})
+
+
+def test_options_and_maps_match_the_scan_helpers():
+    index = build_line_index(LINES, STOPS)
+    # Same order and last-name-wins as the page built without an index
+    assert (index["line_ids"], index["line_names"]) == get_unique_options(LINES, "line_id", "DenominacionLinea")
+    assert index["line_ids"] == ["A3", "A1", "A2"]
+    assert index["id_to_name"]["A2"] == "Leioa"
+    assert index["name_to_id"]["Leioa (old)"] == "A2"
+
+    selected = (["A1"], ["Leioa"])
+    assert sync_selection(LINES, *selected, "line_id", "DenominacionLinea", index=index) == \
+        sync_selection(LINES, *selected, "line_id", "DenominacionLinea") == ({"A1", "A2"}, {"Bilbao", "Leioa"})
+
+
+def test_numeric_line_ids_are_keyed_as_strings():
+    index = build_line_index(LINES.assign(line_id=[3, 1, 2, 2]), STOPS.assign(line_id=pd.array([1, 2, 2, 3, None], dtype="Int64")))
+    assert index["line_ids"] == ["3", "1", "2"]
+    assert index["id_to_name"]["2"] == "Leioa"
+    assert lines_for_stop_groups(index, "DescripcionMunicipio", ["Leioa"]) == ["2"]
+
+
+def test_index_filter_matches_the_scan():
+    index = build_line_index(LINES, STOPS)
+    for selected in (["A2"], ["A1", "A3"], ["A9"]):
+        lines, stops, vehicles = filter_datasets_by_lines(LINES, STOPS, VEHICLES, selected, index=index)
+        scan_lines, scan_stops, scan_vehicles = filter_datasets_by_lines(LINES, STOPS, VEHICLES, selected)
+        pd.testing.assert_frame_equal(lines, scan_lines)
+        assert sorted(stops["CodigoReducidoParada"]) == sorted(set(scan_stops["CodigoReducidoParada"]))
+        pd.testing.assert_frame_equal(vehicles, scan_vehicles)
+
+
+def test_stop_groups_refer_to_the_collapsed_stops():
+    index = build_line_index(LINES, STOPS)
+    assert lines_for_stop_groups(index, "DescripcionMunicipio", ["Bilbao"]) == ["A1", "A2"]
+    assert lines_for_stop_groups(index, "DescripcionMunicipio", ["Getxo"]) == ["A3"]
+    assert lines_for_stop_groups(index, "DescripcionMunicipio", ["Durango"]) == []
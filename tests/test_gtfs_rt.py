@@ -0,0 +1,33 @@
+from google.transit import gtfs_realtime_pb2
+from src.gtfs_rt import decode_vehicle_positions
+
+
+def vehicle_feed():
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = 1_764_346_800
+    for i, (lat, lon) in enumerate([(43.26, -2.93), (40.41, -3.70), (43.30, -2.90)]):
+        ent = feed.entity.add(id=str(i))
+        ent.vehicle.vehicle.id = f"V{i}"
+        ent.vehicle.trip.trip_id = f"T{i}"
+        ent.vehicle.position.latitude = lat
+        ent.vehicle.position.longitude = lon
+        ent.vehicle.timestamp = 1_764_346_800 + i
+    feed.entity.add(id="no-vehicle")
+    feed.entity.add(id="no-position").vehicle.vehicle.id = "V9"
+    return feed.SerializeToString()
+
+
+def test_decode_vehicle_positions_skips_entities_without_position():
+    columns, header_ts = decode_vehicle_positions(vehicle_feed())
+    assert header_ts == 1_764_346_800
+    assert columns["vehicle_id"].tolist() == ["V0", "V1", "V2"]
+    assert columns["trip_id"].tolist() == ["T0", "T1", "T2"]
+    assert columns["route_id"].tolist() == [None, None, None]
+    assert columns["timestamp"].tolist() == [1_764_346_800, 1_764_346_801, 1_764_346_802]
+
+
+def test_decode_vehicle_positions_bbox():
+    columns, _ = decode_vehicle_positions(vehicle_feed(), bbox=(-3.5, 42.9, -2.4, 43.5))
+    assert columns["vehicle_id"].tolist() == ["V0", "V2"]
+    assert columns["lat"].dtype == "float64"
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.kinematics import add_kinematics, update_kinematics
+
+T0 = pd.Timestamp("2025-11-28 08:00", tz="UTC")
+M_PER_DEG_LAT = 111_195.0  # haversine metres per degree of latitude
+
+
+def report(lat, seconds, lon=-2.93):
+    """One-vehicle frame indexed by vehicle key, `lat` given in metres north of 43.26."""
+    return pd.DataFrame({"lat": [43.26 + lat / M_PER_DEG_LAT], "lon": [lon],
+                         "timestamp": [T0 + pd.Timedelta(seconds=seconds)]}, index=["A"])
+
+
+def run(steps):
+    """Feed (metres north, seconds) reports in order; returns the frame of each."""
+    state, frames = None, []
+    for lat, seconds in steps:
+        state = update_kinematics(report(lat, seconds), state)
+        frames.append(state)
+    return frames
+
+
+def test_speed_and_heading():
+    first, second = run([(0, 0), (100, 10)])
+    assert np.isnan(first["speed_kmh"].iloc[0])
+    assert not first["stationary"].iloc[0]
+    assert second["speed_kmh"].iloc[0] == pytest.approx(36.0, abs=1e-3)
+    assert second["heading_deg"].iloc[0] == pytest.approx(0.0, abs=1e-3)
+    assert second["dt_s"].iloc[0] == 10
+
+
+def test_stationary_hysteresis():
+    # Moves, stops (5 m), creeps within the stop place, then leaves it
+    frames = run([(0, 0), (100, 10), (105, 20), (125, 30), (120, 40), (140, 50)])
+    stationary = [bool(f["stationary"].iloc[0]) for f in frames]
+    # 125 is a 20 m step (above STATIONARY_M) but only 25 m from where it
+    # stopped at 100 (below STATIONARY_EXIT_M): still standing. 140 is 40 m away.
+    assert stationary == [False, False, True, True, True, False]
+    dwell = [f["dwell_s"].iloc[0] for f in frames]
+    assert dwell == [0.0, 0.0, 10.0, 20.0, 30.0, 0.0]
+    assert frames[2]["speed_kmh"].iloc[0] == 0.0
+    # Heading is kept while standing
+    assert frames[3]["heading_deg"].iloc[0] == frames[1]["heading_deg"].iloc[0]
+
+
+def test_same_report_keeps_previous_values():
+    first, second, again = run([(0, 0), (100, 10), (100, 10)])
+    for col in ("speed_kmh", "heading_deg", "stationary", "dwell_s"):
+        assert again[col].iloc[0] == second[col].iloc[0]
+
+
+def test_position_jumps_have_no_speed():
+    _, jump = run([(0, 0), (10_000, 10)])
+    assert np.isnan(jump["speed_kmh"].iloc[0])
+
+
+def test_add_kinematics_keeps_rows_and_returns_state():
+    df = pd.DataFrame({"vehicle_id": ["A", "B"], "lat": [43.26, 43.30], "lon": [-2.93, -2.90],
+                       "timestamp": [T0, T0]})
+    out, state = add_kinematics(df)
+    assert out.index.equals(df.index) and "speed_kmh" in out
+    moved = df.assign(lat=df["lat"] + 100 / M_PER_DEG_LAT, timestamp=T0 + pd.Timedelta(seconds=10))
+    out, _ = add_kinematics(moved, state)
+    assert out["speed_kmh"].round(3).tolist() == [36.0, 36.0]
+
@@ -0,0 +1,85 @@
+import os
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+from src import line_geometry, static_layers
+from src.line_geometry import LINE_LEVELS, level_for_zoom, lines_for_zoom, pick_level, simplify_geometries
+from src.static_layers import load_layer
+
+
+def wiggly_line(i):
+    """A line with many small zig-zags, which every level simplifies differently."""
+    x = np.linspace(-2.99, -2.90, 400)
+    y = 43.2 + i * 0.01 + 0.0002 * np.sin(np.arange(400) * (1 + i))
+    return shapely.LineString(np.column_stack([x, y]))
+
+
+@pytest.fixture
+def layer(tmp_path, monkeypatch):
+    monkeypatch.setattr(static_layers, "LAYER_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setitem(static_layers.STATIC_LAYERS, "test_lines", (tmp_path / "lines.gpkg", "lines", None))
+    monkeypatch.setattr(static_layers, "_layers", {})
+    monkeypatch.setattr(static_layers, "_derived", {})
+    gpd.GeoDataFrame({"line_id": ["A1", "A2", "A3"]}, geometry=[wiggly_line(i) for i in range(3)],
+                     crs="EPSG:4326").to_file(tmp_path / "lines.gpkg", layer="lines")
+    return load_layer("test_lines")
+
+
+@pytest.fixture
+def simplify_calls(monkeypatch):
+    """Count the geometries simplified on the fly (not served from the prebuilt levels)."""
+    calls = []
+
+    def counting(geometries, level, preserve_topology=False):
+        calls.append(len(geometries))
+        return simplify_geometries(geometries, level, preserve_topology)
+
+    monkeypatch.setattr(line_geometry, "simplify_geometries", counting)
+    return calls
+
+
+def expected(gdf, zoom):
+    return simplify_geometries(gdf.geometry.values, pick_level(gdf, zoom))
+
+
+def test_levels_get_coarser():
+    n_coords = [shapely.get_num_coordinates(simplify_geometries([wiggly_line(1)], level))[0]
+                for level in range(len(LINE_LEVELS))]
+    assert n_coords == sorted(n_coords) and n_coords[0] < n_coords[-1] <= 400
+    assert level_for_zoom(8) == 0 and level_for_zoom(18) == len(LINE_LEVELS) - 1
+
+
+def test_rows_of_the_layer_use_the_prebuilt_levels(layer, simplify_calls):
+    lines_for_zoom(layer, 11)  # builds the levels of the layer once
+    simplify_calls.clear()
+    subset = layer.iloc[[2, 0]]  # row subset in another order, original index
+    out = lines_for_zoom(subset, 11)
+    assert simplify_calls == []
+    assert shapely.equals(out.geometry.values, expected(subset, 11)).all()
+    # Column selection and boolean masks, as src.maps and the line filters do
+    lines_for_zoom(layer[["line_id", "geometry"]][layer["line_id"] != "A2"], 11)
+    assert simplify_calls == []
+
+
+@pytest.mark.parametrize("derive", [
+    lambda gdf: gdf.iloc[[2, 0]].reset_index(drop=True),  # index no longer points at the layer rows
+    lambda gdf: gdf.assign(geometry=gdf.geometry.reverse()),  # same index, other geometry
+    lambda gdf: gdf.set_geometry(gdf.geometry.values[::-1]),  # same index, geometries swapped
+])
+def test_derived_frames_are_simplified_on_the_fly(layer, simplify_calls, derive):
+    lines_for_zoom(layer, 11)
+    simplify_calls.clear()
+    derived = derive(layer)
+    out = lines_for_zoom(derived, 11)
+    assert shapely.equals(out.geometry.values, expected(derived, 11)).all()
+
+
+def test_frame_of_an_older_layer_version_is_simplified_on_the_fly(layer, simplify_calls):
+    source = static_layers.STATIC_LAYERS["test_lines"][0]
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    simplify_calls.clear()
+    out = lines_for_zoom(layer, 11)
+    assert simplify_calls == [3]
+    assert shapely.equals(out.geometry.values, expected(layer, 11)).all()
@@ -0,0 +1,54 @@
+import pandas as pd
+from src.live_cache import LiveFeedCache
+
+FEEDS = {"metro": ("url", None, ()), "renfe": ("url", None, ())}
+
+
+def frame(lat, ts):
+    return pd.DataFrame({"vehicle_id": ["m1"], "line_id": ["L1"], "lat": [lat], "lon": [-2.93],
+                         "timestamp": [pd.Timestamp(ts, tz="UTC")], "mode": ["metro"]})
+
+
+class ScriptedLoader:
+    """Loader returning one prepared (frames, timings) per poll; None as a frame marks a failed feed."""
+
+    def __init__(self, polls):
+        self.polls = iter(polls)
+
+    def __call__(self, feeds, timeout):
+        polled = next(self.polls)
+        frames, rows = {}, []
+        for name in feeds:
+            df = polled.get(name)
+            frames[name] = df if df is not None else pd.DataFrame(columns=frame(0, "2025-01-01").columns)
+            rows.append({"feed": name, "error": None if df is not None else "timed out after 10s"})
+        return frames, pd.DataFrame(rows)
+
+
+def test_failed_poll_keeps_the_previous_frame():
+    cache = LiveFeedCache(FEEDS, loader=ScriptedLoader([
+        {"metro": frame(43.26, "2025-01-01 10:00:00"), "renfe": None},
+        {"metro": None, "renfe": None},
+        {"metro": frame(43.261, "2025-01-01 10:00:30"), "renfe": None},
+    ]))
+
+    cache.refresh()
+    first = cache.get("metro")
+    assert first["lat"].tolist() == [43.26]
+    assert cache.staleness("renfe") is None  # never fetched (get() would start the refresher)
+
+    cache.refresh()  # metro down: same frame, same fetch time
+    assert cache.get("metro") is first
+    fetched_at = cache._latest["metro"]["fetched_at"]
+
+    cache.refresh()
+    latest = cache.get("metro")
+    assert latest["lat"].tolist() == [43.261]
+    assert cache._latest["metro"]["fetched_at"] > fetched_at
+    assert latest["speed_kmh"].iloc[0] > 0  # kinematics against the frame before the outage
+
+    assert [ts for ts, _ in cache.history("metro")] == [pd.Timestamp("2025-01-01 10:00:00", tz="UTC"),
+                                                         pd.Timestamp("2025-01-01 10:00:30", tz="UTC")]
+    stats = cache.stats()
+    assert (stats["refreshes"], stats["errors"]) == (3, 4)
+    assert stats["staleness_s"]["renfe"] is None
@@ -0,0 +1,40 @@
+import pandas as pd
+from src.live_map import vehicle_delta, vehicle_table
+
+
+def table(rows):
+    """vehicle_table of (vehicle_id, mode, lat, lon) rows."""
+    return vehicle_table(pd.DataFrame(rows, columns=["vehicle_id", "mode", "lat", "lon"]))
+
+
+def test_vehicle_table_keys_labels_and_missing_positions():
+    t = table([(1, "bus", 43.26, -2.93), (1, "metro", 43.3, -2.9), (2, "bus", None, -2.9), (1, "bus", 43.27, -2.93)])
+    assert sorted(t.index) == ["bus:1", "metro:1"]
+    assert t.loc["bus:1", "lat"] == 43.27  # last report wins
+    assert t.loc["metro:1", "label"] == "METRO — 1"
+
+
+def test_vehicle_table_skips_null_ids_and_label_parts():
+    df = pd.DataFrame({
+        "vehicle_id": ["10", None, None, "11"],
+        "line_id": ["A1", "A2", "A3", None],
+        "mode": "bus",
+        "lat": [43.26, 43.27, 43.28, 43.29],
+        "lon": -2.93,
+    })
+    t = vehicle_table(df, ("line_id", "vehicle_id"))
+    # Vehicles without an id are not folded into one "bus:None" marker
+    assert sorted(t.index) == ["bus:10", "bus:11"]
+    assert t.loc["bus:10", "label"] == "BUS — A1 — 10"
+    assert t.loc["bus:11", "label"] == "BUS — 11"
+
+
+def test_vehicle_delta():
+    before = table([(1, "bus", 43.26, -2.93), (2, "bus", 43.30, -2.90), (3, "bus", 43.20, -2.80)])
+    after = table([(1, "bus", 43.26, -2.93), (2, "bus", 43.31, -2.90), (4, "metro", 43.25, -2.92)])
+    assert vehicle_delta(before, after) == {
+        "added": [["metro:4", 43.25, -2.92, "metro", "METRO — 4"]],
+        "moved": [["bus:2", 43.31, -2.90, "BUS — 2"]],
+        "removed": ["bus:3"],
+    }
+    assert not any(vehicle_delta(after, after).values())
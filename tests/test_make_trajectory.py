@@ -0,0 +1,83 @@
+import geopandas as gpd
+import pandas as pd
+import pytest
+from src import make_trajectory
+from src.archive import append_delta
+
+T0 = pd.Timestamp("2025-11-28 08:00", tz="UTC")
+
+
+def positions(rows):
+    """parse_siri_vm-like frame from (vehicle_ref, journey_ref, lat, lon, recorded_at) tuples."""
+    return pd.DataFrame(rows, columns=["vehicle_ref", "journey_ref", "lat", "lon", "recorded_at"]).assign(stop_ref="S1")
+
+
+@pytest.fixture
+def checkpoint_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "trajectories"
+    monkeypatch.setattr(make_trajectory, "OUTPUT_PATH", tmp_path / "trajectories.gpkg")
+    monkeypatch.setattr(make_trajectory, "TRAJECTORY_DIR", directory)
+    monkeypatch.setattr(make_trajectory, "CHECKPOINT_PATH", directory / "checkpoint.json")
+    monkeypatch.setattr(make_trajectory, "OPEN_POINTS_PATH", directory / "open_points.parquet")
+    return directory
+
+
+def test_only_gone_rows_without_open_points_advance_the_watermark(tmp_path, checkpoint_dir):
+    archive = tmp_path / "archive"
+    _, state = append_delta(positions([("B1", "J1", 43.26, -2.93, T0)]), T0, None, archive)
+    # Checkpoint at the keyframe with nothing open, then the vehicle leaves
+    make_trajectory.save_checkpoint(T0, pd.DataFrame(columns=make_trajectory.POINT_COLS), {})
+    t1 = T0 + pd.Timedelta(seconds=15)
+    append_delta(positions([]), t1, state, archive)
+
+    result = make_trajectory.update_trajectories(directory=archive)
+
+    assert result == {"rows": 1, "written": 0, "open": 0, "watermark": t1}
+    watermark, open_points = make_trajectory.load_checkpoint()
+    assert watermark == t1
+    assert open_points.empty
+
+
+def run_snapshots(archive, snapshots, state=None, **kwargs):
+    """append_delta every (minutes after T0, rows) snapshot; returns the archive state."""
+    for minutes, rows in snapshots:
+        t = T0 + pd.Timedelta(minutes=minutes)
+        _, state = append_delta(positions(rows), t, state, archive, **kwargs)
+    return state
+
+
+def moving(vehicle, journey, minutes):
+    """Snapshots of `vehicle` moving ~110 m north every minute."""
+    return [(m, [(vehicle, journey, 43.26 + m * 0.001, -2.93, T0 + pd.Timedelta(minutes=m))]) for m in minutes]
+
+
+def test_absence_splits_and_closes_across_runs(tmp_path, checkpoint_dir):
+    archive = tmp_path / "archive"
+    state = run_snapshots(archive, moving("B1", "J1", range(4)))
+    first = make_trajectory.update_trajectories(directory=archive)
+    assert (first["written"], first["open"]) == (0, 1)
+
+    # B1 leaves the feed for longer than MAX_GAP and comes back on the same journey
+    state = run_snapshots(archive, [(4, [])], state)
+    run_snapshots(archive, moving("B1", "J1", (20, 21)), state)
+    second = make_trajectory.update_trajectories(directory=archive)
+    assert (second["written"], second["open"]) == (1, 1)
+
+    written = gpd.read_file(make_trajectory.OUTPUT_PATH)
+    assert written["n_points"].tolist() == [4]
+    _, open_points = make_trajectory.load_checkpoint()
+    assert open_points["recorded_at"].dt.minute.tolist() == [20, 21]
+
+
+def test_silence_of_a_vehicle_still_in_the_feed_does_not_split(tmp_path, checkpoint_dir):
+    archive = tmp_path / "archive"
+    state = run_snapshots(archive, moving("B1", "J1", range(3)), keyframe_every=100)
+    # The same report for 30 minutes: the delta archive stores nothing
+    standing = [(m, [("B1", "J1", 43.262, -2.93, T0 + pd.Timedelta(minutes=2))]) for m in range(3, 33)]
+    state = run_snapshots(archive, standing, state, keyframe_every=100)
+    run_snapshots(archive, moving("B1", "J1", (33, 34)), state, keyframe_every=100)
+
+    result = make_trajectory.update_trajectories(directory=archive)
+    assert (result["written"], result["open"]) == (0, 1)
+    _, open_points = make_trajectory.load_checkpoint()
+    assert open_points["recorded_at"].dt.minute.tolist() == [0, 1, 2, 33, 34]
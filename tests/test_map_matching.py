@@ -0,0 +1,34 @@
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from src.map_matching import build_route_index, match_positions
+
+# Two parallel east-west routes ~1.1 km apart, ~8 km long
+ROUTES = gpd.GeoDataFrame(
+    {"line_id": ["A1", "A2"]},
+    geometry=[shapely.LineString([(-3.0, 43.25), (-2.9, 43.25)]), shapely.LineString([(-3.0, 43.26), (-2.9, 43.26)])],
+    crs="EPSG:4326",
+)
+
+
+def test_match_positions_own_line_nearest_and_unmatched():
+    index = build_route_index(ROUTES)
+    vehicles = pd.DataFrame({
+        "line_id": ["A1", "A1", "X9", "A1"],
+        "lat": [43.2501, 43.2599, 43.2599, 43.30],
+        "lon": [-2.95, -2.95, -2.95, -2.95],
+    })
+    out = match_positions(vehicles, index)
+    # 0: on its own line; 1: own line too far (1 km), nearest route instead;
+    # 2: unknown line, nearest route; 3: no route within the radius
+    assert out["route_line_id"].iloc[:3].tolist() == ["A1", "A2", "A2"]
+    assert out["matched_by"].iloc[:3].tolist() == ["line", "nearest", "nearest"]
+    assert out["route_idx"].iloc[3] == -1 and pd.isna(out["route_line_id"].iloc[3])
+    assert out["off_route"].tolist() == [False, False, False, True]
+    # 11 m north; the metric route is the chord between the ends, ~1 m south of the parallel
+    assert out.loc[0, "deviation_m"] == pytest.approx(10.5, abs=1.5)
+    assert out.loc[0, "along_m"] == pytest.approx(out.loc[0, "route_length_m"] / 2, rel=0.01)
+    assert out.loc[0, "snap_lat"] == pytest.approx(43.25, abs=2e-5)
+    assert np.isnan(out.loc[3, "along_m"])
@@ -0,0 +1,30 @@
+import folium
+import pandas as pd
+from src.maps import _add_points_layer, _points_feature_collection
+
+VEHICLES = pd.DataFrame({"vehicle_id": ["v1", "v2", "v3"], "line_id": ["A1", None, "A2"],
+                         "lat": [43.2630001234, 43.3, 43.1], "lon": [-2.9350004321, -2.9, -3.0]})
+
+
+def test_feature_collection_from_columns():
+    fc = _points_feature_collection(VEHICLES, properties=["vehicle_id", "line_id", "missing"])
+    assert len(fc["features"]) == 3
+    assert fc["features"][0]["geometry"] == {"type": "Point", "coordinates": [-2.935, 43.263]}
+    # Missing columns are skipped, missing values become "" (valid JSON, blank in the popup)
+    assert [f["properties"] for f in fc["features"]] == [
+        {"vehicle_id": "v1", "line_id": "A1"}, {"vehicle_id": "v2", "line_id": ""}, {"vehicle_id": "v3", "line_id": "A2"},
+    ]
+    assert _points_feature_collection(VEHICLES)["features"][1]["properties"] == {}
+
+
+def test_points_are_one_layer():
+    m = folium.Map(prefer_canvas=True)
+    group = folium.FeatureGroup(name="bus").add_to(m)
+    _add_points_layer(group, VEHICLES.assign(color=["red", "blue", "red"]), "green", "green", 6,
+                      popup_fields=["vehicle_id"], popup_labels=False)
+    layers = list(group._children.values())
+    assert len(layers) == 1 and isinstance(layers[0], folium.GeoJson)
+    # The per-row colour travels as a property, applied by the layer's on_each_feature
+    assert [f["properties"]["color"] for f in layers[0].data["features"]] == ["red", "blue", "red"]
+    html = m.get_root().render()
+    assert "feature.properties.color" in html
@@ -0,0 +1,47 @@
+import geopandas as gpd
+import pandas as pd
+import shapely
+from src.segment_graph import METRIC_CRS, _build_graph, aggregate_by_segment, corridor_stats, segments_of_lines
+
+X0, Y0 = 505_000, 4_790_000  # Bilbao, in METRIC_CRS
+
+
+def line(*xs, y=0):
+    return shapely.LineString([(X0 + x, Y0 + y) for x in xs])
+
+
+# A runs in two parts with a gap where B continues alone; C leaves B at x=3000
+LINES = gpd.GeoDataFrame({"line_id": ["A", "B", "C"]}, geometry=[
+    shapely.MultiLineString([line(0, 1000), line(2000, 3000)]),
+    line(0, 1000, 2000, 3000),
+    shapely.LineString([(X0 + 3000, Y0), (X0 + 3000, Y0 + 1000)]),
+], crs=METRIC_CRS)
+
+
+def segments_by_lines(segments):
+    metric = segments.to_crs(METRIC_CRS)
+    return sorted(zip(segments["line_ids"], metric.geometry.bounds["minx"].round() - X0, segments["length_m"]))
+
+
+def test_multilinestring_parts_are_not_bridged():
+    graph = _build_graph(LINES)
+    assert segments_by_lines(graph["segments"]) == [
+        ("A,B", 0, 1000.0),
+        ("A,B", 2000, 1000.0),
+        ("B", 1000, 1000.0),  # the gap between A's parts is B's only
+        ("C", 3000, 1000.0),
+    ]
+    assert sorted(graph["segments"]["n_lines"]) == [1, 1, 2, 2]
+
+
+def test_lookups_and_aggregates():
+    graph = _build_graph(LINES)
+    segments = graph["segments"]
+    assert sorted(segments_of_lines(graph, ["A"])["line_ids"]) == ["A,B", "A,B"]
+    assert len(segments_of_lines(graph, ["B", "C"])) == 4
+
+    totals = aggregate_by_segment(graph, pd.Series({"A": 2, "B": 5}))
+    assert sorted(zip(segments["line_ids"], totals)) == [("A,B", 7.0), ("A,B", 7.0), ("B", 5.0), ("C", 0.0)]
+
+    stats = corridor_stats(segments)
+    assert (stats["route_km"], stats["unique_km"]) == (6.0, 4.0)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+from src.live_cache import LiveFeedCache
+from src.shared_snapshot import load_shared_snapshots, publish_snapshot, publish_status, read_snapshot
+
+FEEDS = {"bus": ("url", None, ()), "metro": ("url", None, ())}
+
+
+def frame(lat):
+    return pd.DataFrame({"vehicle_id": ["b1", "b2"], "line_id": ["A1", None], "lat": [lat, 43.3],
+                         "lon": [-2.93, -2.9], "timestamp": pd.to_datetime(["2025-01-01 10:00"] * 2, utc=True),
+                         "mode": "bus"})
+
+
+def test_round_trip_and_error_columns(tmp_path):
+    publish_snapshot("bus", frame(43.26), version=3, directory=tmp_path)
+    publish_status({"bus": {"status": 200, "fetch_s": 0.1, "parse_s": 0.05, "error": "HTTP 503"}}, tmp_path)
+
+    frames, timings = load_shared_snapshots(FEEDS, directory=tmp_path)
+    pd.testing.assert_frame_equal(frames["bus"], frame(43.26))
+    assert frames["metro"].empty
+
+    timings = timings.set_index("feed")
+    # Upstream failing after a publish: the last snapshot is served, the failure is reported apart
+    assert timings.loc["bus", ["version", "rows", "status"]].tolist() == [3, 2, 200]
+    assert pd.isna(timings.loc["bus", "error"])
+    assert timings.loc["bus", "publisher_error"] == "HTTP 503"
+    assert timings.loc["metro", "error"] == "no snapshot published"
+    assert pd.isna(timings.loc["metro", "version"])
+
+
+def test_numeric_columns_are_views_of_the_map(tmp_path):
+    publish_snapshot("bus", frame(43.26), version=1, directory=tmp_path)
+    df = read_snapshot("bus", tmp_path)
+    assert not df["lat"].to_numpy().flags.writeable
+    assert read_snapshot("bus", tmp_path) is df  # same file: not mapped again
+
+    publish_snapshot("bus", frame(43.27), version=2, directory=tmp_path)
+    assert np.allclose(read_snapshot("bus", tmp_path)["lat"], [43.27, 43.3])
+
+
+def test_live_cache_processes_each_version_once(tmp_path):
+    cache = LiveFeedCache({"metro": FEEDS["metro"]},
+                          loader=lambda feeds, timeout: load_shared_snapshots(feeds, directory=tmp_path))
+    publish_snapshot("metro", frame(43.26).assign(mode="metro"), version=1, directory=tmp_path)
+    cache.refresh()
+    first = cache.get("metro")
+
+    cache.refresh()  # same version: the processed frame is kept
+    assert cache.get("metro") is first
+
+    publish_snapshot("metro", frame(43.27).assign(mode="metro"), version=2, directory=tmp_path)
+    cache.refresh()
+    assert cache.get("metro")["lat"].tolist() == [43.27, 43.3]
+    assert cache.stats()["errors"] == 0
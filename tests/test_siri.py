@@ -0,0 +1,41 @@
+from src.siri import SIRI_NS, parse_siri_vm
+
+
+def activity(vehicle, recorded_at, lat=None, lon=None, stop="S1"):
+    location = "" if lat is None else (
+        f"<VehicleLocation><Longitude>{lon}</Longitude><Latitude>{lat}</Latitude></VehicleLocation>")
+    return (
+        f"<VehicleActivity><RecordedAtTime>{recorded_at}</RecordedAtTime>"
+        f"<MonitoredVehicleJourney><VehicleJourneyRef>J-{vehicle}</VehicleJourneyRef>{location}"
+        f"<VehicleRef>{vehicle}</VehicleRef><MonitoredCall><StopPointRef>{stop}</StopPointRef></MonitoredCall>"
+        # Only the MonitoredCall stop is kept, not the onward ones
+        "<OnwardCalls><OnwardCall><StopPointRef>0</StopPointRef></OnwardCall></OnwardCalls>"
+        "</MonitoredVehicleJourney></VehicleActivity>"
+    )
+
+
+def feed(*activities):
+    return (f'<?xml version="1.0" encoding="UTF-8"?><Siri xmlns="{SIRI_NS}"><ServiceDelivery>'
+            f"<VehicleMonitoringDelivery>{''.join(activities)}</VehicleMonitoringDelivery>"
+            "</ServiceDelivery></Siri>")
+
+
+def test_parse_siri_vm_columns_and_rows():
+    df, dataset_ts = parse_siri_vm(feed(
+        activity("1001", "2025-11-28T17:20:00+01:00", 43.26, -2.93, stop="4001"),
+        activity("1002", "2025-11-28T17:21:00+01:00"),  # no location: skipped
+        activity("1003", "2025-11-28T17:19:00+01:00", 43.30, -2.90),
+    ).encode())
+    assert df.columns.tolist() == ["vehicle_ref", "journey_ref", "stop_ref", "lat", "lon", "recorded_at"]
+    assert df["vehicle_ref"].tolist() == ["1001", "1003"]
+    assert df["journey_ref"].tolist() == ["J-1001", "J-1003"]
+    assert df["stop_ref"].tolist() == ["4001", "S1"]
+    assert df["lat"].tolist() == [43.26, 43.30]
+    assert df["lat"].dtype == "float64"
+    # The newest report of the document, including activities without location
+    assert dataset_ts == "2025-11-28T17:21:00+01:00"
+
+
+def test_parse_siri_vm_accepts_str_and_empty_feeds():
+    df, dataset_ts = parse_siri_vm(feed())
+    assert df.empty and dataset_ts is None
@@ -0,0 +1,83 @@
+import json
+import multiprocessing
+import os
+import geopandas as gpd
+import pytest
+import shapely
+from src import snapshot_files
+from src.snapshot_files import find_snapshot_files, quarantine, read_snapshot_files
+
+
+@pytest.fixture
+def raw_dir(tmp_path, monkeypatch):
+    """RAW_DATA_DIR and its quarantine under tmp_path."""
+    raw = tmp_path / "raw"
+    monkeypatch.setattr(snapshot_files, "RAW_DATA_DIR", raw)
+    monkeypatch.setattr(snapshot_files, "QUARANTINE_DIR", raw / "quarantine")
+    monkeypatch.setattr(snapshot_files, "QUARANTINE_LOG", raw / "quarantine" / "quarantine.jsonl")
+    return raw
+
+
+def write_snapshot(path, n, drop=()):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"vehicle_ref": [f"v{i}" for i in range(n)], "journey_ref": "j", "stop_ref": "s",
+            "lat": 43.26, "lon": -2.93, "recorded_at": "2025-11-28T17:20:36+01:00"}
+    gdf = gpd.GeoDataFrame(data, geometry=[shapely.Point(-2.93, 43.26)] * n, crs="EPSG:4326")
+    gdf.drop(columns=list(drop)).to_file(path)
+    return path
+
+
+def quarantine_log(raw_dir):
+    return [json.loads(line) for line in (raw_dir / "quarantine" / "quarantine.jsonl").read_text().splitlines()]
+
+
+def test_bad_files_are_quarantined_and_the_rest_read_in_order(raw_dir):
+    good = [write_snapshot(raw_dir / "2025" / f"bizkaibus_{i}.gpkg", n) for i, n in ((1, 2), (3, 1))]
+    missing = write_snapshot(raw_dir / "2025" / "bizkaibus_2.gpkg", 1, drop=["stop_ref"])
+    garbage = raw_dir / "2025" / "bizkaibus_4.gpkg"
+    garbage.write_bytes(b"not a geopackage")
+
+    paths = find_snapshot_files(raw_dir)
+    df, errors = read_snapshot_files(paths, workers=1)
+
+    assert df["file"].tolist() == [0, 0, 2]
+    assert df["vehicle_ref"].tolist() == ["v0", "v1", "v0"]
+    assert [e[0] for e in errors] == [str(missing), str(garbage)]
+    assert "missing columns ['stop_ref']" in errors[0][1]
+    assert all(p.exists() for p in good) and not missing.exists() and not garbage.exists()
+    # Same relative path below the quarantine, and no longer found by the reader
+    assert (raw_dir / "quarantine" / "2025" / "bizkaibus_2.gpkg").exists()
+    assert find_snapshot_files(raw_dir) == good
+    assert [entry["file"] for entry in quarantine_log(raw_dir)] == [str(missing), str(garbage)]
+
+
+def test_quarantine_keeps_both_files_with_the_same_name(raw_dir):
+    path = raw_dir / "bizkaibus_1.gpkg"
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"first")
+    first = quarantine(path, "bad")
+    path.write_bytes(b"second")  # re-collected under the same name
+    second = quarantine(path, "bad again")
+
+    assert first == raw_dir / "quarantine" / "bizkaibus_1.gpkg"
+    assert second != first and second.parent == first.parent and second.suffix == ".gpkg"
+    assert (first.read_bytes(), second.read_bytes()) == (b"first", b"second")
+    assert [entry["moved_to"] for entry in quarantine_log(raw_dir)] == [str(first), str(second)]
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="the patched reader must reach the workers")
+def test_reader_crash_only_quarantines_the_culprit(raw_dir, monkeypatch):
+    paths = [write_snapshot(raw_dir / f"bizkaibus_{i}.gpkg", 1) for i in range(6)]
+    read = snapshot_files.read_snapshot_file
+
+    def crashing_read(path, columns):
+        if path.endswith("bizkaibus_3.gpkg"):
+            os._exit(1)  # like a GDAL segfault: the worker dies without an exception
+        return read(path, columns)
+
+    monkeypatch.setattr(snapshot_files, "read_snapshot_file", crashing_read)
+    df, errors = read_snapshot_files(paths, workers=2, batch_size=2)
+
+    assert sorted(df["file"]) == [0, 1, 2, 4, 5]
+    assert errors == [(str(paths[3]), "BrokenProcessPool: the reader process crashed on this file")]
+    assert not paths[3].exists() and all(p.exists() for p in paths[:3] + paths[4:])
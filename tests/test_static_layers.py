@@ -0,0 +1,71 @@
+import os
+import geopandas as gpd
+import pytest
+import shapely
+from src import static_layers
+from src.static_layers import get_derived, layer_version, load_layer
+
+
+def write_source(path, line_ids, mtime_ns):
+    lines = [shapely.LineString([(-2.9 - i / 100, 43.2), (-2.9 - i / 100, 43.3)]) for i in range(len(line_ids))]
+    gdf = gpd.GeoDataFrame({"line_id": line_ids}, geometry=lines, crs="EPSG:4326").to_crs("EPSG:25830")
+    gdf.to_file(path, layer="lines")
+    os.utime(path, ns=(mtime_ns, mtime_ns))  # distinct versions even within one mtime tick
+
+
+@pytest.fixture
+def layer(tmp_path, monkeypatch):
+    """Name of a static layer with its source and build cache under tmp_path."""
+    monkeypatch.setattr(static_layers, "LAYER_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setitem(static_layers.STATIC_LAYERS, "test_lines", (tmp_path / "lines.gpkg", "lines", None))
+    monkeypatch.setattr(static_layers, "_layers", {})
+    monkeypatch.setattr(static_layers, "_derived", {})
+    return "test_lines"
+
+
+def test_load_layer_rebuilds_when_the_source_changes(layer):
+    source = static_layers.STATIC_LAYERS[layer][0]
+    write_source(source, ["A1", "A2"], 1_000_000_000)
+
+    gdf = load_layer(layer)
+    assert gdf["line_id"].tolist() == ["A1", "A2"]
+    assert gdf.crs == "EPSG:4326"
+    assert gdf.attrs["static_layer_version"] == layer_version(layer)
+    assert load_layer(layer) is gdf  # unchanged source: served from memory
+    assert get_derived(layer, "count", len) == 2
+
+    write_source(source, ["A1", "A2", "A3"], 2_000_000_000)
+    rebuilt = load_layer(layer)
+    assert rebuilt["line_id"].tolist() == ["A1", "A2", "A3"]
+    assert get_derived(layer, "count", len) == 3
+
+    # A new process (empty memory cache) reads the parquet built for this version
+    static_layers._layers.clear()
+    parquet = static_layers._parquet_path(layer)
+    built_at = parquet.stat().st_mtime_ns
+    assert load_layer(layer)["line_id"].tolist() == ["A1", "A2", "A3"]
+    assert parquet.stat().st_mtime_ns == built_at
+
+
+def test_stale_parquet_is_rebuilt_after_a_restart(layer):
+    source = static_layers.STATIC_LAYERS[layer][0]
+    write_source(source, ["A1"], 1_000_000_000)
+    load_layer(layer)
+
+    # Edited while no process was running: the stored build stamp no longer matches
+    static_layers._layers.clear()
+    write_source(source, ["B1", "B2"], 3_000_000_000)
+    assert load_layer(layer)["line_id"].tolist() == ["B1", "B2"]
+
+
+def test_built_parquet_serves_a_missing_source(layer):
+    source = static_layers.STATIC_LAYERS[layer][0]
+    write_source(source, ["A1"], 1_000_000_000)
+    load_layer(layer)
+
+    source.unlink()
+    static_layers._layers.clear()
+    assert load_layer(layer)["line_id"].tolist() == ["A1"]
+    static_layers._parquet_path(layer).unlink()
+    with pytest.raises(FileNotFoundError):
+        layer_version(layer)
@@ -0,0 +1,34 @@
+import pandas as pd
+from src.stop_network import build_adjacency, collapse_stops, explode_stops, lines_of_stops, stops_of_lines
+
+EXPLODED = pd.DataFrame({
+    "CodigoReducidoParada": [10, 10, 20, 30, 40],
+    "line_id": ["A1", "A2", "A2", "A3", None],
+})
+
+
+def test_collapse_and_explode_round_trip():
+    stops = collapse_stops(EXPLODED)
+    assert stops["CodigoReducidoParada"].tolist() == [10, 20, 30, 40]
+    assert stops["line_ids"].tolist() == ["A1,A2", "A2", "A3", ""]
+    assert collapse_stops(stops) is stops
+    back = explode_stops(stops)
+    assert back.loc[back["line_id"] != "", ["CodigoReducidoParada", "line_id"]].values.tolist() == \
+        EXPLODED.dropna()[["CodigoReducidoParada", "line_id"]].values.tolist()
+
+
+def test_collapse_from_route_codes():
+    raw = pd.DataFrame({"CodigoReducidoParada": [1], "CodificacionRuta": ["A3641_Orduña-Galdakao,A3641_X, A3642_Y"]})
+    assert collapse_stops(raw)["line_ids"].tolist() == ["A3641,A3642"]
+
+
+def test_adjacency_lookups():
+    adjacency = build_adjacency(collapse_stops(EXPLODED))
+    assert adjacency["line_ids"].tolist() == ["A1", "A2", "A3"]
+    assert adjacency["line_offsets"].tolist() == [0, 1, 3, 4]
+    assert adjacency["stop_offsets"].tolist() == [0, 2, 3, 4, 4]
+    assert stops_of_lines(adjacency, ["A2"]).tolist() == [0, 1]
+    assert stops_of_lines(adjacency, ["A1", "A3", "missing"]).tolist() == [0, 2]
+    assert stops_of_lines(adjacency, []).tolist() == []
+    assert lines_of_stops(adjacency, [0]) == ["A1", "A2"]
+    assert lines_of_stops(adjacency, [1, 2, 3]) == ["A2", "A3"]
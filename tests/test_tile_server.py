@@ -0,0 +1,64 @@
+import json
+import threading
+import urllib.request
+import geopandas as gpd
+import mapbox_vector_tile
+import mercantile
+import pytest
+import shapely
+from src import static_layers, tiles
+from src.tile_server import TileSource, make_server
+
+LINE = shapely.LineString([(-2.95, 43.25), (-2.91, 43.27)])
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """Tile server on an ephemeral port over one synthetic line layer, without an MBTiles archive."""
+    source_path = tmp_path / "lines.gpkg"
+    gpd.GeoDataFrame({"line_id": ["A1"]}, geometry=[LINE], crs="EPSG:4326").to_file(source_path, layer="lines")
+    monkeypatch.setitem(static_layers.STATIC_LAYERS, "test_lines", (source_path, "lines", None))
+    monkeypatch.setattr(static_layers, "LAYER_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setitem(tiles.TILE_LAYERS, "test_lines", ("test_lines", ["line_id"], 8))
+
+    source = TileSource(mbtiles_path=tmp_path / "missing.mbtiles", names=["test_lines"])
+    httpd = make_server("127.0.0.1", 0, source)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def request(url, headers=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as resp:
+            return resp.status, dict(resp.headers), resp.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def stats(base):
+    return json.loads(request(f"{base}/stats")[2])
+
+
+def test_tiles_200_304_204_and_stats(server):
+    tile = mercantile.tile(-2.93, 43.26, 12)
+    url = f"{server}/tiles/{tile.z}/{tile.x}/{tile.y}.pbf"
+
+    status, headers, body = request(url)
+    assert status == 200
+    assert headers["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    decoded = mapbox_vector_tile.decode(body)  # no Accept-Encoding: sent uncompressed
+    assert [f["properties"] for f in decoded["test_lines"]["features"]] == [{"line_id": "A1"}]
+
+    status, headers_304, body = request(url, {"If-None-Match": headers["ETag"]})
+    assert (status, body) == (304, b"")
+    status, gz_headers, _ = request(url, {"Accept-Encoding": "gzip"})
+    assert (status, gz_headers["Content-Encoding"]) == (200, "gzip")
+
+    status, _, body = request(f"{server}/tiles/12/0/0.pbf")  # far from the line
+    assert (status, body) == (204, b"")
+    assert request(f"{server}/tiles/2/9/0.pbf")[0] == 404
+    assert request(f"{server}/nothing")[0] == 404
+
+    assert stats(server) == {"hits": 2, "misses": 2, "archive": 0, "generated": 2, "empty": 1, "cached": 2}
@@ -0,0 +1,63 @@
+import gzip
+import json
+import sqlite3
+import geopandas as gpd
+import mapbox_vector_tile
+import mercantile
+import shapely
+from src import static_layers, tiles
+from src.tiles import EXTENT, build_tiles, encode_tile, tile_bounds_m
+
+# From Bilbao to Getxo: crosses tile edges from zoom 11 on
+LINE = shapely.LineString([(-2.935, 43.263), (-3.01, 43.35)])
+STOP = shapely.Point(-2.935, 43.263)
+
+
+def prepared(minzoom=8):
+    geometry = gpd.GeoSeries([LINE, STOP], crs="EPSG:4326").to_crs("EPSG:3857").values.to_numpy()
+    return {"lines": {"geometry": geometry[:1], "properties": [{"line_id": "A1"}], "minzoom": 8},
+            "stops": {"geometry": geometry[1:], "properties": [{"name": "Moyua"}], "minzoom": minzoom}}
+
+
+def test_tile_bounds_match_mercantile():
+    t = mercantile.tile(-2.935, 43.263, 12)
+    assert tile_bounds_m(t.x, t.y, t.z) == tuple(mercantile.xy_bounds(t))
+
+
+def test_encode_tile_clips_to_the_tile():
+    t = mercantile.tile(-2.935, 43.263, 13)
+    decoded = mapbox_vector_tile.decode(encode_tile(prepared(), t.z, t.x, t.y))
+    assert set(decoded) == {"lines", "stops"}
+    assert decoded["lines"]["features"][0]["properties"] == {"line_id": "A1"}
+    # The line leaves the tile: its clipped part stays within the tile plus the buffer
+    coords = decoded["lines"]["features"][0]["geometry"]["coordinates"]
+    assert all(-tiles.BUFFER <= v <= EXTENT + tiles.BUFFER for c in coords for v in c)
+
+    # Below a layer's min zoom it is left out; a tile with nothing in it is None
+    low = mercantile.tile(-2.935, 43.263, 10)
+    assert set(mapbox_vector_tile.decode(encode_tile(prepared(minzoom=12), low.z, low.x, low.y))) == {"lines"}
+    assert encode_tile(prepared(), 13, 0, 0) is None
+
+
+def test_build_tiles_matches_encode_tile(tmp_path, monkeypatch):
+    source = tmp_path / "lines.gpkg"
+    gpd.GeoDataFrame({"line_id": ["A1"]}, geometry=[LINE], crs="EPSG:4326").to_file(source, layer="lines")
+    monkeypatch.setattr(static_layers, "LAYER_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(static_layers, "_layers", {})
+    monkeypatch.setitem(static_layers.STATIC_LAYERS, "test_lines", (source, "lines", None))
+    monkeypatch.setitem(tiles.TILE_LAYERS, "test_lines", ("test_lines", ["line_id"], 8))
+
+    path = tmp_path / "test.mbtiles"
+    result = build_tiles(path, ["test_lines"], min_zoom=10, max_zoom=12, workers=2, batch_size=2)
+
+    con = sqlite3.connect(path)
+    rows = con.execute("SELECT zoom_level, tile_column, tile_row, tile_data FROM tiles").fetchall()
+    metadata = dict(con.execute("SELECT name, value FROM metadata").fetchall())
+    con.close()
+    assert result["tiles"] == len(rows) and result["scanned"] >= len(rows)
+    assert {z for z, _, _, _ in rows} == {10, 11, 12}
+    layers = tiles.prepare_layers(["test_lines"])
+    for z, x, tms_y, data in rows:
+        assert gzip.decompress(data) == encode_tile(layers, z, x, (2 ** z - 1) - tms_y)
+    assert json.loads(metadata["json"])["vector_layers"][0]["id"] == "test_lines"
+    assert (metadata["minzoom"], metadata["maxzoom"]) == ("10", "12")
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from src.trajectories import (
+    build_trajectories, offsets_from_starts, select_trajectories, sort_points, trajectory_starts,
+)
+
+T0 = pd.Timestamp("2025-11-28 08:00", tz="UTC")
+
+
+def points(rows):
+    """Points from (vehicle_ref, journey_ref, minutes after T0, lat) tuples."""
+    df = pd.DataFrame(rows, columns=["vehicle_ref", "journey_ref", "minutes", "lat"])
+    return pd.DataFrame({
+        "vehicle_ref": df["vehicle_ref"], "journey_ref": df["journey_ref"], "stop_ref": "S1",
+        "recorded_at": T0 + pd.to_timedelta(df["minutes"], unit="min"),
+        "lat": df["lat"], "lon": -2.93,
+    })
+
+
+def test_sort_points_orders_by_vehicle_and_time_and_drops_repeats():
+    p = sort_points(points([("B", "J", 1, 43.0), ("A", "J", 2, 43.0), ("A", "J", 1, 43.0), ("A", "J", 1, 43.1)]))
+    assert list(zip(p["vehicle_ref"], p["recorded_at"].dt.minute, p["lat"])) == [
+        ("A", 1, 43.1), ("A", 2, 43.0), ("B", 1, 43.0)]
+
+
+def test_starts_on_vehicle_and_journey_changes():
+    p = points([("A", "J1", 0, 43.0), ("A", "J1", 1, 43.0), ("A", "J2", 2, 43.0), ("B", "J2", 3, 43.0)])
+    assert trajectory_starts(p).tolist() == [True, False, True, True]
+
+
+def test_long_gaps_split_only_when_the_vehicle_was_away():
+    p = points([("A", "J1", 0, 43.0), ("A", "J1", 30, 43.0), ("A", "J1", 60, 43.0)])
+    assert trajectory_starts(p).tolist() == [True, True, True]  # nothing known: every gap counts
+    absent = np.array([False, False, True])
+    assert trajectory_starts(p, absent=absent).tolist() == [True, False, True]
+    # A short absence does not split either
+    assert trajectory_starts(p, max_gap=pd.Timedelta(hours=1), absent=absent).tolist() == [True, False, False]
+
+
+def test_standing_vehicle_stays_on_its_trajectory():
+    p = points([("A", "J1", 0, 43.0), ("A", "J1", 30, 43.0)]).assign(stationary=[True, False])
+    assert trajectory_starts(p).tolist() == [True, False]
+
+
+def test_build_trajectories_lines_and_stats():
+    p = sort_points(points([
+        ("A", "J1", 0, 43.0), ("A", "J1", 1, 43.001), ("A", "J1", 2, 43.002),
+        ("A", "J2", 3, 43.1),                        # single point: dropped
+        ("B", "J3", 0, 43.2), ("B", "J3", 5, 43.21),
+    ]))
+    trajectories = build_trajectories(p)
+    assert trajectories[["vehicle_ref", "journey_ref", "n_points"]].values.tolist() == [
+        ["A", "J1", 3], ["B", "J3", 2]]
+    assert trajectories["duration_s"].tolist() == [120.0, 300.0]
+    np.testing.assert_allclose(trajectories["length_m"], [222.4, 1111.9], rtol=1e-3)
+    assert [len(g.coords) for g in trajectories.geometry] == [3, 2]
+
+
+def test_select_trajectories_keeps_offsets_consistent():
+    p = sort_points(points([("A", "J1", 0, 43.0), ("A", "J2", 1, 43.0), ("A", "J2", 2, 43.0)]))
+    offsets = offsets_from_starts(trajectory_starts(p))
+    selected, new_offsets = select_trajectories(p, offsets, np.array([False, True]))
+    assert new_offsets.tolist() == [0, 2]
+    assert selected["journey_ref"].tolist() == ["J2", "J2"]
@@ -0,0 +1,87 @@
+import pytest
+import requests
+from src import transport
+
+
+class FakeSession:
+    """requests.Session stand-in: answers with queued (status, body, headers) and records the request headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.sent.append((url, dict(headers or {})))
+        status, body, headers = self.responses.pop(0)
+        resp = requests.Response()
+        resp.status_code, resp._content, resp.url = status, body, url
+        resp.headers.update(headers)
+        return resp
+
+
+@pytest.fixture
+def session(monkeypatch):
+    transport.clear_cache()
+    holder = {}
+    monkeypatch.setattr(transport, "get_session", lambda: holder["session"])
+    yield lambda *responses: holder.setdefault("session", FakeSession(*responses))
+    transport.clear_cache()
+
+
+def parse(content, suffix=""):
+    parse.calls += 1
+    return content.decode() + suffix
+
+
+parse.calls = 0
+
+VALIDATORS = {"ETag": '"v1"', "Last-Modified": "Fri, 28 Nov 2025 08:00:00 GMT"}
+
+
+def test_304_returns_the_cached_result_without_parsing(session):
+    fake = session((200, b"one", VALIDATORS), (304, b"", {}), (200, b"two", {"ETag": '"v2"'}))
+    parse.calls = 0
+
+    first, info = transport.fetch_parsed("http://feed", parse)
+    assert (first, info["status"], info["bytes"]) == ("one", 200, 3)
+    assert fake.sent[0][1] == {}
+
+    second, info = transport.fetch_parsed("http://feed", parse)
+    assert second is first
+    assert (info["status"], info["bytes"], info["parse_s"]) == (304, 0, 0.0)
+    assert fake.sent[1][1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Fri, 28 Nov 2025 08:00:00 GMT"}
+
+    third, info = transport.fetch_parsed("http://feed", parse)
+    assert (third, info["status"]) == ("two", 200)
+    assert parse.calls == 2
+
+    # The new validators replace the old ones
+    fake.responses.append((304, b"", {}))
+    assert transport.fetch_parsed("http://feed", parse)[0] == "two"
+    assert fake.sent[3][1] == {"If-None-Match": '"v2"'}
+
+
+def test_cache_is_keyed_per_url_parse_and_args(session):
+    fake = session((200, b"a", VALIDATORS), (200, b"a", VALIDATORS), (200, b"a", VALIDATORS))
+    transport.fetch_parsed("http://feed", parse, "-x")
+    # Other args and other URLs have no validators yet: plain GETs
+    assert transport.fetch_parsed("http://feed", parse, "-y")[0] == "a-y"
+    assert transport.fetch_parsed("http://other", parse, "-x")[0] == "a-x"
+    assert [headers for _, headers in fake.sent] == [{}, {}, {}]
+
+
+def test_error_status_raises_and_is_not_cached(session):
+    fake = session((200, b"one", VALIDATORS), (500, b"oops", {"ETag": '"broken"'}), (304, b"", {}))
+    transport.fetch_parsed("http://feed", parse)
+    with pytest.raises(requests.HTTPError):
+        transport.fetch_parsed("http://feed", parse)
+    # Still revalidates against the last good response
+    assert transport.fetch_parsed("http://feed", parse)[0] == "one"
+    assert fake.sent[2][1]["If-None-Match"] == '"v1"'
+
+
+def test_responses_without_validators_are_not_cached(session):
+    fake = session((200, b"one", {}), (200, b"two", {}))
+    transport.fetch_parsed("http://feed", parse)
+    assert transport.fetch_parsed("http://feed", parse)[0] == "two"
+    assert fake.sent[1][1] == {}
@@ -0,0 +1,51 @@
+import threading
+import pandas as pd
+import pytest
+from src import transport
+from src.vehicles import VEHICLE_COLUMNS, load_positions_all
+
+
+def parse_ok(content, mode):
+    return pd.DataFrame({"vehicle_id": ["1", "2"], "lat": [43.26, 43.3], "lon": [-2.93, -2.9], "mode": mode})
+
+
+@pytest.fixture
+def stub_fetch(monkeypatch):
+    """transport.fetch_parsed stand-in: URLs "slow", "broken" and anything else."""
+    release = threading.Event()
+
+    def fetch_parsed(url, parse, *args, timeout=None):
+        if url == "slow":
+            release.wait(5)  # hangs well past the timeout of the call
+        if url == "broken":
+            raise ConnectionError("connection refused")
+        return parse(b"feed", *args), {"status": 200, "fetch_s": 0.01, "parse_s": 0.02, "bytes": 4}
+
+    monkeypatch.setattr(transport, "fetch_parsed", fetch_parsed)
+    yield
+    release.set()
+
+
+def test_slow_and_failing_feeds_do_not_block_the_others(stub_fetch):
+    feeds = {
+        "bus": ("ok", parse_ok, ("bus",)),
+        "metro": ("slow", parse_ok, ("metro",)),
+        "renfe": ("broken", parse_ok, ("renfe",)),
+    }
+    frames, timings = load_positions_all(feeds, timeout=0.3)
+
+    assert frames["bus"]["mode"].tolist() == ["bus", "bus"]
+    for name in ("metro", "renfe"):
+        assert frames[name].empty
+        assert frames[name].columns.tolist() == VEHICLE_COLUMNS
+    assert timings.attrs["total_s"] < 2  # did not wait for the hanging feed
+
+    timings = timings.set_index("feed")
+    assert timings.loc["bus", ["status", "fetch_s", "parse_s", "bytes", "rows"]].tolist() == [200, 0.01, 0.02, 4, 2]
+    assert pd.isna(timings.loc["bus", "error"])
+    assert timings.loc["metro", "error"] == "timeout after 0.3s"
+    assert timings.loc["renfe", "error"] == "connection refused"
+    for name in ("metro", "renfe"):
+        assert timings.loc[name, "rows"] == 0
+        assert timings.loc[name, ["status", "fetch_s", "parse_s", "bytes"]].isna().all()
+